@@ -1,13 +1,26 @@
 from . import crosstab
 from .crosstab.gif_lobes_from_excel_sheets import gif_lobes_from_excel_sheets
 from .crosstab.mega_analysis.custom_semiology_SemioDict_lookup import (
+    SemioDictLookup,
     custom_semiology_lookup,
+    semiodict_lookup,
+)
+from .crosstab.mega_analysis.row_filters import (
+    MinimumPatients,
+    OtherFactors,
+    PublicationYears,
+    ReferenceMatches,
 )
 from .semiology import (
     Semiology,
     Laterality,
+    canonical_query_key,
+    canonical_term,
+    expected_row_count,
     get_all_semiology_terms,
     get_possible_lateralities,
+    reload_semiology_dictionary,
+    suggest_semiology_terms,
 )
 
 
@@ -0,0 +1,268 @@
+import re
+
+import numpy as np
+
+from .QUERY_SEMIOLOGY import materialise_query_result, semiology_regexes
+from .semiology_dictionary import all_dictionary_keys, load_semiology_dictionary
+from .term_masks import term_mask_cache
+
+
+DEFAULT_COLUMNS = ('Reported Semiology', 'Semiology Category')
+KEYWORDS = ('AND', 'OR', 'NOT', 'IN')
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<paren>[()])|"(?P<double>[^"]*)"|\'(?P<single>[^\']*)\'|(?P<word>[^\s()"\']+))')
+
+
+class Term:
+    """Leaf of a query plan: one semiology term searched in some columns (None = default columns)."""
+
+    def __init__(self, term, columns=None):
+        self.term = term
+        self.columns = columns
+
+    def scoped(self, columns):
+        return self if self.columns is not None else Term(self.term, columns)
+
+    def evaluate(self, evaluator):
+        return evaluator.term_mask(self.term, self.columns)
+
+    def __repr__(self):
+        scope = '' if self.columns is None else f' IN {list(self.columns)}'
+        return f'Term({self.term!r}{scope})'
+
+
+class And:
+    def __init__(self, *children):
+        self.children = children
+
+    def scoped(self, columns):
+        return And(*(child.scoped(columns) for child in self.children))
+
+    def evaluate(self, evaluator):
+        mask = self.children[0].evaluate(evaluator)
+        for child in self.children[1:]:
+            if not mask.any():
+                break
+            mask = mask & child.evaluate(evaluator)
+        return mask
+
+    def __repr__(self):
+        return f'And{self.children}'
+
+
+class Or:
+    def __init__(self, *children):
+        self.children = children
+
+    def scoped(self, columns):
+        return Or(*(child.scoped(columns) for child in self.children))
+
+    def evaluate(self, evaluator):
+        mask = self.children[0].evaluate(evaluator)
+        for child in self.children[1:]:
+            mask = mask | child.evaluate(evaluator)
+        return mask
+
+    def __repr__(self):
+        return f'Or{self.children}'
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def scoped(self, columns):
+        return Not(self.child.scoped(columns))
+
+    def evaluate(self, evaluator):
+        return ~self.child.evaluate(evaluator)
+
+    def __repr__(self):
+        return f'Not({self.child!r})'
+
+
+def tokenise(expression):
+    """
+    Split a query into ('(' | ')' | 'KEYWORD' | 'TEXT', value) tokens.
+    Quoted strings are always text, so "AND" in quotes is searched for literally.
+    """
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(
+                f'Cannot parse query at: {expression[position:]!r} (unbalanced quote?)')
+        position = match.end()
+        if match.group('paren'):
+            tokens.append((match.group('paren'), match.group('paren')))
+        elif match.group('word') in KEYWORDS:
+            tokens.append(('KEYWORD', match.group('word')))
+        elif match.group('word') is not None:
+            tokens.append(('TEXT', match.group('word')))
+        else:
+            quoted = match.group('double')
+            if quoted is None:
+                quoted = match.group('single')
+            tokens.append(('TEXT', quoted))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent over the grammar:
+        or   := and ('OR' and)*
+        and  := not ('AND' not)*
+        not  := 'NOT' not | atom
+        atom := ('(' or ')' | text+) ['IN' text]
+    Adjacent unquoted words form one term: head version AND tonic.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind != kind or (value is not None and token_value != value):
+            expected = value or kind
+            raise ValueError(
+                f'Expected {expected} in query but found {token_value!r}')
+        self.position += 1
+        return token_value
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] is not None:
+            raise ValueError(
+                f'Unexpected {self.peek()[1]!r} in query')
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ('KEYWORD', 'OR'):
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(*children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() == ('KEYWORD', 'AND'):
+            self.position += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(*children)
+
+    def parse_not(self):
+        if self.peek() == ('KEYWORD', 'NOT'):
+            self.position += 1
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, _ = self.peek()
+        if kind == '(':
+            self.position += 1
+            node = self.parse_or()
+            self.take(')')
+        elif kind == 'TEXT':
+            words = [self.take('TEXT')]
+            while self.peek()[0] == 'TEXT':
+                words.append(self.take('TEXT'))
+            node = Term(' '.join(words))
+        else:
+            raise ValueError(
+                f'Expected a term or "(" in query but found {self.peek()[1]!r}')
+        if self.peek() == ('KEYWORD', 'IN'):
+            self.position += 1
+            node = node.scoped((self.take('TEXT'),))
+        return node
+
+
+def parse_query(expression):
+    """
+    Parse a boolean semiology query into a plan of Term/And/Or/Not nodes, e.g.
+        ("head version" OR "head turn") AND NOT postictal IN 'Semiology Category'
+    Keywords are upper case; IN scopes the preceding term or bracket to one column.
+    """
+    return _Parser(tokenise(expression)).parse()
+
+
+_dictionary_key_sets = {}
+
+
+def _dictionary_keys(semiology_dict_path):
+    # rebuilt when the yaml file is edited, as the parsed dictionary then is a new object
+    dictionary = load_semiology_dictionary(semiology_dict_path)
+    cached = _dictionary_key_sets.get(semiology_dict_path)
+    if cached is None or cached[0] is not dictionary:
+        keys = frozenset(key.lower() for key in all_dictionary_keys(dictionary))
+        cached = (dictionary, keys)
+        _dictionary_key_sets[semiology_dict_path] = cached
+    return cached[1]
+
+
+class _Evaluator:
+    """Resolves plan leaves to cached row masks of one DataFrame."""
+
+    def __init__(self, df, semiology_dict_path, ignore_case, default_columns):
+        self.df = df
+        self.semiology_dict_path = semiology_dict_path
+        self.ignore_case = ignore_case
+        self.default_columns = default_columns
+        self.masks = term_mask_cache(df)
+
+    def term_mask(self, term, columns):
+        columns = self.default_columns if columns is None else columns
+        missing = [col for col in columns if col not in self.df.columns]
+        if missing:
+            raise KeyError(f'Query column(s) not in the DataFrame: {missing}')
+        path = None
+        if (self.semiology_dict_path is not None
+                and term.lower() in _dictionary_keys(str(self.semiology_dict_path))):
+            path = self.semiology_dict_path
+        regexes = semiology_regexes(
+            term, ignore_case=self.ignore_case, semiology_dict_path=path)
+        if not regexes:
+            return np.zeros(len(self.df), dtype=bool)
+        return self.masks.mask(regexes, columns)
+
+
+def QUERY_BOOLEAN_MASK(df, expression, semiology_dict_path=None, ignore_case=True,
+                       default_columns=DEFAULT_COLUMNS):
+    """Boolean numpy row mask over df for a boolean query (a string or a parsed plan)."""
+    plan = parse_query(expression) if isinstance(
+        expression, str) else expression
+    evaluator = _Evaluator(df, semiology_dict_path,
+                           ignore_case, tuple(default_columns))
+    return plan.evaluate(evaluator)
+
+
+def QUERY_BOOLEAN(df, expression, semiology_dict_path=None, ignore_case=True,
+                  default_columns=DEFAULT_COLUMNS):
+    """
+    QUERY_SEMIOLOGY for boolean expressions of terms with AND, OR, NOT and column scoping (IN).
+        QUERY_BOOLEAN(df, '("head version" OR "head turn") AND NOT postictal IN \'Semiology Category\'')
+
+    Terms that are SemioDict keys (any level, case-insensitive) use the dictionary regexes
+    when semiology_dict_path is given, others are searched as regexes as in QUERY_SEMIOLOGY.
+    Unscoped terms search both 'Reported Semiology' and 'Semiology Category'.
+
+    Each term's row mask is cached per DataFrame, the plan is evaluated as vectorised boolean
+    algebra over the masks, and the DataFrame is only sliced once at the end.
+
+    returns (inspect_result, num_query_lat, num_query_loc) as QUERY_SEMIOLOGY.
+    """
+    mask = QUERY_BOOLEAN_MASK(
+        df, expression,
+        semiology_dict_path=semiology_dict_path,
+        ignore_case=ignore_case,
+        default_columns=default_columns,
+    )
+    return materialise_query_result(df, mask)
@@ -1,9 +1,9 @@
-from .QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from .QUERY_SEMIOLOGY import materialise_query_result, semiology_regexes
+from .term_masks import term_mask_cache
 import numpy as np
-import pandas as pd
 
 
-def QUERY_INTERSECTION_TERMS(df, *args):
+def QUERY_INTERSECTION_TERMS(df, *args, col1='Reported Semiology', col2='Semiology Category'):
     """
     Runs two QUERY_SEMIOLOGY searches, returns the intersection of both queries.
     Can be used to find pts with semiology involving e.g. "head" and "sensation".
@@ -13,28 +13,40 @@ def QUERY_INTERSECTION_TERMS(df, *args):
 
     Alim-Marvasti Aug 2019
 
+    Intersects the sorted row positions each term matches (rarest term first, stopping as soon
+    as the running intersection is empty) and selects the rows from df only once at the end,
+    instead of merging the DataFrames of every QUERY_SEMIOLOGY on all their columns.
+    A single term is the QUERY_SEMIOLOGY result, all null columns dropped.
+
     Note: at some point the exclusions.py can be refactored using this function.
     """
-    n = 0
+    masks = term_mask_cache(df)
+    matched_positions = []
     for arg in args:
-        n += 1
-        query_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df, semiology_term=arg,
-                                                                         ignore_case=True, semiology_dict_path=None,
-                                                                         # col1=col1, col2=col1
-                                                                         )
-
-        # can't merge the first df
-        if n == 1:
-            inspect_combined_result = query_inspection
+        values = semiology_regexes(arg, ignore_case=True, semiology_dict_path=None)
+        if not values:
+            matched_positions.append(np.array([], dtype=np.intp))
             continue
-
-        # ans is df of the intersection of the above two, keep the index otherwise it is reset
-        inspect_combined_result = query_inspection.reset_index().merge(
-            inspect_combined_result, how="inner").set_index('index')
-        if inspect_combined_result.empty:
-            print('No results combining ALL of those keyword terms, breaking. Try reducing number of terms or respelling.',
-                  'Note no semiology dictionary is used.')
+        matched_positions.append(np.flatnonzero(masks.mask(values, (col1, col2))))
+
+    if len(args) == 1:
+        mask = np.zeros(len(df), dtype=bool)
+        mask[matched_positions[0]] = True
+        inspect_result, _, _ = materialise_query_result(df, mask)
+        return inspect_result.dropna(axis='columns', how='all')
+
+    # smallest sets first: the running intersection is then never larger than the rarest term
+    matched_positions.sort(key=len)
+    positions = matched_positions[0] if matched_positions else np.arange(len(df))
+    for other_positions in matched_positions[1:]:
+        positions = np.intersect1d(positions, other_positions, assume_unique=True)
+        if positions.size == 0:
             break
+    if positions.size == 0:
+        print('No results combining ALL of those keyword terms, breaking. Try reducing number of terms or respelling.',
+              'Note no semiology dictionary is used.')
+
+    inspect_combined_result = df.iloc[np.sort(positions)].drop_duplicates()
 
     # clean up all nan columns
     inspect_combined_result = inspect_combined_result.dropna(
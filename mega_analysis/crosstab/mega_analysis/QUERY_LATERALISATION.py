@@ -141,6 +141,132 @@ def lat_exceeding_loc_mapped_to_hemisphericGIFs_adjusted_for_locs(
     return lat_only_Right, lat_only_Left
 
 
+def lateralised_row_to_one_map(full_row, id_cols, lat_vars, one_map, gifs_right, gifs_left,
+                               side_of_symptoms_signs,
+                               pts_dominant_hemisphere_R_or_L,
+                               normalise_lat_to_loc=False):
+    """
+    Factor function for Q_L: maps one row of inspect_result with a lateralising value to the gif parcellations,
+    the side with less lateralising data reduced.
+
+    returns (row_to_one_map, lat_exceed_isin):
+        row_to_one_map: None if the row has no localising value (its lateralising values go to the
+            hemispheric GIFs with lateralising_but_not_localising)
+        lat_exceed_isin: (isin_left, isin_right) if lateralising exceeds localising and the excess
+            is mapped with lat_exceeding_loc_mapped_to_hemisphericGIFs_adjusted_for_locs, else None
+    """
+    Right = 0
+    Left = 0
+
+    row = full_row.drop(labels=id_cols, axis='columns',
+                        inplace=False, errors='ignore')
+    row = row.dropna(how='all', axis='columns')
+    # row = row.dropna(how='all', axis='rows')
+
+    #
+    #
+    #
+    # some pts/rows will have lateralising but no localising values:
+    if (('Localising' not in row.columns) | (full_row['Localising'].sum() == 0)):
+        logging.debug(
+            '\n\nSome extracted lateralisations have no specific localisation - these are mapped to entire hemispheric GIFs')
+        # probably, in future, instead of break we want to compare this row's:
+        #       full_row['Lateralising']    to the overall    inspect_result['Lateralising']    and use that proportion
+        #  or actually, to count this full_row['Lateralising'] as data for localising, using the lateralised gif parcellations from the sheet called
+        #       'Full GIF Map for Review '
+        return None, None
+    #
+    #
+    #
+    # otherwise if there is localising value (and lateralising value):
+    row_to_one_map = pivot_result_to_one_map(row, one_map, raw_pt_numbers_string='pt #s',
+                                             )
+    # ^ row_to_one_map now contains all the lateralising gif parcellations
+
+    # set the scale of influence of lateralisation on the gif parcellations:
+    proportion_lateralising = full_row['Lateralising'].sum(
+    ) / full_row['Localising'].sum()
+
+    # some rows will have lateralisng exceed localising values:
+    #
+    #
+    #
+    if proportion_lateralising > 1:
+        proportion_lateralising = 1
+        logging.debug(
+            '\n\nSome lateralising data exceed localising data, excess are mapped to entire hemispheric GIFs')
+
+        # now deal with lat_exceed_loc excess as we did with lat_but_not_loc
+        lat_exceed_loc = True
+    else:
+        lat_exceed_loc = False
+
+    # check columns exist in this particular row:
+    for col in lat_vars:
+        if col not in row.columns:
+            row[col] = 0
+        else:
+            continue
+
+    # summarise overall lat values
+    Right, Left = summarise_overall_lat_values(row,
+                                               side_of_symptoms_signs,
+                                               pts_dominant_hemisphere_R_or_L,
+                                               Right,
+                                               Left)
+
+    Total = Right+Left
+    if Right == Left:
+        # no point as this is 50:50 as it already is, so skip
+        return row_to_one_map, None
+
+    # now should be able to use above to lateralise the localising gif parcellations:
+    # if there are 100 localisations in one row, and only 1 IL And 3 CL, it would be too much
+    # to say the IL side gets one third of the CL side as number of lat is too low
+    # hence normalise by dividing by proportion_lateralising (which is between (0,1])
+
+    # find lowest value of R or L
+    lower_postn = np.argmin([Right, Left])
+    if lower_postn == 0:
+        isin = gifs_right  # reduce right sided intensities/pt #s
+        isin_right = True
+        isin_left = False
+    elif lower_postn == 1:
+        isin = gifs_left
+        isin_left = True
+        isin_right = False
+
+    lower_value = [Right, Left][lower_postn]
+    higher_value = [Right, Left]
+    higher_value.remove(lower_value)
+
+    ratio = lower_value / Total
+
+    if normalise_lat_to_loc == True:
+        # see comments on section above about why we should normalise
+        norm_ratio = ratio / proportion_lateralising
+        if norm_ratio > 1:
+            norm_ratio = 1
+            logging.debug(
+                'norm_ratio capped at 1: small proportion of data lateralised')
+    elif normalise_lat_to_loc == False:
+        norm_ratio = lower_value / higher_value
+
+    # if proportion_lateralising is 1, straightforward: return dataframe of right/left gifs whichever lower
+    df_lower_lat_to_be_reduced = row_to_one_map.loc[row_to_one_map['Gif Parcellations'].isin(
+        list(isin))].copy()
+    # now make these values lower by a proportion = norm_ratio (in this case norm_ratio = ratio as denom is 1)
+    reduce_these = df_lower_lat_to_be_reduced.loc[:, 'pt #s'].copy()
+    df_lower_lat_to_be_reduced.loc[:, 'pt #s'] = norm_ratio * reduce_these
+    # re attribute these corrected reduced lateralised values to the entire row's data:
+    row_to_one_map.loc[df_lower_lat_to_be_reduced.index,
+                       :] = df_lower_lat_to_be_reduced
+
+    if lat_exceed_loc:
+        return row_to_one_map, (isin_left, isin_right)
+    return row_to_one_map, None
+
+
 def QUERY_LATERALISATION(inspect_result, df, one_map, gif_lat_file,
                          side_of_symptoms_signs=None,
                          pts_dominant_hemisphere_R_or_L=None,
@@ -271,134 +397,25 @@ def QUERY_LATERALISATION(inspect_result, df, one_map, gif_lat_file,
     for i in (range(no_rows) if disable_tqdm else tqdm(range(no_rows), desc='QUERY LATERALISTION: main',
                                                        bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.BLUE, Fore.RESET))):
         # logging.debug(str(i))
-        Right = 0
-        Left = 0
-
         full_row = inspect_result_lat.iloc[[i], :]
-        row = full_row.drop(labels=id_cols, axis='columns',
-                            inplace=False, errors='ignore')
-        row = row.dropna(how='all', axis='columns')
-        # row = row.dropna(how='all', axis='rows')
-
-        #
-        #
-        #
-        # some pts/rows will have lateralising but no localising values:
-        if (('Localising' not in row.columns) | (full_row['Localising'].sum() == 0)):
-            logging.debug(
-                '\n\nSome extracted lateralisations have no specific localisation - these are mapped to entire hemispheric GIFs')
-            # logging.debug(f'row# = {i}')
-            # probably, in future, instead of break we want to compare this row's:
-            #       full_row['Lateralising']    to the overall    inspect_result['Lateralising']    and use that proportion
-            #  or actually, to count this full_row['Lateralising'] as data for localising, using the lateralised gif parcellations from the sheet called
-            #       'Full GIF Map for Review '
+        row_to_one_map, lat_exceed_isin = lateralised_row_to_one_map(full_row, id_cols, lat_vars,
+                                                                     one_map, gifs_right, gifs_left,
+                                                                     side_of_symptoms_signs,
+                                                                     pts_dominant_hemisphere_R_or_L,
+                                                                     normalise_lat_to_loc=normalise_lat_to_loc)
 
+        # some pts/rows will have lateralising but no localising values:
+        if row_to_one_map is None:
             lat_only_Right, lat_only_Left = lateralising_but_not_localising(full_row,
                                                                             side_of_symptoms_signs,
                                                                             pts_dominant_hemisphere_R_or_L,
                                                                             lat_only_Right,
                                                                             lat_only_Left)
             continue
-        #
-        #
-        #
-        # otherwise if there is localising value (and lateralising value):
-        row_to_one_map = pivot_result_to_one_map(row, one_map, raw_pt_numbers_string='pt #s',
-                                                 )
-        # ^ row_to_one_map now contains all the lateralising gif parcellations
-
-        # set the scale of influence of lateralisation on the gif parcellations:
-        proportion_lateralising = full_row['Lateralising'].sum(
-        ) / full_row['Localising'].sum()
-
-        # some rows will have lateralisng exceed localising values:
-        #
-        #
-        #
-        if proportion_lateralising > 1:
-            proportion_lateralising = 1
-            logging.debug(
-                '\n\nSome lateralising data exceed localising data, excess are mapped to entire hemispheric GIFs')
-
-            # now deal with lat_exceed_loc excess as we did with lat_but_not_loc
-            lat_exceed_loc = True
-        else:
-            lat_exceed_loc = False
-
-        # check columns exist in this particular row:
-        for col in lat_vars:
-            if col not in row.columns:
-                row[col] = 0
-            else:
-                continue
-
-        # summarise overall lat values
-        Right, Left = summarise_overall_lat_values(row,
-                                                   side_of_symptoms_signs,
-                                                   pts_dominant_hemisphere_R_or_L,
-                                                   Right,
-                                                   Left)
-
-        Total = Right+Left
-        if Right == Left:
-            # no point as this is 50:50 as it already is, so skip
-            # before continuing, ensure there is a all_combined_gifs...
-            # e.g. for blink there isn't as the first row is 50:50...
-            # ... and all future codes fail
-            if all_combined_gifs is None:
-                all_combined_gifs = row_to_one_map
-            elif all_combined_gifs is not None:
-                all_combined_gifs = pd.concat(
-                    [all_combined_gifs, row_to_one_map], join='outer', sort=False, ignore_index=True)
-            continue
 
-        # now should be able to use above to lateralise the localising gif parcellations:
-        # if there are 100 localisations in one row, and only 1 IL And 3 CL, it would be too much
-        # to say the IL side gets one third of the CL side as number of lat is too low
-        # hence normalise by dividing by proportion_lateralising (which is between (0,1])
-
-        # find lowest value of R or L
-        lower_postn = np.argmin([Right, Left])
-        if lower_postn == 0:
-            isin = gifs_right  # reduce right sided intensities/pt #s
-            isin_right = True
-            isin_left = False
-        elif lower_postn == 1:
-            isin = gifs_left
-            isin_left = True
-            isin_right = False
-
-        lower_value = [Right, Left][lower_postn]
-        higher_value = [Right, Left]
-        higher_value.remove(lower_value)
-
-        ratio = lower_value / Total
-
-        if normalise_lat_to_loc == True:
-            # see comments on section above about why we should normalise
-            norm_ratio = ratio / proportion_lateralising
-            if norm_ratio > 1:
-                norm_ratio = 1
-                logging.debug(
-                    'norm_ratio capped at 1: small proportion of data lateralised')
-        elif normalise_lat_to_loc == False:
-            norm_ratio = lower_value / higher_value
-
-        # if proportion_lateralising is 1, straightforward: return dataframe of right/left gifs whichever lower
-        df_lower_lat_to_be_reduced = row_to_one_map.loc[row_to_one_map['Gif Parcellations'].isin(
-            list(isin))].copy()
-        # now make these values lower by a proportion = norm_ratio (in this case norm_ratio = ratio as denom is 1)
-        reduce_these = df_lower_lat_to_be_reduced.loc[:, 'pt #s'].copy()
-        df_lower_lat_to_be_reduced.loc[:, 'pt #s'] = norm_ratio * reduce_these
-        # re attribute these corrected reduced lateralised values to the entire row's data:
-        row_to_one_map.loc[df_lower_lat_to_be_reduced.index,
-                           :] = df_lower_lat_to_be_reduced
-
-        #
-        #
-        #
         # now deal with lat_exceed_loc excess as we did with lat_but_not_loc
-        if lat_exceed_loc:
+        if lat_exceed_isin is not None:
+            isin_left, isin_right = lat_exceed_isin
             lat_only_Right, lat_only_Left = lat_exceeding_loc_mapped_to_hemisphericGIFs_adjusted_for_locs(
                 full_row, lat_vars,
                 side_of_symptoms_signs,
@@ -408,20 +425,13 @@ def QUERY_LATERALISATION(inspect_result, df, one_map, gif_lat_file,
                 isin_left=isin_left, isin_right=isin_right,
             )
 
-        #
-        #
-        #
-
         # now need to merge/concat these rows-(pivot-result)-to-one-map as the cycle goes through each row:
-        if i == 0:
+        if all_combined_gifs is None:
             # can't merge first row
             all_combined_gifs = row_to_one_map
-            # logging.debug('end of zeroo')
-            continue
-        elif i != 0:
+        else:
             all_combined_gifs = pd.concat(
                 [all_combined_gifs, row_to_one_map], join='outer', sort=False, ignore_index=True)
-        # logging.debug(f'end of i {i}')
 
     # Need to recombine the inspect_result_lat (also had loc) used in for loop to give all_combined_gifs
     # with inspect_result that had null lateralising:
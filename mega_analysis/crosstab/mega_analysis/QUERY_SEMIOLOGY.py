@@ -1,11 +1,12 @@
 import logging
 import re
-import warnings
 from tqdm import tqdm
 from colorama import Fore
 
-import pandas as pd
-import yaml
+import numpy as np
+
+from .semiology_dictionary import read_semiology_yaml
+from .term_masks import term_mask_cache
 
 
 def make_simple_list(allv, allv_simple_list=[]):
@@ -74,7 +75,11 @@ def dictionary_key_recursion_2(dictionary, semiology_key, disable_tqdm=True):
                     yield result
 
 
-def use_semiology_dictionary_(semiology_term, semiology_dict_path):
+def use_semiology_dictionary_(semiology_term, semiology_dict_path, semiology_dictionary=None):
+    """
+    semiology_dictionary: the yaml file already loaded with the BaseLoader,
+    to look up several terms without reading the file for each.
+    """
     logging.debug(
         '\nusing option use_semiology_dictionary as taxonomy replacement')
     # define the key rather than the terms
@@ -82,12 +87,12 @@ def use_semiology_dictionary_(semiology_term, semiology_dict_path):
     semiology_key = semiology_term
 
     # open the semiology_dictionary yaml_file
-    with open(semiology_dict_path) as file:
-        semiology_dictionary = yaml.load(
-            file, Loader=yaml.BaseLoader)  # yaml file
+    if semiology_dictionary is None:
+        semiology_dictionary = read_semiology_yaml(semiology_dict_path)
 
     # get all the keys from the semiology_dictionary:
-    all_keys, _ = dictionary_key_recursion_(semiology_dictionary['semiology'])
+    all_keys, _ = dictionary_key_recursion_(
+        semiology_dictionary['semiology'], all_keys=[], all_values=[])
 
     # check the query exists in the keys:
     search = re.search(semiology_key, str(all_keys), re.IGNORECASE)
@@ -106,7 +111,8 @@ def use_semiology_dictionary_(semiology_term, semiology_dict_path):
     ) if key.lower() == semiology_key.lower()}
     if dict_comprehension:
         # logging.debug('dict_comprehension = \n', dict_comprehension)
-        _, values = dictionary_key_recursion_(dict_comprehension)
+        _, values = dictionary_key_recursion_(
+            dict_comprehension, all_keys=[], all_values=[])
         # # this returns a single list of single items and removes the nested lists
         # values = make_simple_list(values)
 
@@ -142,36 +148,16 @@ def regex_ignore_case(term_values):
     return output
 
 
-def QUERY_SEMIOLOGY(df, semiology_term='love',
-                    ignore_case=True,
-                    semiology_dict_path=None,
-                    col1='Reported Semiology',
-                    col2='Semiology Category',
-                    **kwargs):
+def semiology_regexes(semiology_term, ignore_case=True, semiology_dict_path=None,
+                      semiology_dictionary=None):
     """
-    Search for key terms in both "reported semiology" and "semiology category" and return df if found in either.
-    Removes all columns which are entirely null.
-
-    ---
-    df is the MegaAnalysis DataFrame
-    semiology_term is the query (can be a user-defined list e.g. ["epigastric aura", "rising sensation"]) - treated as "OR"
-    ignore_case: ignores case using a regular expression
-    semiology_dict_path is the yaml dictionary of equivalent terms.
-        An iterator cycles through all equivalent terms and appends
-        results to the output df before removing duplicates
-        (instead of using user defined semiology_term lists, uses pre-defined yaml dictionary)
-        keyword-based user queries are mapped to ontology entities
-
-    returns:
-        inspect_result: a DataFrame subset of df input containing all the results from the df - no melting or pivoting, index sorted.
-        num_query_lat: Lateralising Datapoints relevant to query {semiology_term}
-        num_query_loc: Localising Datapoints relevant to query {semiology_term}
+    The regexes QUERY_SEMIOLOGY searches for a query:
+    the term itself, a user-defined list (treated as "OR"), or the SemioDict values of the key
+    when semiology_dict_path is given. Returns None if the dictionary lookup fails.
+    semiology_dictionary is passed on to use_semiology_dictionary_.
     """
-    # initialise return object
-    inspect_result = pd.DataFrame()
     original_semiology_term = semiology_term
 
-    # main body of function
     if isinstance(semiology_term, list):
         if ignore_case:
             semiology_terms = []
@@ -190,6 +176,7 @@ def QUERY_SEMIOLOGY(df, semiology_term='love',
         values_dict_or_list = use_semiology_dictionary_(
             original_semiology_term,
             semiology_dict_path,
+            semiology_dictionary=semiology_dictionary,
         )
 
         if isinstance(values_dict_or_list, list):
@@ -198,7 +185,8 @@ def QUERY_SEMIOLOGY(df, semiology_term='love',
             logging.error(
                 "this shouldn't occur: use_semiology_dictionary_ has returned a dict. Attempted to correct... ")
             # when the semiology_term used in the dictionary refers to a top level key which is itself a dictionary
-            _, values = dictionary_key_recursion_(values_dict_or_list)
+            _, values = dictionary_key_recursion_(
+                values_dict_or_list, all_keys=[], all_values=[])
             values = make_simple_list(values)
         else:
             logging.error(
@@ -207,39 +195,20 @@ def QUERY_SEMIOLOGY(df, semiology_term='love',
         # turn these values to regexes too:
         values = regex_ignore_case(values)
 
-    if kwargs:
-        if len(kwargs) > 1:
-            raise Exception('too many tqdm kwargs')
-        for k, v in kwargs.items():
-            extra_desc = k + ': '
-            extra_desc2 = ''
-            colour = Fore.LIGHTGREEN_EX
-        # option to not show tqdm e.g. for double Q_S for PET Hypermetabolism
-        if 'tqdm' in kwargs:
-            disable_tqdm = False
-        if 'tqdm' not in kwargs:
-            disable_tqdm = True
-    else:
-        extra_desc = ''
-        extra_desc2 = ' (' + str(semiology_term) + ')'
-        disable_tqdm = True
-        colour = Fore.GREEN
-    description = extra_desc+'QUERY_SEMIOLOGY'+extra_desc2
+    return values
 
-    for term in (values if disable_tqdm else tqdm(values, desc=description,
-                                                  bar_format="{l_bar}%s{bar}%s{r_bar}" % (colour, Fore.RESET))
-                 ):
-        # https://stackoverflow.com/questions/39901550/python-userwarning-this-pattern-has-match-groups-to-actually-get-the-groups
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore', 'This pattern has match groups')
-            mask1 = df[col1].str.contains(term, na=False)
-            mask2 = df[col2].str.contains(term, na=False)
-        inspect_result = inspect_result.append(df.loc[mask1], sort=False)
-        inspect_result = inspect_result.append(df.loc[mask2], sort=False)
 
+def materialise_query_result(df, mask):
+    """
+    Build the QUERY_SEMIOLOGY outputs from a boolean row mask over df, selecting the rows only once.
+    Removes all columns which are entirely null and duplicated rows.
+
+    returns (inspect_result, num_query_lat, num_query_loc) or None as QUERY_SEMIOLOGY.
+    """
     # to fix issue #7 by commenting out below and inserting 3 lines instead:
     # may remove lateralising or localising if all nan
-    inspect_result = inspect_result.dropna(axis='columns', how='all')
+    # (copy: a fresh frame, not a view of df, as the appended results used to be)
+    inspect_result = df.loc[mask].dropna(axis='columns', how='all').copy()
     if 'Localising' not in inspect_result.columns:
         inspect_result['Localising'] = 0
     if 'Lateralising' not in inspect_result.columns:
@@ -269,3 +238,86 @@ def QUERY_SEMIOLOGY(df, semiology_term='love',
 
     return (inspect_result.sort_index(),
             num_query_lat, num_query_loc)
+
+
+def QUERY_SEMIOLOGY_MASK(df, semiology_term='love',
+                         ignore_case=True,
+                         semiology_dict_path=None,
+                         col1='Reported Semiology',
+                         col2='Semiology Category'):
+    """
+    The rows QUERY_SEMIOLOGY would return, as a boolean numpy array aligned with df, without building any DataFrame.
+    Masks come from the DataFrame's mask cache, so repeated queries of the same df only search each regex once.
+    returns None if the semiology dictionary lookup fails, as QUERY_SEMIOLOGY.
+    """
+    values = semiology_regexes(
+        semiology_term,
+        ignore_case=ignore_case,
+        semiology_dict_path=semiology_dict_path,
+    )
+    if values is None:
+        return
+    return term_mask_cache(df).mask(values, (col1, col2))
+
+
+def QUERY_SEMIOLOGY(df, semiology_term='love',
+                    ignore_case=True,
+                    semiology_dict_path=None,
+                    col1='Reported Semiology',
+                    col2='Semiology Category',
+                    **kwargs):
+    """
+    Search for key terms in both "reported semiology" and "semiology category" and return df if found in either.
+    Removes all columns which are entirely null.
+
+    ---
+    df is the MegaAnalysis DataFrame
+    semiology_term is the query (can be a user-defined list e.g. ["epigastric aura", "rising sensation"]) - treated as "OR"
+    ignore_case: ignores case using a regular expression
+    semiology_dict_path is the yaml dictionary of equivalent terms.
+        An iterator cycles through all equivalent terms and ORs their row masks
+        before selecting the rows once and removing duplicates
+        (instead of using user defined semiology_term lists, uses pre-defined yaml dictionary)
+        keyword-based user queries are mapped to ontology entities
+
+    returns:
+        inspect_result: a DataFrame subset of df input containing all the results from the df - no melting or pivoting, index sorted.
+        num_query_lat: Lateralising Datapoints relevant to query {semiology_term}
+        num_query_loc: Localising Datapoints relevant to query {semiology_term}
+    """
+    values = semiology_regexes(
+        semiology_term,
+        ignore_case=ignore_case,
+        semiology_dict_path=semiology_dict_path,
+    )
+    if values is None:
+        return
+
+    if kwargs:
+        if len(kwargs) > 1:
+            raise Exception('too many tqdm kwargs')
+        for k, v in kwargs.items():
+            extra_desc = k + ': '
+            extra_desc2 = ''
+            colour = Fore.LIGHTGREEN_EX
+        # option to not show tqdm e.g. for double Q_S for PET Hypermetabolism
+        if 'tqdm' in kwargs:
+            disable_tqdm = False
+        if 'tqdm' not in kwargs:
+            disable_tqdm = True
+    else:
+        extra_desc = ''
+        extra_desc2 = ' (' + str(semiology_term) + ')'
+        disable_tqdm = True
+        colour = Fore.GREEN
+    description = extra_desc+'QUERY_SEMIOLOGY'+extra_desc2
+
+    # text columns are folded once per DataFrame and each regex only runs on rows holding its literals
+    masks = term_mask_cache(df)
+    mask = np.zeros(len(df), dtype=bool)
+    for term in (values if disable_tqdm else tqdm(values, desc=description,
+                                                  bar_format="{l_bar}%s{bar}%s{r_bar}" % (colour, Fore.RESET))
+                 ):
+        mask |= masks.mask([term], (col1, col2))
+
+    return materialise_query_result(df, mask)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .QUERY_SEMIOLOGY import materialise_query_result, semiology_regexes
+from .semiology_dictionary import all_dictionary_keys, load_semiology_dictionary
+from .term_masks import term_mask_cache
+
+
+class SemiologyMembership:
+    """
+    Which rows of df each query term matches, as a sparse (terms x rows) boolean matrix.
+
+    Row positions follow df, i.e. column j of the matrix is df.index[j].
+    The QUERY_SEMIOLOGY outputs of a term are only built when asked for, and then cached:
+        membership = QUERY_SEMIOLOGY_BATCH(df, ['Epigastric', 'Head Version'], semiology_dict_path)
+        inspect_result, num_query_lat, num_query_loc = membership['Epigastric']
+    """
+
+    def __init__(self, df, terms, matrix):
+        self.df = df
+        self.terms = terms
+        self.matrix = matrix
+        self._term_ids = {self._label(term): i for i, term in enumerate(terms)}
+        self._results = {}
+
+    @staticmethod
+    def _label(term):
+        return tuple(term) if isinstance(term, list) else term
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return self._label(term) in self._term_ids
+
+    def __getitem__(self, term):
+        return self.result(term)
+
+    def row_positions(self, term):
+        """Sorted positions (iloc) of the rows the term matches."""
+        i = self._term_ids[self._label(term)]
+        return self.matrix.indices[self.matrix.indptr[i]:self.matrix.indptr[i + 1]]
+
+    def mask(self, term):
+        mask = np.zeros(self.matrix.shape[1], dtype=bool)
+        mask[self.row_positions(term)] = True
+        return mask
+
+    def rows(self, term):
+        """df.index labels of the rows the term matches."""
+        return self.df.index[self.row_positions(term)]
+
+    def counts(self):
+        """Number of matched rows per term."""
+        counts = np.diff(self.matrix.indptr)
+        return pd.Series(counts, index=[self._label(term) for term in self.terms])
+
+    def row_coverage(self):
+        """Number of terms matching each row, aligned with df."""
+        return np.bincount(self.matrix.indices, minlength=self.matrix.shape[1])
+
+    def overlap(self):
+        """Sparse (terms x terms) matrix of the number of rows both terms match; the diagonal holds the counts."""
+        matrix = self.matrix.astype(np.int32)
+        return (matrix @ matrix.T).tocsr()
+
+    def result(self, term):
+        """(inspect_result, num_query_lat, num_query_loc) for one term, as QUERY_SEMIOLOGY returns."""
+        label = self._label(term)
+        if label not in self._results:
+            self._results[label] = materialise_query_result(self.df, self.mask(term))
+        return self._results[label]
+
+    def to_frame(self):
+        """Dense boolean DataFrame, terms as rows and df.index as columns."""
+        return pd.DataFrame(
+            self.matrix.toarray(),
+            index=[self._label(term) for term in self.terms],
+            columns=self.df.index,
+        )
+
+
+def QUERY_SEMIOLOGY_BATCH(df, semiology_terms, semiology_dict_path=None, ignore_case=True,
+                          col1='Reported Semiology', col2='Semiology Category'):
+    """
+    QUERY_SEMIOLOGY for many terms at once, e.g. every SemioDict key.
+
+    A term uses its SemioDict values if semiology_dict_path is given and the term is a key
+    of the dictionary (case-insensitive, any level), otherwise it is searched as a regex;
+    a list of terms is treated as "OR" as in QUERY_SEMIOLOGY.
+
+    The dictionary is read once, the text columns are case folded once, and each distinct regex
+    is matched once however many terms share it. The per-regex masks are kept in the DataFrame's
+    mask cache, so later QUERY_SEMIOLOGY calls on the same df reuse them.
+
+    returns a SemiologyMembership with the (terms x rows) sparse membership matrix.
+    """
+    semiology_dictionary = None
+    dictionary_keys = frozenset()
+    if semiology_dict_path is not None:
+        semiology_dictionary = {
+            'semiology': load_semiology_dictionary(semiology_dict_path)}
+        dictionary_keys = frozenset(
+            key.lower() for key in all_dictionary_keys(semiology_dictionary['semiology']))
+
+    masks = term_mask_cache(df)
+    columns = (col1, col2)
+    terms = list(semiology_terms)
+    row_ids = []
+    col_ids = []
+    for i, term in enumerate(terms):
+        use_dictionary = isinstance(term, str) and term.lower() in dictionary_keys
+        values = semiology_regexes(
+            term,
+            ignore_case=ignore_case,
+            semiology_dict_path=semiology_dict_path if use_dictionary else None,
+            semiology_dictionary=semiology_dictionary,
+        )
+        if not values:
+            continue
+        positions = np.flatnonzero(masks.mask(values, columns))
+        row_ids.append(np.full(len(positions), i, dtype=np.intp))
+        col_ids.append(positions)
+
+    row_ids = np.concatenate(row_ids) if row_ids else np.array([], dtype=np.intp)
+    col_ids = np.concatenate(col_ids) if col_ids else np.array([], dtype=np.intp)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(row_ids), dtype=bool), (row_ids, col_ids)),
+        shape=(len(terms), len(df)),
+    )
+    matrix.sort_indices()
+    return SemiologyMembership(df, terms, matrix)
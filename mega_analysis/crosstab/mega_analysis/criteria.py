@@ -0,0 +1,140 @@
+import enum
+
+import numpy as np
+import pandas as pd
+
+from .dataframe_cache import per_dataframe_cache
+from .exclusions import CONCORDANT, ET, PAED, POST_ICTALS, POST_OP, SEEG_ES, SPECT_PET_TERMS, SS
+from .term_masks import term_mask_cache
+
+
+CS = 'Cortical Stimulation (CS)'
+
+
+class Criterion(enum.IntFlag):
+    """One bit per row property the exclusions select on."""
+    POSTICTAL = 1 << 0  # post-ictal semiology text
+    PAEDIATRIC = 1 << 1  # labelled < 7 years old
+    ET = 1 << 2  # epilepsy topology
+    SS = 1 << 3  # spontaneous semiology
+    CS = 1 << 4  # cortical stimulation
+    SEIZURE_FREE = 1 << 5  # post-op seizure freedom ground truth
+    CONCORDANT = 1 << 6  # concordant neurophysiology & imaging ground truth
+    SEEG_ES = 1 << 7  # sEEG and/or ES ground truth
+    SEEG_ONLY = 1 << 8  # sEEG ground truth exactly 'y'
+    ES = 1 << 9  # electrical stimulation mentioned in the sEEG/ES ground truth
+    PET_HYPERMETABOLISM = 1 << 10  # PET hypermetabolism in the concordance ground truth
+    PET_HYPERMETABOLISM_ONLY = 1 << 11  # ... and no seizure freedom or sEEG/ES ground truth
+    DUPLICATE_ROW = 1 << 12  # exact copy of an earlier row
+    SPECT_PET = 1 << 13  # one of the SPECT_PET_TERMS in the concordance ground truth
+    SPECT_PET_ONLY = 1 << 14  # ... and no seizure freedom or sEEG/ES ground truth
+
+
+# exclude_postictals drops the rows of a QUERY_SEMIOLOGY result, which has no duplicated rows:
+# later copies of a post-ictal row stay in. So the rows it drops are
+#   criteria.mask(Criterion.POSTICTAL) & ~criteria.mask(Criterion.DUPLICATE_ROW)
+
+
+def _contains(masks, column, terms):
+    return masks.mask(['(?i)' + term for term in terms], (column, column))
+
+
+def criterion_bits(df):
+    """
+    Every Criterion of every row of df, packed into one uint16 per row (aligned with df).
+    Each predicate is the one the exclusion function applies to the raw columns.
+    """
+    masks = term_mask_cache(df)
+    postictal = masks.mask(['(?i)' + term for term in POST_ICTALS],
+                           ('Reported Semiology', 'Semiology Category'))
+    seizure_free = df[POST_OP].notnull().to_numpy()
+    seeg_es = df[SEEG_ES].notnull().to_numpy()
+    pet_hypermetabolism = (_contains(masks, CONCORDANT, ['PET'])
+                           & _contains(masks, CONCORDANT, ['Hyper']))
+    spect_pet = _contains(masks, CONCORDANT, SPECT_PET_TERMS)
+    criteria = {
+        Criterion.POSTICTAL: postictal,
+        Criterion.PAEDIATRIC: (df[PAED] == 'y').to_numpy(),
+        Criterion.ET: df[ET].notnull().to_numpy(),
+        Criterion.SS: df[SS].notnull().to_numpy(),
+        Criterion.CS: df[CS].notnull().to_numpy(),
+        Criterion.SEIZURE_FREE: seizure_free,
+        Criterion.CONCORDANT: df[CONCORDANT].notnull().to_numpy(),
+        Criterion.SEEG_ES: seeg_es,
+        Criterion.SEEG_ONLY: (df[SEEG_ES] == 'y').to_numpy(),
+        Criterion.ES: df[SEEG_ES].str.contains('ES', case=False, na=False).to_numpy(dtype=bool),
+        Criterion.PET_HYPERMETABOLISM: pet_hypermetabolism,
+        Criterion.PET_HYPERMETABOLISM_ONLY: pet_hypermetabolism & ~seizure_free & ~seeg_es,
+        Criterion.DUPLICATE_ROW: df.duplicated().to_numpy(),
+        Criterion.SPECT_PET: spect_pet,
+        Criterion.SPECT_PET_ONLY: spect_pet & ~seizure_free & ~seeg_es,
+    }
+    bits = np.zeros(len(df), dtype=np.uint16)
+    for criterion, mask in criteria.items():
+        bits[mask] |= np.uint16(criterion)
+    return bits
+
+
+def duplicate_groups(df):
+    """Per row the position of the first row of df it is an exact copy of (its own position if none)."""
+    groups = np.arange(len(df))
+    copies = np.flatnonzero(df.duplicated(keep=False).to_numpy())
+    if len(copies):
+        hashes = pd.util.hash_pandas_object(df.iloc[copies], index=False).to_numpy()
+        _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        groups[copies] = copies[first][inverse]
+    return groups
+
+
+class CriterionMasks:
+    """
+    The packed Criterion bits of one DataFrame, computed once when the database is loaded,
+    and which rows are exact copies of each other (duplicate_groups).
+
+        criteria = criterion_masks(mega_analysis_df)
+        criteria.mask(Criterion.ET)  # same as mega_analysis_df['Epilepsy Topology (ET)'].notnull()
+        criteria.any(Criterion.SEIZURE_FREE | Criterion.CONCORDANT | Criterion.SEEG_ES)
+    """
+
+    def __init__(self, df, bits=None, groups=None):
+        self.index = df.index
+        self.bits = criterion_bits(df) if bits is None else bits
+        self.groups = duplicate_groups(df) if groups is None else groups
+        self.bits.flags.writeable = False
+        self.groups.flags.writeable = False
+
+    def take(self, positions, index=None):
+        """The criteria of df.iloc[positions] (whose index can be given), without recomputing them."""
+        taken = object.__new__(CriterionMasks)
+        taken.index = self.index[positions] if index is None else index
+        taken.bits = self.bits[positions]
+        taken.groups = self.groups[positions]
+        taken.bits.flags.writeable = False
+        taken.groups.flags.writeable = False
+        return taken
+
+    def __len__(self):
+        return len(self.bits)
+
+    def mask(self, criterion):
+        """Boolean numpy array of the rows with the criterion."""
+        return (self.bits & np.uint16(criterion)) != 0
+
+    def any(self, criteria):
+        """Rows with at least one of the combined criteria."""
+        return self.mask(criteria)
+
+    def all(self, criteria):
+        """Rows with every one of the combined criteria."""
+        criteria = np.uint16(criteria)
+        return (self.bits & criteria) == criteria
+
+
+criterion_masks = per_dataframe_cache(CriterionMasks)
+
+
+def select_rows(df, mask):
+    """df.loc[mask] for a boolean numpy mask, taking its criteria from those of df rather than recomputing them."""
+    subset = df.loc[mask]
+    criterion_masks.store(subset, criterion_masks(df).take(np.flatnonzero(mask), index=subset.index))
+    return subset
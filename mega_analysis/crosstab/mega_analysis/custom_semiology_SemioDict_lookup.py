@@ -2,6 +2,8 @@ from pathlib import Path
 import re
 import yaml
 
+from .literal_prefilter import fold_case, required_literals
+
 repo_dir = Path(__file__).parent.parent.parent.parent
 resources_dir = repo_dir / 'resources'
 # excel_path = resources_dir / 'Semio2Brain Database.xlsx'
@@ -25,7 +27,14 @@ def custom_semiology_lookup(custom_semiology, nested_dict=SemioDict,
             pop-up window("Note this custom semiology term occurs in various ways within the following categories: {}".format(str(semiology_exists_already)))
 
     Alim-Marvasti 2020
+
+    Searches of the whole SemioDict go through a shared SemioDictLookup (same results, indexed).
     """
+    if nested_dict is SemioDict and not found:
+        result = semiodict_lookup()(custom_semiology)
+        if found is not None:
+            found.extend(result)
+        return result
     found = [] if found is None else found
     for k, v in nested_dict.items():
         # look for matching keys only in top level
@@ -50,3 +59,166 @@ def custom_semiology_lookup(custom_semiology, nested_dict=SemioDict,
                 found.append(k)
 
     return list(set(found))
+
+
+# characters that make the user's text a regex rather than a plain substring
+_REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+NGRAM = 3
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class SemioDictLookup:
+    """
+    custom_semiology_lookup for text typed one keystroke at a time (CustomSemiologyDialog).
+
+    Same categories as the recursive search, but every key and pattern of the SemioDict is compiled once
+    and each search only runs the regexes that can match:
+        text searched in keys/patterns: trigram index over the case folded keys and patterns,
+            narrowed to the previous keystroke's hits when the new text contains the old one (as_you_type)
+        keys/patterns searched in text: only those with a required literal present in the text,
+            or with no extractable literal
+    Text containing regex metacharacters is compiled and searched in every key and pattern, as before.
+    The index is read only, so one lookup (semiodict_lookup()) serves every caller.
+
+        lookup = SemioDictLookup()
+        lookup('epigas') -> ['Epigastric']
+        typed = lookup.as_you_type()  # one per text box
+        typed('e'), typed('ep'), typed('epi')
+    """
+
+    def __init__(self, nested_dict=None):
+        nested_dict = SemioDict if nested_dict is None else nested_dict
+        # (key, id of the key string, ids of the pattern strings, child node ids or None for leaves)
+        self.nodes = []
+        self.strings = []
+        self.roots = self._add_nodes(nested_dict)
+
+        self.regexes = [re.compile(r'(?i)' + string) for string in self.strings]
+        self.folded_strings = [fold_case(string) for string in self.strings]
+        self.ngram_index = {}
+        for i, folded in enumerate(self.folded_strings):
+            for ngram in _ngrams(folded):
+                self.ngram_index.setdefault(ngram, set()).add(i)
+
+        self.literal_index = {}
+        self.without_literal = set()
+        for i, string in enumerate(self.strings):
+            literals = required_literals(r'(?i)' + string)
+            if literals is None:
+                self.without_literal.add(i)
+                continue
+            for literal in literals:
+                self.literal_index.setdefault(literal, set()).add(i)
+
+    def _add_string(self, string):
+        self.strings.append(string)
+        return len(self.strings) - 1
+
+    def _add_nodes(self, nested_dict):
+        node_ids = []
+        for k, v in nested_dict.items():
+            node_id = len(self.nodes)
+            node_ids.append(node_id)
+            self.nodes.append(None)
+            key_string = self._add_string(k)
+            if isinstance(v, dict):
+                self.nodes[node_id] = (k, key_string, [], self._add_nodes(v))
+                continue
+            values = v if isinstance(v, list) else [v]
+            pattern_strings = [self._add_string(regex_item)
+                               for regex_item in values if isinstance(regex_item, str)]
+            self.nodes[node_id] = (k, key_string, pattern_strings, None)
+        return node_ids
+
+    def _is_plain_text(self, custom_semiology):
+        # (not str.isascii, which Python 3.6 lacks)
+        return (all(ord(c) < 128 for c in custom_semiology)
+                and not _REGEX_METACHARACTERS.intersection(custom_semiology))
+
+    def _strings_containing(self, custom_semiology, previous=None):
+        """
+        Ids of the keys/patterns the text (as a case insensitive regex) is found in, and the
+        (folded text, hits) a next keystroke can narrow its search to (None for a regex).
+        previous: the (folded text, hits) of the previous keystroke, if any.
+        """
+        regex = re.compile(r'(?i)' + custom_semiology)
+        if not self._is_plain_text(custom_semiology):
+            return {i for i, string in enumerate(self.strings) if regex.search(string)}, None
+
+        folded = fold_case(custom_semiology)
+        if previous is not None and previous[0] in folded:
+            # anything containing the new text contains the previous one
+            candidates = previous[1]
+        elif len(folded) >= NGRAM:
+            postings = sorted((self.ngram_index.get(ngram, set()) for ngram in _ngrams(folded)),
+                              key=len)
+            candidates = set.intersection(*postings)
+        else:
+            candidates = range(len(self.strings))
+        hits = {i for i in candidates if regex.search(self.strings[i])}
+        return hits, (folded, hits)
+
+    def _strings_found_in(self, custom_semiology):
+        """Ids of the keys/patterns whose regex is found in the text."""
+        folded = fold_case(custom_semiology)
+        candidates = set(self.without_literal)
+        for literal, string_ids in self.literal_index.items():
+            if literal in folded:
+                candidates |= string_ids
+        return {i for i in candidates if self.regexes[i].search(custom_semiology)}
+
+    def lookup(self, custom_semiology, previous=None):
+        """(categories found, state for the next keystroke), see _strings_containing."""
+        hits, typed = self._strings_containing(custom_semiology, previous)
+        hits = hits | self._strings_found_in(custom_semiology)
+        found = []
+        self._collect(self.roots, hits, found)
+        return list(dict.fromkeys(found)), typed
+
+    def __call__(self, custom_semiology) -> list:
+        return self.lookup(custom_semiology)[0]
+
+    def as_you_type(self):
+        """An AsYouTypeLookup for one text box, e.g. one search dialog."""
+        return AsYouTypeLookup(self)
+
+    def _collect(self, node_ids, hits, found):
+        for node_id in node_ids:
+            k, key_string, pattern_strings, children = self.nodes[node_id]
+            # as in custom_semiology_lookup, a matching key is not searched any deeper
+            if key_string in hits:
+                found.append(k)
+            elif children is not None:
+                self._collect(children, hits, found)
+            elif any(i in hits for i in pattern_strings):
+                found.append(k)
+
+
+class AsYouTypeLookup:
+    """
+    The SemioDictLookup of one text box: each keystroke's search is narrowed to the previous keystroke's hits.
+    The state of the text typed so far is its own, so text boxes (and custom_semiology_lookup) share the index
+    but never each other's previous keystroke.
+    """
+
+    def __init__(self, lookup):
+        self.semiodict_lookup = lookup
+        self._previous = None
+
+    def __call__(self, custom_semiology) -> list:
+        found, self._previous = self.semiodict_lookup.lookup(custom_semiology, self._previous)
+        return found
+
+
+_semiodict_lookup_instance = None
+
+
+def semiodict_lookup():
+    """The SemioDictLookup of the SemioDict, built on first use and shared by every caller."""
+    global _semiodict_lookup_instance
+    if _semiodict_lookup_instance is None:
+        _semiodict_lookup_instance = SemioDictLookup()
+    return _semiodict_lookup_instance
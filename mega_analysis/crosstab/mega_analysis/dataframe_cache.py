@@ -0,0 +1,44 @@
+import weakref
+
+
+class PerDataFrameCache:
+    """
+    One object per DataFrame, built by factory(df, *args) on first use and dropped with the DataFrame.
+    The object is only valid while the DataFrame keeps the same index object:
+    dropping rows in place makes a new one and the object is rebuilt.
+
+        term_mask_cache = per_dataframe_cache(TermMaskCache)
+        term_mask_cache(mega_analysis_df) is term_mask_cache(mega_analysis_df)  # True
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._entries = {}
+
+    def __call__(self, df, *args):
+        value = self.get(df)
+        if value is None:
+            value = self.factory(df, *args)
+            self.store(df, value)
+        return value
+
+    def get(self, df):
+        """The object of df if it was built (and is still valid), None otherwise."""
+        entry = self._entries.get(id(df))
+        if entry is None:
+            return None
+        df_ref, index, value = entry
+        if df_ref() is not df or df.index is not index:
+            return None
+        return value
+
+    def store(self, df, value):
+        """Make value the object of df, e.g. one derived from the object of another DataFrame."""
+        key = id(df)
+        self._entries[key] = (weakref.ref(df), df.index, value)
+        weakref.finalize(df, self._entries.pop, key, None)
+
+
+def per_dataframe_cache(factory):
+    """A PerDataFrameCache of the objects factory(df, *args) builds."""
+    return PerDataFrameCache(factory)
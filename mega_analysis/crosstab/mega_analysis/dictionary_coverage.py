@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .dictionary_reload import dictionary_key_patterns
+from .QUERY_SEMIOLOGY_BATCH import QUERY_SEMIOLOGY_BATCH
+from .semiology_dictionary import flatten_semiology_dictionary, load_semiology_dictionary
+from .term_masks import term_mask_cache
+
+
+CoverageReport = namedtuple('CoverageReport', ['keys', 'overlap', 'uncovered'])
+
+
+def dictionary_coverage(df, semiology_dict_path, membership=None,
+                        col1='Reported Semiology', col2='Semiology Category'):
+    """
+    How the lowest level SemioDict keys cover the rows of df, from the key-by-row membership matrix.
+
+    membership: a QUERY_SEMIOLOGY_BATCH of the lowest level keys over df, built if not given
+        (from the DataFrame's mask cache, so only patterns never matched before are run).
+
+    returns a CoverageReport of three DataFrames:
+        keys: indexed by key, with parent category, rows matched, rows only that key matches,
+            and the Localising and Lateralising totals of the matched rows
+        overlap: one line per pair of keys matching some of the same rows (key x key matrix product),
+            with shared_rows, the share of each key's rows and whether the keys are siblings
+        uncovered: the rows with text in col1 or col2 that no key matches
+    """
+    dictionary = load_semiology_dictionary(semiology_dict_path)
+    _, parents = dictionary_key_patterns(dictionary)
+    keys = list(flatten_semiology_dictionary(dictionary))
+    if membership is None:
+        membership = QUERY_SEMIOLOGY_BATCH(
+            df, keys, semiology_dict_path=semiology_dict_path, col1=col1, col2=col2)
+    matrix = membership.matrix
+    row_coverage = membership.row_coverage()
+    localising = df['Localising'].fillna(0).to_numpy(dtype=float)
+    lateralising = df['Lateralising'].fillna(0).to_numpy(dtype=float)
+
+    key_parents = [parents.get(key) for key in membership.terms]
+    counts = np.diff(matrix.indptr)
+    key_report = pd.DataFrame({
+        'parent': key_parents,
+        'rows': counts,
+        'unique_rows': matrix @ (row_coverage == 1).astype(np.int64),
+        'Localising': matrix @ localising,
+        'Lateralising': matrix @ lateralising,
+    }, index=pd.Index(membership.terms, name='key'))
+
+    pairs = sparse.triu(membership.overlap(), k=1).tocoo()
+    first, second, shared = pairs.row, pairs.col, pairs.data
+    overlap = pd.DataFrame({
+        'key_1': [membership.terms[i] for i in first],
+        'key_2': [membership.terms[j] for j in second],
+        'shared_rows': shared,
+        'share_of_key_1': shared / counts[first],
+        'share_of_key_2': shared / counts[second],
+        'siblings': [key_parents[i] == key_parents[j] for i, j in zip(first, second)],
+    })
+    overlap = overlap.sort_values(
+        ['shared_rows', 'key_1', 'key_2'], ascending=[False, True, True], ignore_index=True)
+
+    masks = term_mask_cache(df)
+    has_text = masks.column_text(col1).is_text | masks.column_text(col2).is_text
+    uncovered = df.loc[has_text & (row_coverage == 0), [col1, col2]]
+    return CoverageReport(key_report, overlap, uncovered)
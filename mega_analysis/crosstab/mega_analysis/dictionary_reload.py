@@ -0,0 +1,140 @@
+from collections import namedtuple
+
+from .semiology_dictionary import load_semiology_dictionary
+from .term_masks import term_mask_cache
+
+
+DictionaryChange = namedtuple('DictionaryChange', [
+    'added',  # keys only in the new dictionary
+    'removed',  # keys only in the old dictionary
+    'changed',  # keys in both whose set of patterns or parent category differ
+    'affected',  # all of the above plus their ancestor categories, old and new
+])
+
+
+def _index_keys(dictionary, parent, patterns, parents):
+    collected = []
+    for key, value in dictionary.items():
+        parents[key] = parent
+        if isinstance(value, dict):
+            key_patterns = _index_keys(value, key, patterns, parents)
+        elif isinstance(value, list):
+            key_patterns = tuple(value)
+        else:
+            key_patterns = (value,)
+        patterns[key] = key_patterns
+        collected.extend(key_patterns)
+    return tuple(collected)
+
+
+def dictionary_key_patterns(dictionary):
+    """
+    The patterns of every key of the nested SemioDict, categories included, and each key's parent.
+    A category's patterns are those of all keys under it, in the order QUERY_SEMIOLOGY uses them.
+
+    returns ({key: tuple of patterns}, {key: parent category or None})
+    """
+    patterns = {}
+    parents = {}
+    _index_keys(dictionary, None, patterns, parents)
+    return patterns, parents
+
+
+def _ancestors(key, parents):
+    parent = parents.get(key)
+    while parent is not None:
+        yield parent
+        parent = parents.get(parent)
+
+
+def diff_semiology_dictionaries(old, new):
+    """
+    Keys of the nested SemioDict that an edit from old to new changed, as a DictionaryChange of sorted lists.
+    Reordering patterns or keys is not a change: the rows a key matches stay the same.
+    """
+    old_patterns, old_parents = dictionary_key_patterns(old)
+    new_patterns, new_parents = dictionary_key_patterns(new)
+    added = sorted(set(new_patterns) - set(old_patterns))
+    removed = sorted(set(old_patterns) - set(new_patterns))
+    changed = sorted(
+        key for key in set(old_patterns) & set(new_patterns)
+        if set(old_patterns[key]) != set(new_patterns[key]) or old_parents[key] != new_parents[key]
+    )
+    affected = set(added + removed + changed)
+    for key in list(affected):
+        affected.update(_ancestors(key, old_parents))
+        affected.update(_ancestors(key, new_parents))
+    return DictionaryChange(added, removed, changed, sorted(affected))
+
+
+class SemioDictIndex:
+    """
+    Row masks of SemioDict keys over one DataFrame that follow edits of semiology_dictionary.yaml.
+
+    key_mask() matches a key's patterns case-insensitively in both columns, as QUERY_SEMIOLOGY does
+    with the dictionary, and keeps the mask. refresh() checks whether the file was modified; if so
+    only the keys the edit touched (and the categories above them) are matched again, and only the
+    cached masks of patterns that left the dictionary are dropped. Unchanged patterns keep their
+    masks in the DataFrame's mask cache, so an edit costs the yaml parse plus the edited patterns.
+
+    e.g.
+        index = SemioDictIndex(mega_analysis_df, semiology_dict_path)
+        index.row_count('Epigastric')
+        ... curator edits the yaml ...
+        change = index.refresh()  # DictionaryChange, or None if the file is unchanged
+    """
+
+    def __init__(self, df, semiology_dict_path,
+                 col1='Reported Semiology', col2='Semiology Category'):
+        self.df = df
+        self.semiology_dict_path = semiology_dict_path
+        self.columns = (col1, col2)
+        self._key_masks = {}
+        self._set_dictionary(load_semiology_dictionary(semiology_dict_path))
+
+    def _set_dictionary(self, dictionary):
+        self.dictionary = dictionary
+        self.patterns, self.parents = dictionary_key_patterns(dictionary)
+
+    def __contains__(self, key):
+        return key in self.patterns
+
+    def regexes(self, key):
+        return tuple('(?i)' + pattern for pattern in self.patterns[key])
+
+    def key_mask(self, key):
+        """Boolean numpy array over df of the rows any pattern of the key (category or lowest level) matches."""
+        if key not in self._key_masks:
+            self._key_masks[key] = term_mask_cache(self.df).mask(
+                self.regexes(key), self.columns)
+        return self._key_masks[key]
+
+    def row_count(self, key):
+        return int(self.key_mask(key).sum())
+
+    def refresh(self):
+        """
+        Bring the index in line with the yaml file if it was modified since the last look.
+        returns the DictionaryChange, or None if the file is unchanged.
+        """
+        dictionary = load_semiology_dictionary(self.semiology_dict_path)
+        if dictionary is self.dictionary:
+            return None
+        return self.update(dictionary)
+
+    def update(self, dictionary):
+        """Re-index the keys an edited nested SemioDict changed. returns the DictionaryChange."""
+        change = diff_semiology_dictionaries(self.dictionary, dictionary)
+        old_patterns = self.patterns
+        self._set_dictionary(dictionary)
+
+        current = {pattern for patterns in self.patterns.values() for pattern in patterns}
+        gone = {'(?i)' + pattern for key in change.affected if key in old_patterns
+                for pattern in old_patterns[key] if pattern not in current}
+        term_mask_cache(self.df).discard(gone)
+
+        indexed = [key for key in change.affected if self._key_masks.pop(key, None) is not None]
+        for key in indexed:
+            if key in self.patterns:
+                self.key_mask(key)
+        return change
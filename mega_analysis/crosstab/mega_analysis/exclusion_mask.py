@@ -0,0 +1,164 @@
+import numpy as np
+
+from .criteria import ET, SS, Criterion, criterion_masks
+from .exclusions import CONCORDANT, POST_OP, SEEG_ES
+from .row_filters import row_filter_masks
+
+
+GROUND_TRUTHS = [POST_OP, CONCORDANT, SEEG_ES]
+
+
+def _query_result_rows(criteria, keep, criterion):
+    """
+    The rows of keep a QUERY_SEMIOLOGY for the criterion returns, as exclude_postictals and
+    only_postictal_cases use them: matching rows except later exact copies of a matching row.
+    """
+    rows = np.flatnonzero(keep & criteria.mask(criterion))
+    _, first = np.unique(criteria.groups[rows], return_index=True)
+    result = np.zeros(len(keep), dtype=bool)
+    result[rows[first]] = True
+    return result
+
+
+def exclusion_selection(df, criteria,
+                     include_postictals=False,
+                     include_only_postictals=False,
+                     include_only_paediatric_cases=False,
+                     include_paeds_and_adults=False,
+                     include_concordance=True,
+                     include_seizure_freedom=True,
+                     include_et_topology_ez=True,
+                     include_seeg=True,
+                     include_cortical_stimulation=True,
+                     include_spontaneous_semiology=True,
+                     row_filters=(),
+                     record=None):
+    """
+    returns (keep, dropped_columns): boolean numpy array of the rows of df the flags keep, and the columns
+    the concordance exclusion drops (None with concordance included). Raises KeyError where the
+    exclusion functions would miss a dropped column.
+
+    row_filters: RowFilters applied first, as if the exclusions were applied to the rows they keep.
+    record: called as record(step, keep) after each row filter and exclusion the flags apply, in the order
+    of the exclusion functions, with the rows kept so far (see ExclusionViewCache.funnel).
+    """
+    if record is None:
+        def record(flag, keep):
+            pass
+
+    keep = np.ones(len(criteria), dtype=bool)
+    for row_filter in row_filters:
+        keep &= row_filter_masks(df).mask(row_filter)
+        record(row_filter, keep)
+    if not include_postictals:
+        keep &= ~_query_result_rows(criteria, keep, Criterion.POSTICTAL)
+        record('include_postictals', keep)
+    if include_only_postictals:
+        keep = _query_result_rows(criteria, keep, Criterion.POSTICTAL)
+        record('include_only_postictals', keep)
+    if include_only_paediatric_cases:
+        keep &= criteria.mask(Criterion.PAEDIATRIC)
+        record('include_only_paediatric_cases', keep)
+    elif not include_paeds_and_adults:
+        keep &= ~criteria.mask(Criterion.PAEDIATRIC)
+        record('include_paeds_and_adults', keep)
+
+    dropped_columns = None
+    if not include_concordance:
+        # exclusions(df, CONCORDANCE=True) excludes the post-ictals (again) ...
+        keep &= ~_query_result_rows(criteria, keep, Criterion.POSTICTAL)
+        # ... then drops the PET hypermetabolism only cases (which the missing ground truth drops below anyway)
+        keep &= ~criteria.mask(Criterion.PET_HYPERMETABOLISM_ONLY)
+        # ... and drops the columns left all null, which the ET and SS exclusions may then miss
+        has_value = df.notnull().to_numpy()[keep].any(axis=0)
+        dropped_columns = df.columns[~has_value & ~df.columns.isin(GROUND_TRUTHS)]
+        for column, included in [(ET, include_et_topology_ez), (SS, include_spontaneous_semiology)]:
+            if not included and column in dropped_columns:
+                raise KeyError(column)
+
+    # the rows keeping a ground truth once the excluded ones are set to null, one ground truth after the other
+    # (each step only nulls more, so the rows kept in the end are those with a ground truth left at the end)
+    seizure_free = criteria.mask(Criterion.SEIZURE_FREE)
+    concordant = criteria.mask(Criterion.CONCORDANT)
+    seeg_es = criteria.mask(Criterion.SEEG_ES)
+    if not include_concordance:
+        concordant[:] = False
+        keep &= seizure_free | concordant | seeg_es
+        record('include_concordance', keep)
+    if not include_seizure_freedom:
+        seizure_free[:] = False
+        keep &= seizure_free | concordant | seeg_es
+        record('include_seizure_freedom', keep)
+    if not include_seeg:
+        seeg_es &= ~criteria.mask(Criterion.SEEG_ONLY)
+        keep &= seizure_free | concordant | seeg_es
+        record('include_seeg', keep)
+    if not include_cortical_stimulation:
+        seeg_es &= ~criteria.mask(Criterion.ES)
+        keep &= seizure_free | concordant | seeg_es
+        record('include_cortical_stimulation', keep)
+
+    if not include_et_topology_ez:
+        keep &= ~criteria.mask(Criterion.ET)
+        record('include_et_topology_ez', keep)
+    if not include_spontaneous_semiology:
+        keep &= ~criteria.mask(Criterion.SS)
+        record('include_spontaneous_semiology', keep)
+    return keep, dropped_columns
+
+
+def exclusion_mask(df, criteria=None, **flags):
+    """
+    Boolean numpy array of the rows of df Semiology.remove_exclusions keeps, from the packed criteria.
+    flags are the Semiology include_* options (include_only_postictals included), with the same defaults.
+    """
+    if criteria is None:
+        criteria = criterion_masks(df)
+    keep, _ = exclusion_selection(df, criteria, **flags)
+    return keep
+
+
+def apply_exclusions(df, criteria=None, **flags):
+    """
+    Semiology.remove_exclusions in one step: the include_* flags are evaluated as a single row mask
+    over the criterion bits of df, then the kept rows are selected once.
+    The ground truths the flags exclude are set to null in the selection, as the exclusion functions do,
+    and without the concordance ground truth the columns left all null are dropped as exclusions() does.
+
+    criteria: the CriterionMasks of df, looked up (or computed) if not given.
+    Returns df itself when nothing is excluded.
+    """
+    if criteria is None:
+        criteria = criterion_masks(df)
+    keep, dropped_columns = exclusion_selection(df, criteria, **flags)
+    return select_kept_rows(df, np.flatnonzero(keep), dropped_columns, **flags)
+
+
+def changes_values(**flags):
+    """Whether the flags exclude a ground truth, which is then set to null in the kept rows."""
+    return not (flags.get('include_concordance', True)
+                and flags.get('include_seizure_freedom', True)
+                and flags.get('include_seeg', True)
+                and flags.get('include_cortical_stimulation', True))
+
+
+def select_kept_rows(df, rows, dropped_columns=None, **flags):
+    """
+    The rows of df (positions) the exclusions keep, with the excluded ground truths set to null
+    and the dropped_columns of the concordance exclusion dropped. df itself if nothing changes.
+    """
+    if len(rows) == len(df) and not changes_values(**flags):
+        return df
+
+    result = df.take(rows)
+    if dropped_columns is not None:
+        result = result.drop(columns=dropped_columns)
+        result.loc[:, CONCORDANT] = np.nan
+    if not flags.get('include_seizure_freedom', True):
+        result.loc[result[POST_OP].notnull(), POST_OP] = np.nan
+    if not flags.get('include_seeg', True):
+        result.loc[result[SEEG_ES] == 'y', SEEG_ES] = np.nan
+    if not flags.get('include_cortical_stimulation', True):
+        mask_string = result[SEEG_ES].str.contains('ES', case=False, na=False)
+        result.loc[mask_string, SEEG_ES] = np.nan
+    return result
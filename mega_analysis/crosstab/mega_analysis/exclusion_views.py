@@ -0,0 +1,182 @@
+import weakref
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .criteria import criterion_masks
+from .dataframe_cache import per_dataframe_cache
+from .exclusion_mask import exclusion_selection, select_kept_rows
+from .row_filters import normalise_row_filters
+
+
+# the include_* flags of Semiology the exclusions depend on, with their defaults
+EXCLUSION_FLAGS = OrderedDict([
+    ('include_postictals', False),
+    ('include_only_postictals', False),
+    ('include_only_paediatric_cases', False),
+    ('include_paeds_and_adults', False),
+    ('include_concordance', True),
+    ('include_seizure_freedom', True),
+    ('include_et_topology_ez', True),
+    ('include_seeg', True),
+    ('include_cortical_stimulation', True),
+    ('include_spontaneous_semiology', True),
+])
+
+MAX_VIEWS = 64
+
+_settings = dict(maxsize=MAX_VIEWS, max_bytes=None)
+_instances = weakref.WeakSet()
+
+ExclusionView = namedtuple('ExclusionView', [
+    'rows',  # positions of the kept rows, increasing
+    'dropped_columns',  # columns the concordance exclusion drops, or None
+    'steps',  # the row filters and flags of the exclusions applied, in order
+    'dropped_by',  # per row of the DataFrame: 0 if kept, else 1 + the position in steps of the exclusion dropping it
+])
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize', 'nbytes'])
+
+FunnelStep = namedtuple('FunnelStep', [
+    'step',  # 'matched', then each row filter and the flag of each exclusion applied
+    'rows',  # rows left after the step
+    'localising',  # sum of their Localising values
+    'lateralising',  # sum of their Lateralising values
+])
+
+
+def normalise_exclusion_flags(**flags):
+    """
+    The include_* flags as a tuple in EXCLUSION_FLAGS order, defaults filled in,
+    with the flags that make no difference (paeds and adults when only paediatric cases) at their default.
+    """
+    unknown = set(flags) - set(EXCLUSION_FLAGS)
+    if unknown:
+        raise ValueError('Unknown exclusion flags: {}'.format(sorted(unknown)))
+    flags = dict(EXCLUSION_FLAGS, **flags)
+    if flags['include_only_paediatric_cases']:
+        flags['include_paeds_and_adults'] = EXCLUSION_FLAGS['include_paeds_and_adults']
+    return tuple(bool(flags[name]) for name in EXCLUSION_FLAGS)
+
+
+def exclusion_key(row_filters=(), **flags):
+    """The key views are cached by: the normalised flags, then the normalised row filters."""
+    return normalise_exclusion_flags(**flags) + (normalise_row_filters(row_filters),)
+
+
+def configure_exclusion_views(maxsize=MAX_VIEWS, max_bytes=None):
+    """
+    Bound the views every ExclusionViewCache keeps: at most maxsize flag combinations and,
+    if max_bytes is given, at most that many bytes of row positions. Least recently used go first.
+    """
+    _settings.update(maxsize=maxsize, max_bytes=max_bytes)
+    for cache in list(_instances):
+        cache._evict()
+
+
+class ExclusionViewCache:
+    """
+    The rows of one DataFrame the exclusions keep, per combination of include_* flags and row filters,
+    least recently used first out.
+    Toggling an inclusion option in Slicer then re-queries every selected semiology from the same view,
+    and toggling back finds the view already there.
+
+        views = exclusion_view_cache(mega_analysis_df)
+        views.select(term_mask, include_seeg=False)  # same as apply_exclusions(mega_analysis_df.loc[term_mask], ...)
+        views.select(term_mask, row_filters=[PublicationYears(2010, None)])
+    """
+
+    def __init__(self, df):
+        self._df = weakref.ref(df)
+        self._views = OrderedDict()
+        self._values = None
+        self.hits = 0
+        self.misses = 0
+        _instances.add(self)
+
+    def view(self, row_filters=(), **flags):
+        """The ExclusionView of the flags and row filters, computed from the criterion bits on first use."""
+        key = exclusion_key(row_filters, **flags)
+        if key in self._views:
+            self.hits += 1
+            self._views.move_to_end(key)
+            return self._views[key]
+        self.misses += 1
+        df = self._df()
+        steps = []
+        dropped_by = np.zeros(len(df), dtype=np.uint8)
+
+        def record(step, keep):
+            steps.append(step)
+            dropped_by[~keep & (dropped_by == 0)] = len(steps)
+
+        keep, dropped_columns = exclusion_selection(
+            df, criterion_masks(df), row_filters=key[-1], record=record, **dict(zip(EXCLUSION_FLAGS, key)))
+        rows = np.flatnonzero(keep)
+        rows.flags.writeable = False
+        dropped_by.flags.writeable = False
+        view = ExclusionView(rows, dropped_columns, tuple(steps), dropped_by)
+        self._views[key] = view
+        self._evict()
+        return view
+
+    def select(self, term_mask=None, **flags):
+        """
+        The DataFrame apply_exclusions returns for the flags, or for the rows of the term_mask (boolean numpy array)
+        if given: the exclusions keep or drop each row on its own (exact copies of a row go together),
+        so the view of the whole DataFrame restricted to the term rows is that of the term rows.
+        Not so for the concordance exclusion, which merges whole tables: then there can be no term_mask.
+        """
+        view = self.view(**flags)
+        rows = view.rows
+        if term_mask is not None:
+            if not flags.get('include_concordance', True):
+                raise ValueError('The concordance exclusion applies to the whole DataFrame, not to term rows')
+            rows = rows[term_mask[rows]]
+        return select_kept_rows(self._df(), rows, view.dropped_columns, **flags)
+
+    def funnel(self, term_mask=None, **flags):
+        """
+        The rows of the term_mask (all rows if None) left after each exclusion of the flags, with their
+        Localising and Lateralising totals: a list of FunnelStep, starting with the rows matched.
+        Counted from the row each exclusion dropped, recorded once per view, so a funnel costs one pass
+        over the term rows. These are the rows before QUERY_SEMIOLOGY drops duplicates.
+        """
+        view = self.view(**flags)
+        if self._values is None:
+            df = self._df()
+            self._values = np.stack([
+                np.nan_to_num(df[column].to_numpy(dtype=float)) if column in df.columns else np.zeros(len(df))
+                for column in ['Localising', 'Lateralising']])
+        dropped_by = view.dropped_by if term_mask is None else view.dropped_by[term_mask]
+        values = self._values if term_mask is None else self._values[:, term_mask]
+        length = len(view.steps) + 1
+        rows = np.bincount(dropped_by, minlength=length)
+        localising = np.bincount(dropped_by, weights=values[0], minlength=length)
+        lateralising = np.bincount(dropped_by, weights=values[1], minlength=length)
+        # left after step i: the kept rows and those dropped by a later step
+        funnel = []
+        for i, step in enumerate(('matched',) + view.steps):
+            funnel.append(FunnelStep(step, int(rows[0] + rows[i + 1:].sum()),
+                                     float(localising[0] + localising[i + 1:].sum()),
+                                     float(lateralising[0] + lateralising[i + 1:].sum())))
+        return funnel
+
+    def nbytes(self):
+        return sum(view.rows.nbytes + view.dropped_by.nbytes for view in self._views.values())
+
+    def _evict(self):
+        while self._views and (
+                len(self._views) > _settings['maxsize']
+                or (_settings['max_bytes'] is not None and self.nbytes() > _settings['max_bytes'])):
+            self._views.popitem(last=False)
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, _settings['maxsize'], len(self._views), self.nbytes())
+
+    def clear(self):
+        self._views.clear()
+        self.hits = self.misses = 0
+
+
+exclusion_view_cache = per_dataframe_cache(ExclusionViewCache)
@@ -1,12 +1,43 @@
-from .QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from .QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+from .term_masks import term_mask_cache
 import numpy as np
-import pandas as pd
 from pathlib import Path
 import logging
 
 POST_OP = 'Post-op Sz Freedom (Engel Ia, Ib; ILAE 1, 2)'
 CONCORDANT = 'Concordant Neurophys & Imaging (MRI, PET, SPECT)'
 SEEG_ES = 'sEEG (y) and/or ES (ES)'  # March 2020 version
+ET = 'Epilepsy Topology (ET)'
+SS = 'Spontaneous Semiology (SS)'
+PAED = 'paediatric subgroup <7 years (0-6 yrs) y/n'
+POST_ICTALS = ['post-ictal', 'postictal', 'post ictal', 'post_ictal']
+SPECT_PET_TERMS = ['SPECT', 'PET', 'FDG-PET', 'SPECT scan', 'PET scan', 'ictal SPECT', 'interictal PET', 'inter-ictal PET',
+                   'PET+ictal SPECT', 'Surgical finding, PET hypometabolism', 'fMRI+DTI', 'PET (interictal hypometabolism)']
+
+# The *_rows functions return the rows an exclusion keeps as a boolean numpy array aligned with df,
+# reading df only: the shared database can serve any number of queries without being copied or changed.
+# The exclusion functions select those rows once (the ground truth ones also set the excluded ground truth
+# to null in their selection) and leave their input as it was.
+
+
+def _select(df, rows):
+    # take: a new frame of the selected rows only, not flagged as a copy of df
+    return df.take(np.flatnonzero(rows))
+
+
+def postictal_rows(df):
+    """
+    Rows of the QUERY_SEMIOLOGY result for the post-ictal terms: matching rows except
+    later exact copies of a matching row (the result drops duplicated rows).
+    """
+    mask = QUERY_SEMIOLOGY_MASK(df, semiology_term=POST_ICTALS, ignore_case=True, semiology_dict_path=None)
+    rows = np.zeros(len(df), dtype=bool)
+    rows[np.flatnonzero(mask)[~df.loc[mask].duplicated().to_numpy()]] = True
+    return rows
+
+
+def exclude_postictals_rows(df):
+    return ~df.index.isin(df.index[postictal_rows(df)])
 
 
 def exclude_postictals(df):
@@ -14,15 +45,30 @@ def exclude_postictals(df):
     Exclude post-ictal semiology.
     This is an individual semiology option.
     """
-    df2 = df.copy()
-    post_ictals = ['post-ictal', 'postictal', 'post ictal', 'post_ictal']
-    post_ictal_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df2, semiology_term=post_ictals,
-                                                                          ignore_case=True, semiology_dict_path=None,
-                                                                          exclude_postictals=True)
-    df2.drop(labels=post_ictal_inspection.index,
-             axis='index', inplace=True, errors='ignore')
     # logging.debug('Excluded post-ictal semiology in specific query')
-    return df2
+    return _select(df, exclude_postictals_rows(df))
+
+
+def _exclude_imaging_only(df, imaging):
+    """
+    Drop the rows of the imaging concordance (boolean array) with no seizure freedom or sEEG/ES ground truth,
+    i.e. whose only ground truth it is, and set the concordance of the other imaging rows to null.
+    """
+    only = imaging & df[POST_OP].isnull().to_numpy() & df[SEEG_ES].isnull().to_numpy()
+    df = _select(df, ~only)
+    df.iloc[np.flatnonzero(imaging[~only]), df.columns.get_loc(CONCORDANT)] = np.nan
+    return df
+
+
+def pet_hypermetabolism_rows(df):
+    """Rows whose concordance ground truth mentions PET and hypermetabolism (Criterion.PET_HYPERMETABOLISM)."""
+    masks = term_mask_cache(df)
+    return masks.mask(['(?i)PET'], (CONCORDANT, CONCORDANT)) & masks.mask(['(?i)Hyper'], (CONCORDANT, CONCORDANT))
+
+
+def spect_pet_rows(df):
+    """Rows whose concordance ground truth mentions one of the SPECT_PET_TERMS (Criterion.SPECT_PET)."""
+    return term_mask_cache(df).mask(['(?i)' + term for term in SPECT_PET_TERMS], (CONCORDANT, CONCORDANT))
 
 
 def exclusions(df,
@@ -43,70 +89,20 @@ def exclusions(df,
         df = exclude_postictals(df)
 
     if PET_hypermetabolism:
-        col1 = CONCORDANT
-        pet = ['PET']
-
-        pet_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df, semiology_term=pet,
-                                                                       ignore_case=True, semiology_dict_path=None,
-                                                                       col1=col1, col2=col1,
-                                                                       )
-
-        hyper = ['Hyper']
-        hyper_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df, semiology_term=hyper,
-                                                                         ignore_case=True, semiology_dict_path=None,
-                                                                         col1=col1, col2=col1,
-                                                                         exclude_PET_Hypermetabolism=True)
-
-        # ans is df of the intersection of the above two, keep the index otherwise it is reset
-        ans = hyper_inspection.reset_index().merge(
-            pet_inspection, how="inner").set_index('index')
-        # set them equal to np.nan
-        df.loc[list(ans.index), CONCORDANT] = np.nan
-
-        # remember, we don't want to exclude at the outset those who meet other criteria
-        # in addition to having PET hypermetabolism as a concordance ground truth:
-        ans2 = pd.merge(ans, df.loc[df[POST_OP].isnull()], how='inner')
-        ans3 = pd.merge(ans2, df.loc[df[SEEG_ES].isnull()], how='inner')
-
-        df.drop(labels=list(ans3.index), axis='index', inplace=True,
-                errors='ignore')  # drops from df altogether
-
-        # # find the indices where concordance was PET hypermetabolism but other criteria were notnull
-        # mixed_ground_truth_index = [item for item in list(ans.index) if item not in list(ans3.index)]
-        # df.loc[mixed_ground_truth_index][CONCORDANT] =  np.nan # doesn't drop, as meet other ground truth criteria. Just turn concordance to null.
-
+        df = _exclude_imaging_only(df, pet_hypermetabolism_rows(df))
         logging.debug(
             'Excluded cases if PET hypermetabolism was the only grund truth, converted rest to nulls')
 
     if SPECT_PET:
-        col1 = 'Concordant Neurophys & Imaging (MRI, PET, SPECT)'
-        col2 = col1
-        spect_pet = ['SPECT', 'PET', 'FDG-PET', 'SPECT scan', 'PET scan', 'ictal SPECT', 'interictal PET', 'inter-ictal PET',
-                     'PET+ictal SPECT', 'Surgical finding, PET hypometabolism', 'fMRI+DTI', 'PET (interictal hypometabolism)']
-        spect_pet_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df, semiology_term=spect_pet,
-                                                                             ignore_case=True, semiology_dict_path=None,
-                                                                             col1=col1, col2=col2,
-                                                                             exclude_SPECT_PET=True)
-
-        # SPECT or PET and no other ground truth criteria:
-        ans = spect_pet_inspection.reset_index().merge(
-            df.loc[df[POST_OP].isnull()], how='inner').set_index('index')
-
-        # change to nans:
-        # mixed_ground_truth_index = [item for item in list(spect_pet_inspection.index) if item not in list(ans2.index)]
-        # doesn't drop, as meet other ground truth criteria.
-        df.loc[list(ans.index), CONCORDANT] = np.nan
-
-        # drops pure spect/pet cases
-        ans2 = ans.reset_index().merge(
-            df.loc[df[SEEG_ES].isnull()], how='inner').set_index('index')
-        df.drop(labels=list(ans2.index), axis='index',
-                inplace=True, errors='ignore')
+        df = _exclude_imaging_only(df, spect_pet_rows(df))
         logging.debug(
             'Excluded cases where concordance involved SPECT or PET without MRI or other ground truths,')
         logging.debug('converted rest to nulls')
 
-    df = df.dropna(axis='columns', how='all')
+    # keep the ground truth columns even if all null (e.g. in a subset of rows), they are used below
+    ground_truths = [POST_OP, CONCORDANT, SEEG_ES]
+    all_null = df.columns[df.isnull().all() & ~df.columns.isin(ground_truths)]
+    df = df.drop(columns=all_null)
 
     # concordance after dropping columns, otherwise would drop this column
     if CONCORDANCE:
@@ -125,32 +121,44 @@ def exclude_ET(df):
     This exclusion, removes this data even though it was both ET and SS.
     (on the fly as the data grows, rather than using the pickled resources)
     """
-    ET = 'Epilepsy Topology (ET)'
-    df_exclusions_ET = df.loc[~df[ET].notnull(), :]
+    df_exclusions_ET = df.loc[exclude_ET_rows(df), :]
     return df_exclusions_ET
 
 
+def exclude_ET_rows(df):
+    return df[ET].isnull().to_numpy()
+
+
 def exclude_spontaneous_semiology(df):
     """
     Exclude cases ALL spontaneous semiology cases.
     """
-    SS = 'Spontaneous Semiology (SS)'
-    df_exclusions_SS = df.loc[~df[SS].notnull(), :]
+    df_exclusions_SS = df.loc[exclude_spontaneous_semiology_rows(df), :]
     return df_exclusions_SS
 
 
+def exclude_spontaneous_semiology_rows(df):
+    return df[SS].isnull().to_numpy()
+
+
+def _ground_truth_rows(df, excluded_column, excluded):
+    """Rows keeping at least one ground truth once the excluded values of excluded_column are set to null."""
+    rows = df[excluded_column].notnull().to_numpy() & ~excluded
+    for column in [POST_OP, CONCORDANT, SEEG_ES]:
+        if column != excluded_column:
+            rows |= df[column].notnull().to_numpy()
+    return rows
+
+
 def exclude_cortical_stimulation(df):
     """
     Exclude electrical stimulation cases when this is the only ground truth.
     will need a test to ensure all SEEG_ES = 'ES' have CES.notnull() in the data.
     if they don't, then needs a manual check. See tests.
     """
-    df_excl = df.copy()
-    mask_string = df_excl[SEEG_ES].str.contains('ES', case=False, na=False)
-    df_excl.loc[mask_string, SEEG_ES] = np.nan
-    subset = [POST_OP, CONCORDANT, SEEG_ES]
-    df_exclusions_CES = df_excl.dropna(
-        subset=subset, thresh=1, axis=0, inplace=False)
+    df_exclusions_CES = _select(df, exclude_cortical_stimulation_rows(df))
+    mask_string = df_exclusions_CES[SEEG_ES].str.contains('ES', case=False, na=False)
+    df_exclusions_CES.loc[mask_string, SEEG_ES] = np.nan
     return df_exclusions_CES
     # # second part for test later
     # CES = 'Cortical Stimulation (CS)'
@@ -158,6 +166,11 @@ def exclude_cortical_stimulation(df):
     # return df_exclusions_CES
 
 
+def exclude_cortical_stimulation_rows(df):
+    electrical_stimulation = df[SEEG_ES].str.contains('ES', case=False, na=False).to_numpy(dtype=bool)
+    return _ground_truth_rows(df, SEEG_ES, electrical_stimulation)
+
+
 def exclude_sEEG(df):
     """
     Exclude cases where the only ground truth is stereo EEG cases.
@@ -170,52 +183,60 @@ def exclude_sEEG(df):
         df.loc[df[SEEG_ES].str.contains('y', na=False), SEEG_ES] = np.nan
             will match both sEEG (y), and sEEG and cortical stimulation (ES), but not ES on its own.
     """
-    df.loc[df[SEEG_ES] == 'y', SEEG_ES] = np.nan
-    df_exclusions_sEEG = df.dropna(
-        subset=[POST_OP, CONCORDANT, SEEG_ES], thresh=1, axis=0, inplace=False)
+    df_exclusions_sEEG = _select(df, exclude_sEEG_rows(df))
+    df_exclusions_sEEG.loc[df_exclusions_sEEG[SEEG_ES] == 'y', SEEG_ES] = np.nan
     return df_exclusions_sEEG
 
 
+def exclude_sEEG_rows(df):
+    return _ground_truth_rows(df, SEEG_ES, (df[SEEG_ES] == 'y').to_numpy())
+
+
 def exclude_seizure_free(df):
     """
     Exclude seizure-free cases if this is the only ground truth.
     """
-    df.loc[df[POST_OP].notnull(), POST_OP] = np.nan
-    df_exclusion_sz_free = df.dropna(
-        subset=[POST_OP, CONCORDANT, SEEG_ES], thresh=1, axis=0, inplace=False)
+    df_exclusion_sz_free = _select(df, exclude_seizure_free_rows(df))
+    df_exclusion_sz_free.loc[df_exclusion_sz_free[POST_OP].notnull(), POST_OP] = np.nan
     return df_exclusion_sz_free
 
 
+def exclude_seizure_free_rows(df):
+    return _ground_truth_rows(df, POST_OP, df[POST_OP].notnull().to_numpy())
+
+
 def exclude_paediatric_cases(df):
     """
     Exclude ALL cases labelled as paediatric, i.e. < 7 years old.
     (If the data is mixed and undifferentiated by < 7 yrs, the data is excluded only if the label 'y' was added during data collection.
     This decision was made based on the number of cases under or above 7. If left blank, cases are included.)
     """
-    PAED = 'paediatric subgroup <7 years (0-6 yrs) y/n'
-    df_exclusions_paeds = df.loc[~(df[PAED] == 'y'), :]
+    df_exclusions_paeds = df.loc[exclude_paediatric_cases_rows(df), :]
     return df_exclusions_paeds
 
 
+def exclude_paediatric_cases_rows(df):
+    return (df[PAED] != 'y').to_numpy()
+
+
 def only_paediatric_cases(df):
     """
     Only query paediatric cases under 7 years
     """
-    PAED = 'paediatric subgroup <7 years (0-6 yrs) y/n'
-    df_only_paeds = df.loc[(df[PAED] == 'y'), :]
+    df_only_paeds = df.loc[only_paediatric_cases_rows(df), :]
     return df_only_paeds
 
 
+def only_paediatric_cases_rows(df):
+    return (df[PAED] == 'y').to_numpy()
+
+
 def only_postictal_cases(df):
     """
     Only include postictal semiology.
     This is an individual semiology option to use with any semiology beginning with "postictal" e.g. in the SemioDict YAML file.
     """
-    df2 = df.copy()
-    post_ictals = ['post-ictal', 'postictal', 'post ictal', 'post_ictal']
-    post_ictal_inspection, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(df2, semiology_term=post_ictals,
-                                                                          ignore_case=True, semiology_dict_path=None,
-                                                                          only_postictals=True)
-    only_postictal_cases = df2.loc[post_ictal_inspection.index, :]
+    # in index order, as the QUERY_SEMIOLOGY result used to select them
+    only_postictal_cases = df.loc[df.index[postictal_rows(df)].sort_values(), :]
     # logging.debug('Included only postictal semiology in query')
     return only_postictal_cases
@@ -0,0 +1,207 @@
+import itertools
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .dataframe_cache import per_dataframe_cache
+from .exclusion_views import EXCLUSION_FLAGS
+from .group_columns import full_id_vars, lateralisation_vars
+from .mapping import pivot_result_to_one_map
+from .QUERY_LATERALISATION import (
+    gifs_lat,
+    lat_exceeding_loc_mapped_to_hemisphericGIFs_adjusted_for_locs,
+    lateralised_row_to_one_map,
+    lateralising_but_not_localising,
+    lateralising_but_not_localising_GIF,
+)
+
+
+# the ground truth and prior inclusion options research users compare maps across
+SWEEP_FLAGS = ('include_seizure_freedom', 'include_concordance', 'include_seeg',
+               'include_cortical_stimulation', 'include_et_topology_ez', 'include_spontaneous_semiology')
+
+
+def flag_combinations(flags=SWEEP_FLAGS):
+    """The 2^k settings of the include_* flags as dicts, from all included to all excluded."""
+    unknown = [flag for flag in flags if flag not in EXCLUSION_FLAGS]
+    if unknown:
+        raise ValueError('Unknown exclusion flags: {}'.format(unknown))
+    if len(set(flags)) != len(flags):
+        raise ValueError('Flags to sweep given more than once: {}'.format(list(flags)))
+    return [dict(zip(flags, values)) for values in itertools.product((True, False), repeat=len(flags))]
+
+
+def _gifs_to_vector(gifs, labels):
+    """The pt #s of a pivot_result_to_one_map style DataFrame as a numpy array over labels."""
+    vector = np.zeros(len(labels))
+    if gifs is not None and len(gifs):
+        np.add.at(vector, labels.get_indexer(gifs['Gif Parcellations']),
+                  np.nan_to_num(gifs['pt #s'].to_numpy(dtype=float)))
+    return vector
+
+
+class _ColumnGifs:
+    """The gif parcellations pivot_result_to_one_map maps 1 pt in each localisation column of one_map to."""
+
+    def __init__(self, one_map):
+        self._one_map = weakref.ref(one_map)
+        self._gifs = {}
+
+    def gifs(self, column):
+        if column not in self._gifs:
+            self._gifs[column] = pivot_result_to_one_map(pd.DataFrame({column: [1.0]}), self._one_map())
+        return self._gifs[column]
+
+
+_column_gifs = per_dataframe_cache(_ColumnGifs)
+
+
+class RowGifs:
+    """
+    The gif parcellation pt #s each row of an inspect_result maps to, as QUERY_LATERALISATION and the
+    non-lateralised pipeline of Semiology.query_lateralisation map them, worked out once per row.
+    Any selection of the rows (e.g. the rows each combination of inclusion flags keeps) is then scored
+    by adding up its rows, with only the lateralising-only data folded row by row as QUERY_LATERALISATION does.
+
+        row_gifs = RowGifs(inspect_result, one_map, gif_lat_file, side_of_symptoms_signs='L')
+        row_gifs.score(np.arange(3))  # pd.Series of pt #s per gif parcellation
+    """
+
+    def __init__(self, inspect_result, one_map, gif_lat_file,
+                 side_of_symptoms_signs=None,
+                 pts_dominant_hemisphere_R_or_L=None):
+        self.inspect_result = inspect_result
+        self.one_map = one_map
+        self.side_of_symptoms_signs = side_of_symptoms_signs
+        self.pts_dominant_hemisphere_R_or_L = pts_dominant_hemisphere_R_or_L
+        self.gifs_right, self.gifs_left = gifs_lat(gif_lat_file)
+        self.id_cols = [i for i in full_id_vars() if i not in ['Localising']]
+        self.lat_vars = [i for i in lateralisation_vars() if i not in ['Lateralising']]
+
+        labels = one_map.to_numpy().ravel()
+        labels = pd.unique(np.concatenate([labels[pd.notnull(labels)], self.gifs_right, self.gifs_left]))
+        self.labels = pd.Index(labels)
+        # the hemispheric GIFs the lateralising-only data is broadcast to
+        self.right_gifs = self._lat_only_vector(1, 0)
+        self.left_gifs = self._lat_only_vector(0, 1)
+
+        self.localising = np.nan_to_num(inspect_result['Localising'].to_numpy(dtype=float))
+        self.lateralising = np.nan_to_num(inspect_result['Lateralising'].to_numpy(dtype=float))
+        self.has_lateralising = inspect_result['Lateralising'].notnull().to_numpy()
+        # without lateralisation pivot_result_to_one_map maps each localisation value to the gif parcellations
+        # of its column, so all rows are mapped at once from the gifs of a single pt in each column
+        column_gifs = _column_gifs(one_map)
+        columns = [col for col in inspect_result.columns if col in one_map]
+        values = np.nan_to_num(inspect_result[columns].to_numpy(dtype=float))
+        self.localised = np.zeros((len(inspect_result), len(self.labels)))
+        for j, col in enumerate(columns):
+            pts = _gifs_to_vector(column_gifs.gifs(col), self.labels)
+            gifs = np.flatnonzero(pts)
+            self.localised[:, gifs] += values[:, [j]] * pts[gifs]
+        self._lateralised = {}
+
+    def _lat_only_vector(self, lat_only_Right, lat_only_Left):
+        lat_only_df = lateralising_but_not_localising_GIF(None, lat_only_Right, lat_only_Left,
+                                                          self.gifs_right, self.gifs_left)
+        return _gifs_to_vector(lat_only_df, self.labels)
+
+    def _full_row(self, position):
+        return self.inspect_result.iloc[[position], :]
+
+    def lateralised(self, position):
+        """
+        (pt #s, lat_exceed_isin, lat_only) of a row with a lateralising value, see lateralised_row_to_one_map:
+        pt #s is None for rows with no localising value, whose lateralising sums are then lat_only.
+        """
+        if position not in self._lateralised:
+            full_row = self._full_row(position)
+            gifs, lat_exceed_isin = lateralised_row_to_one_map(full_row, self.id_cols, self.lat_vars,
+                                                               self.one_map, self.gifs_right, self.gifs_left,
+                                                               self.side_of_symptoms_signs,
+                                                               self.pts_dominant_hemisphere_R_or_L)
+            lat_only = None
+            if gifs is None:
+                lat_only = {col: full_row[col].sum() for col in ['IL', 'CL', 'DomH', 'NonDomH']}
+            vector = None if gifs is None else _gifs_to_vector(gifs, self.labels)
+            self._lateralised[position] = (vector, lat_exceed_isin, lat_only)
+        return self._lateralised[position]
+
+    def lateralises(self, rows):
+        """Whether QUERY_LATERALISATION maps the rows (rather than the non-lateralised pipeline)."""
+        return bool((self.side_of_symptoms_signs or self.pts_dominant_hemisphere_R_or_L)
+                    and self.lateralising[rows].sum() > 0)
+
+    def _lateralised_vectors(self, rows):
+        """The pt #s each of the rows adds when QUERY_LATERALISATION maps them, lateralising-only data aside."""
+        vectors = self.localised[rows].copy()
+        for i in np.flatnonzero(self.has_lateralising[rows]):
+            vector, _, _ = self.lateralised(rows[i])
+            vectors[i] = 0 if vector is None else vector
+        return vectors
+
+    def _lat_only(self, rows):
+        """
+        The lateralising-only pt #s (lat_only_Right, lat_only_Left) of the rows, folded row by row
+        as QUERY_LATERALISATION does: the lateralising data exceeding the localising data is scaled by the
+        totals so far, so this is not a sum over the rows.
+        """
+        lat_only_Right = 0
+        lat_only_Left = 0
+        for position in rows[self.has_lateralising[rows]]:
+            vector, lat_exceed_isin, lat_only = self.lateralised(position)
+            if vector is None:
+                lat_only_Right, lat_only_Left = lateralising_but_not_localising(
+                    lat_only, self.side_of_symptoms_signs, self.pts_dominant_hemisphere_R_or_L,
+                    lat_only_Right, lat_only_Left)
+            elif lat_exceed_isin is not None:
+                isin_left, isin_right = lat_exceed_isin
+                lat_only_Right, lat_only_Left = lat_exceeding_loc_mapped_to_hemisphericGIFs_adjusted_for_locs(
+                    self._full_row(position), self.lat_vars,
+                    self.side_of_symptoms_signs, self.pts_dominant_hemisphere_R_or_L,
+                    lat_only_Right, lat_only_Left,
+                    isin_left=isin_left, isin_right=isin_right)
+        return lat_only_Right, lat_only_Left
+
+    def _add_lat_only(self, total, rows):
+        lat_only_Right, lat_only_Left = self._lat_only(rows)
+        if (lat_only_Right != 0) | (lat_only_Left != 0):
+            total += lat_only_Right * self.right_gifs + lat_only_Left * self.left_gifs
+        return total
+
+    def score(self, rows):
+        """pd.Series of the pt #s per gif parcellation of the rows (positions, increasing)."""
+        if not self.lateralises(rows):
+            return pd.Series(self.localised[rows].sum(axis=0), index=self.labels)
+        total = self._lateralised_vectors(rows).sum(axis=0)
+        return pd.Series(self._add_lat_only(total, rows), index=self.labels)
+
+    def cumulative_scores(self, groups, n_groups):
+        """
+        The score of the rows of groups 0 to g, for each group g of the rows (e.g. their years of publication,
+        see PublicationYearIndex.year_groups; rows of group -1 are left out): pd.DataFrame of pt #s,
+        a row per group and a column per gif parcellation, all null where the rows have no
+        Localising or Lateralising data.
+
+        The mapped rows are added up per group, then prefix summed over the groups, so all groups cost
+        about as much as one score; only the lateralising-only data is folded again for each group.
+        """
+        rows = np.flatnonzero(groups >= 0)
+        groups = groups[rows]
+
+        def prefix_sums(values):
+            per_group = np.zeros((n_groups,) + values.shape[1:])
+            np.add.at(per_group, groups, values)
+            return np.cumsum(per_group, axis=0)
+
+        scores = prefix_sums(self.localised[rows])
+        lateralising = prefix_sums(self.lateralising[rows])
+        has_data = prefix_sums(self.localising[rows]) + lateralising > 0
+        if self.side_of_symptoms_signs or self.pts_dominant_hemisphere_R_or_L:
+            lateralised = np.flatnonzero(lateralising > 0)
+            if len(lateralised):
+                totals = prefix_sums(self._lateralised_vectors(rows))
+                for group in lateralised:
+                    scores[group] = self._add_lat_only(totals[group], rows[groups <= group])
+        scores[~has_data] = np.nan
+        return pd.DataFrame(scores, columns=self.labels)
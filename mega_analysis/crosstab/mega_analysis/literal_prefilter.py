@@ -0,0 +1,312 @@
+import bisect
+import logging
+import re
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .negation import split_negation
+from .parallel_matching import search_rows_in_parallel, use_process_pool
+from .semiology_dictionary import (
+    flatten_semiology_dictionary,
+    load_semiology_dictionary,
+)
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+# literals shorter than this are not selective enough to be worth a scan
+MIN_LITERAL_LENGTH = 3
+
+# joins the rows of a column into one string; never part of an extracted literal
+SEPARATOR = '\x00'
+
+# the only non-ASCII characters that match an ASCII letter under re.IGNORECASE
+# (dotted/dotless i, Kelvin sign, long s). Folding them first keeps the literal
+# scan a superset of what the case-insensitive regex can match.
+_FOLD_TABLE = {0x130: 'i', 0x131: 'i', 0x212a: 'k', 0x17f: 's'}
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def fold_case(text):
+    """Lower case text the way the literal prefilter compares it."""
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def _is_literal_char(code):
+    return 32 <= code < 127
+
+
+def _best_candidate(candidates):
+    """
+    Pick the most selective literal set: longest shortest-literal first,
+    then fewest alternatives.
+    """
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (min(map(len, c)), -len(c)))
+
+
+def _sequence_literals(items):
+    """
+    Returns a frozenset of literals at least one of which must appear in any match of
+    the parsed sequence, or None if no such set could be established.
+    """
+    candidates = []
+    run = []
+
+    def flush():
+        if run:
+            candidates.append(frozenset([''.join(run)]))
+            del run[:]
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and _is_literal_char(av):
+            run.append(chr(av).lower())
+            continue
+        flush()
+        candidate = None
+        if op is sre_constants.SUBPATTERN:
+            candidate = _sequence_literals(list(av[-1]))
+        elif op in _REPEATS:
+            minimum, _, subpattern = av
+            if minimum >= 1:
+                candidate = _sequence_literals(list(subpattern))
+        elif op is sre_constants.BRANCH:
+            branches = [_sequence_literals(list(branch)) for branch in av[1]]
+            if all(branches):
+                candidate = frozenset().union(*branches)
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            candidate = _sequence_literals(list(av))
+        # lookarounds, anchors, classes and wildcards guarantee no literal
+        if candidate:
+            candidates.append(candidate)
+    flush()
+    return _best_candidate(candidates)
+
+
+def required_literals(pattern):
+    """
+    Extract the literal substrings a regex cannot match without.
+
+    Returns a sorted tuple of lower case literals, at least ONE of which occurs
+    in every text the pattern matches (alternations give several), or None when
+    nothing selective enough could be extracted and a full scan is needed.
+
+    e.g. "((?<!no )(?<!denies ))epigastric ?(sensation)?" -> ('epigastric',)
+         "(abdo[a-z]* aura)|(abdo.* feeling)" -> (' aura', 'abdo')
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, TypeError, OverflowError, RecursionError):
+        return None
+    literals = _sequence_literals(list(parsed))
+    if not literals or min(map(len, literals)) < MIN_LITERAL_LENGTH:
+        return None
+    return tuple(sorted(literals))
+
+
+class ColumnText:
+    """
+    One text column of the DataFrame, case folded and joined into a single string,
+    so that a required literal is located in every row with a few str.find calls.
+    Non-string cells (NaN) are empty and never match, as with str.contains(na=False).
+    """
+
+    def __init__(self, series):
+        self.index = series.index
+        self.values = series.to_numpy(dtype=object)
+        folded = [fold_case(value) if isinstance(value, str) else ''
+                  for value in self.values]
+        self.is_text = np.fromiter(
+            (isinstance(value, str) for value in self.values),
+            dtype=bool, count=len(self.values))
+        self.haystack = SEPARATOR.join(folded)
+        starts = [0]
+        for text in folded[:-1]:
+            starts.append(starts[-1] + len(text) + 1)
+        self._starts = starts
+        self._positions_after = {}
+        self._negated_starts = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def rows_containing(self, literal):
+        """Sorted row positions whose folded text contains the literal."""
+        rows = []
+        starts = self._starts
+        n_rows = len(starts)
+        find = self.haystack.find
+        position = find(literal)
+        while position != -1:
+            row = bisect.bisect_right(starts, position) - 1
+            rows.append(row)
+            if row + 1 >= n_rows:
+                break
+            position = find(literal, starts[row + 1])
+        return np.array(rows, dtype=np.intp)
+
+    def positions_after(self, literal):
+        """
+        {row position: set of offsets in the row's text right after an occurrence of the literal},
+        e.g. where a negation cue such as "no " ends. Annotated once per literal, then reused.
+        """
+        if literal not in self._positions_after:
+            annotation = {}
+            starts = self._starts
+            find = self.haystack.find
+            position = find(literal)
+            while position != -1:
+                row = bisect.bisect_right(starts, position) - 1
+                annotation.setdefault(row, set()).add(
+                    position - starts[row] + len(literal))
+                position = find(literal, position + 1)
+            self._positions_after[literal] = annotation
+        return self._positions_after[literal]
+
+    def negated_starts(self, cues):
+        """{row position: offsets in the row's text preceded by any of the negation cues}, cached per cues tuple."""
+        if cues not in self._negated_starts:
+            negated = {}
+            for cue in cues:
+                for row, offsets in self.positions_after(cue).items():
+                    negated.setdefault(row, set()).update(offsets)
+            self._negated_starts[cues] = negated
+        return self._negated_starts[cues]
+
+
+class PrefilteredPattern:
+    """
+    Compiled regex plus its required literals.
+    The regex only runs on rows containing one of the literals,
+    falling back to every text row when no literal could be extracted.
+
+    A negation guard at the start of the pattern (negative lookbehinds of negation cues,
+    or the non-negated marker, see negation.split_negation) is not run by the regex engine:
+    matches starting right after a cue are skipped using the column's cue annotation.
+
+    With parallel matching enabled (parallel_matching.enable_parallel_matching) a regex
+    with many candidate rows is searched in chunks by a pool of worker processes.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.literals = required_literals(pattern)
+        stripped, self.negation_cues = split_negation(pattern)
+        self._search_regex = re.compile(stripped) if self.negation_cues else self.regex
+
+    def _non_negated_mask(self, column_text, candidates, mask):
+        search = self._search_regex.search
+        values = column_text.values
+        negated_starts = column_text.negated_starts(self.negation_cues)
+        empty = ()
+        for row in candidates:
+            text = values[row]
+            match = search(text)
+            if match is None:
+                continue
+            negated = negated_starts.get(row, empty)
+            while match is not None and match.start() in negated:
+                match = search(text, match.start() + 1)
+            mask[row] = match is not None
+
+    def candidates(self, column_text):
+        if self.literals is None:
+            return np.flatnonzero(column_text.is_text)
+        if len(self.literals) == 1:
+            return column_text.rows_containing(self.literals[0])
+        return np.unique(np.concatenate(
+            [column_text.rows_containing(literal) for literal in self.literals]))
+
+    def mask(self, column_text, return_candidates=False):
+        """
+        Boolean numpy array, same as series.str.contains(pattern, na=False).
+        return_candidates also returns the number of rows the regex was run on.
+        """
+        mask = np.zeros(len(column_text), dtype=bool)
+        candidates = self.candidates(column_text)
+        matched = None
+        if use_process_pool(len(candidates)):
+            # the workers run the original pattern, negation guard included
+            matched = search_rows_in_parallel(
+                self.pattern, column_text.values, candidates)
+        if matched is not None:
+            mask[matched] = True
+        elif self.negation_cues:
+            self._non_negated_mask(column_text, candidates, mask)
+        else:
+            search = self.regex.search
+            values = column_text.values
+            for row in candidates:
+                if search(values[row]) is not None:
+                    mask[row] = True
+        if return_candidates:
+            return mask, len(candidates)
+        return mask
+
+
+@lru_cache(maxsize=4096)
+def prefiltered_pattern(pattern):
+    """Compile once per distinct pattern string (SemioDict patterns recur across queries)."""
+    return PrefilteredPattern(pattern)
+
+
+def prefilter_report(df, semiology_dict_path,
+                     columns=('Reported Semiology', 'Semiology Category')):
+    """
+    Measure the literal prefilter per SemioDict key against the full-scan regex.
+
+    returns a DataFrame indexed by key with:
+        patterns / patterns_with_literal: how many of the key's patterns can be prefiltered
+        rows: text rows scanned per pattern and column by a full scan
+        candidate_rows: rows the regex actually ran on after the prefilter
+        matched_rows: rows matched (identical for both approaches)
+        prefilter_seconds / full_scan_seconds: timings of both approaches
+    """
+    flat_dictionary = flatten_semiology_dictionary(
+        load_semiology_dictionary(semiology_dict_path))
+    column_texts = [ColumnText(df[col]) for col in columns]
+    records = []
+    for key, patterns in flat_dictionary.items():
+        record = dict.fromkeys(
+            ['patterns', 'patterns_with_literal', 'rows', 'candidate_rows', 'matched_rows',
+             'prefilter_seconds', 'full_scan_seconds'], 0)
+        record['key'] = key
+        for pattern in patterns:
+            matcher = PrefilteredPattern(r'(?i)' + pattern)
+            record['patterns'] += 1
+            record['patterns_with_literal'] += matcher.literals is not None
+            for column_text in column_texts:
+                tic = time.perf_counter()
+                mask, n_candidates = matcher.mask(
+                    column_text, return_candidates=True)
+                record['prefilter_seconds'] += time.perf_counter() - tic
+
+                tic = time.perf_counter()
+                search = matcher.regex.search
+                full_mask = np.array(
+                    [isinstance(value, str) and search(value) is not None
+                     for value in column_text.values], dtype=bool)
+                record['full_scan_seconds'] += time.perf_counter() - tic
+
+                if not np.array_equal(mask, full_mask):
+                    logging.error(
+                        f'Literal prefilter disagrees with full scan for {key}: {pattern}')
+                record['rows'] += int(column_text.is_text.sum())
+                record['candidate_rows'] += n_candidates
+                record['matched_rows'] += int(mask.sum())
+        records.append(record)
+    report = pd.DataFrame.from_records(records, index='key')
+    return report
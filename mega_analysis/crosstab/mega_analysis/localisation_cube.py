@@ -0,0 +1,223 @@
+import weakref
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .criteria import Criterion, criterion_masks
+from .dataframe_cache import per_dataframe_cache
+from .exclusion_views import MAX_VIEWS, exclusion_key, exclusion_view_cache
+from .exclusions import CONCORDANT, POST_OP, SEEG_ES
+from .group_columns import anatomical_regions, lateralisation_vars
+from .QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+
+
+# the row attributes the Semiology filters select on: one cube cell per combination found in the data
+CUBE_CRITERIA = (Criterion.POSTICTAL | Criterion.PAEDIATRIC
+                 | Criterion.ET | Criterion.SS | Criterion.CS
+                 | Criterion.SEIZURE_FREE | Criterion.CONCORDANT | Criterion.SEEG_ES
+                 | Criterion.SEEG_ONLY | Criterion.ES)
+
+# What the flags keep, as totals reads it: the rows of the whole cells holding a regular row the flags keep
+# (a row not equal to any other but for its ground truths, which the query never drops as a duplicate),
+# less the regular rows of those cells the flags drop all the same, plus the ground truth duplicates kept,
+# one per set of rows the query sees as equal once the flags null the ground truths.
+CubeSelection = namedtuple('CubeSelection', [
+    'keep',  # boolean numpy array of the rows the exclusions keep
+    'cells',  # boolean numpy array of the cells holding a regular row the exclusions keep
+    'dropped',  # positions of the regular rows of those cells the exclusions drop: the row filters, not a cell bit
+    'special',  # positions of the ground truth duplicates the exclusions keep
+    'special_keys',  # for each, the id of the rows it equals once the flags null the ground truths
+])
+
+
+def cube_measures(df):
+    """The columns the cube sums: Localising, the lateralisation columns, then the localisation columns."""
+    measures = ['Localising'] + lateralisation_vars() + anatomical_regions(df)
+    return [column for column in dict.fromkeys(measures) if column in df.columns]
+
+
+class _GroundTruthDuplicates:
+    """
+    The rows equal to another once the ground truths are ignored: whether the query result drops them
+    as duplicates depends on which ground truths the flags set to null. Kept as codes to compare them by.
+    """
+
+    def __init__(self, df):
+        others = df.drop(columns=[POST_OP, CONCORDANT, SEEG_ES])
+        self.mask = others.duplicated(keep=False).to_numpy()
+        self.rows = np.flatnonzero(self.mask)
+        self.groups = pd.util.hash_pandas_object(others.iloc[self.rows], index=False).to_numpy()
+        # factorize codes null values as -1
+        self.codes = {column: pd.factorize(df[column].iloc[self.rows])[0] for column in [POST_OP, CONCORDANT, SEEG_ES]}
+        seeg_es = df[SEEG_ES].iloc[self.rows]
+        self.seeg_only = (seeg_es == 'y').to_numpy()
+        self.es = seeg_es.str.contains('ES', case=False, na=False).to_numpy(dtype=bool)
+
+    def keys(self, positions, **flags):
+        """
+        Ids of the rows at the positions (in self.rows) once the flags null the ground truths:
+        the query keeps the first row of each id.
+        """
+        post_op = self.codes[POST_OP].copy()
+        concordant = self.codes[CONCORDANT].copy()
+        seeg_es = self.codes[SEEG_ES].copy()
+        if not flags.get('include_seizure_freedom', True):
+            post_op[:] = -1
+        if not flags.get('include_concordance', True):
+            concordant[:] = -1
+        if not flags.get('include_seeg', True):
+            seeg_es[self.seeg_only] = -1
+        if not flags.get('include_cortical_stimulation', True):
+            seeg_es[self.es] = -1
+        keys = np.stack([self.groups[positions].view(np.int64), post_op[positions],
+                         concordant[positions], seeg_es[positions]], axis=1)
+        _, ids = np.unique(keys, axis=0, return_inverse=True)
+        return ids.ravel()
+
+
+class LocalisationCube:
+    """
+    Localising, lateralisation and localisation column sums of one DataFrame, pre-aggregated by term and by
+    cell: the combination of CUBE_CRITERIA bits of a row (ground truths, ET/SS/CS prior, paediatric, post-ictal).
+    The pre-hierarchy totals of a query are then the sum of the cells its flags keep:
+
+        cube = localisation_cube(mega_analysis_df)
+        cube.totals('Epigastric', semiology_dict_path, include_seeg=False)
+        # same as the column sums of QUERY_SEMIOLOGY(apply_exclusions(mega_analysis_df, include_seeg=False), ...)
+
+    A term's cells are a dense (cells x measures) numpy array, summed when the cube is built for the terms given
+    (the dictionary terms, see Semiology) and on first use for any other. What the flags keep is worked out once
+    per combination of flags (a CubeSelection), including the few rows the cells cannot account for, which are
+    added or taken off one by one: rows duplicating another but for their ground truths (the query drops one of
+    them only once the flags null the ground truths that differ), and the rows of kept cells the row filters drop.
+    A query then reads its cells and those rows only.
+    """
+
+    def __init__(self, df, terms=(), semiology_dict_path=None, criteria=None):
+        if criteria is None:
+            criteria = criterion_masks(df)
+        self._df = weakref.ref(df)
+        self.measures = cube_measures(df)
+        self.row_values = np.nan_to_num(df[self.measures].to_numpy(dtype=float))
+        self.cell_bits, self.row_cells = np.unique(
+            criteria.bits & np.uint16(CUBE_CRITERIA), return_inverse=True)
+        self._duplicates = _GroundTruthDuplicates(df)
+        self.special = self._duplicates.mask
+        self._regular_cells = self.row_cells[~self.special]
+        self._terms = {}
+        self._selections = OrderedDict()
+        for term in terms:
+            self._term(term, semiology_dict_path)
+
+    def __len__(self):
+        return len(self.cell_bits)
+
+    def cells(self):
+        """One row per cell: which of the CUBE_CRITERIA its rows have, and how many rows it holds."""
+        cells = pd.DataFrame({
+            criterion.name: (self.cell_bits & np.uint16(criterion)) != 0
+            for criterion in Criterion if criterion & CUBE_CRITERIA
+        })
+        cells['rows'] = np.bincount(self.row_cells, minlength=len(self))
+        return cells
+
+    def _term(self, term, semiology_dict_path=None):
+        key = (tuple(term) if isinstance(term, list) else term, semiology_dict_path)
+        if key not in self._terms:
+            mask = QUERY_SEMIOLOGY_MASK(self._df(), semiology_term=term, semiology_dict_path=semiology_dict_path)
+            values = None
+            if mask is not None:
+                regular = mask & ~self.special
+                values = np.zeros((len(self), len(self.measures)))
+                np.add.at(values, self.row_cells[regular], self.row_values[regular])
+            self._terms[key] = (mask, values)
+        return self._terms[key]
+
+    def term_cells(self, term, semiology_dict_path=None):
+        """Dense (cells x measures) numpy array of the sums of the term's rows, or None if the term has no mask."""
+        return self._term(term, semiology_dict_path)[1]
+
+    def precompute(self, terms, semiology_dict_path=None):
+        """Sum the cells of the terms now; returns them stacked, (terms x cells x measures)."""
+        return np.stack([self.term_cells(term, semiology_dict_path) for term in terms])
+
+    def discard(self, terms):
+        """Forget the dictionary terms (e.g. the keys an edit of the SemioDict affected), and lists including them."""
+        terms = set(terms)
+        for key in list(self._terms):
+            term, semiology_dict_path = key
+            matched = set(term) if isinstance(term, tuple) else {term}
+            if semiology_dict_path is not None and matched & terms:
+                del self._terms[key]
+
+    def selection(self, **flags):
+        """The CubeSelection of the include_* flags (and row_filters), computed on first use."""
+        key = exclusion_key(**flags)
+        if key in self._selections:
+            self._selections.move_to_end(key)
+            return self._selections[key]
+        keep = np.zeros(len(self.row_cells), dtype=bool)
+        keep[exclusion_view_cache(self._df()).view(**flags).rows] = True
+        regular = ~self.special
+        cells = np.zeros(len(self), dtype=bool)
+        cells[self.row_cells[keep & regular]] = True
+        dropped = np.flatnonzero(~keep & regular & cells[self.row_cells])
+        positions = np.flatnonzero(keep[self._duplicates.rows])
+        selection = CubeSelection(keep, cells, dropped, self._duplicates.rows[positions],
+                                  self._duplicates.keys(positions, **flags))
+        self._selections[key] = selection
+        while len(self._selections) > MAX_VIEWS:
+            self._selections.popitem(last=False)
+        return selection
+
+    def _distinct(self, selection, mask):
+        """The kept ground truth duplicates of the term mask the query keeps once duplicates are dropped."""
+        selected = mask[selection.special]
+        _, first = np.unique(selection.special_keys[selected], return_index=True)
+        return selection.special[selected][first]
+
+    def query_rows(self, term, semiology_dict_path=None, **flags):
+        """
+        Positions (increasing) of the rows QUERY_SEMIOLOGY returns for the term after the exclusions of the
+        include_* flags, duplicates dropped. None if the term has no mask.
+        """
+        mask, _ = self._term(term, semiology_dict_path)
+        if mask is None:
+            return None
+        selection = self.selection(**flags)
+        rows = np.flatnonzero(mask & selection.keep & ~self.special)
+        special = self._distinct(selection, mask)
+        if len(special):
+            rows = np.union1d(rows, special)
+        return rows
+
+    def totals(self, term, semiology_dict_path=None, **flags):
+        """
+        Column sums (pd.Series over the measures) of the rows QUERY_SEMIOLOGY returns for the term after the
+        exclusions of the include_* flags, before the hierarchy reversal. None if the term has no mask.
+        A sum over the cells the flags keep, corrected by the rows of the selection that are not in whole cells.
+        """
+        mask, values = self._term(term, semiology_dict_path)
+        if mask is None:
+            return None
+        selection = self.selection(**flags)
+        total = values[selection.cells].sum(axis=0)
+        dropped = selection.dropped[mask[selection.dropped]]
+        if len(dropped):
+            total -= self.row_values[dropped].sum(axis=0)
+        special = self._distinct(selection, mask)
+        if len(special):
+            total += self.row_values[special].sum(axis=0)
+        return pd.Series(total, index=self.measures)
+
+
+# localisation_cube(df, terms, semiology_dict_path): one cube per database version, summing the terms when built
+localisation_cube = per_dataframe_cache(LocalisationCube)
+
+
+def discard_cube_terms(df, terms):
+    """Forget the dictionary terms in the LocalisationCube of df, if it has one."""
+    cube = localisation_cube.get(df)
+    if cube is not None:
+        cube.discard(terms)
@@ -0,0 +1,75 @@
+import re
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+# words after which a semiology is negated, e.g. "no epigastric aura", "denies deja vu"
+NEGATION_CUES = ('denies ', 'deny ', 'no ', 'not ', 'without ')
+
+# a SemioDict pattern starting with this only matches where none of the NEGATION_CUES precede it,
+# i.e. the same as starting it with (?<!denies )(?<!deny )(?<!no )(?<!not )(?<!without ).
+# To plain re it is a comment, so the pattern stays a valid regex everywhere else.
+NON_NEGATED_MARKER = '(?#non-negated)'
+
+_INLINE_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+_LOOKBEHIND = re.compile(r'\(\?<!([^()\\]*)\)')
+_WRAPPED_CHAIN = re.compile(r'\(((?:\(\?<![^()\\]*\))+)\)')
+_BARE_CHAIN = re.compile(r'(?:\(\?<![^()\\]*\))+')
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+def split_negation(pattern):
+    """
+    Separate the negation guard at the start of a case-insensitive pattern from the rest of it.
+        "(?i)((?<!no )(?<!denies ))epigastric" -> ("(?i)epigastric", ("denies ", "no "))
+        "(?i)((?<!postictal )(?<!no ))aphasia" -> ("(?i)(?<!postictal )aphasia", ("no ",))
+        "(?i)(?#non-negated)epigastric" -> ("(?i)epigastric", NEGATION_CUES)
+
+    A match of the original pattern is then a match of the returned pattern starting where
+    none of the returned cues end. Only negative lookbehinds of NEGATION_CUES at the very start
+    are taken out; other lookbehinds stay. Patterns this cannot be done for exactly
+    (case sensitive, top level "|", backreferences) are returned unchanged with no cues.
+    """
+    unchanged = (pattern, ())
+    flags = ''
+    rest = pattern
+    while True:
+        match = _INLINE_FLAGS.match(rest)
+        if match is None:
+            break
+        flags += match.group()
+        rest = rest[match.end():]
+    if 'i' not in flags or _BACKREFERENCE.search(pattern):
+        return unchanged
+
+    cues = set()
+    if rest.startswith(NON_NEGATED_MARKER):
+        cues.update(NEGATION_CUES)
+        rest = rest[len(NON_NEGATED_MARKER):]
+
+    kept = []
+    match = _WRAPPED_CHAIN.match(rest) or _BARE_CHAIN.match(rest)
+    if match is not None:
+        for lookbehind in _LOOKBEHIND.finditer(match.group()):
+            if lookbehind.group(1).lower() in NEGATION_CUES:
+                cues.add(lookbehind.group(1).lower())
+            else:
+                kept.append(lookbehind.group())
+        rest = rest[match.end():]
+    if not cues or not rest:
+        return unchanged
+
+    stripped = flags + ''.join(kept) + rest
+    try:
+        parsed = sre_parse.parse(stripped)
+    except re.error:
+        return unchanged
+    if any(op is sre_constants.BRANCH for op, _ in parsed):
+        # the guard only applied to the first alternative
+        return unchanged
+    return stripped, tuple(sorted(cues))
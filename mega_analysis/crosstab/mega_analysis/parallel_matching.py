@@ -0,0 +1,86 @@
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+import numpy as np
+
+
+# below this many rows to search, a regex runs in this process:
+# sending the texts to the workers then costs more than the search itself
+MIN_PARALLEL_ROWS = 50000
+ROWS_PER_CHUNK = 10000
+
+_settings = dict(max_workers=0, min_rows=MIN_PARALLEL_ROWS)
+_executor = None
+
+
+def enable_parallel_matching(max_workers=None, min_rows=MIN_PARALLEL_ROWS):
+    """
+    Search large columns in chunks on a pool of worker processes (re holds the GIL, so threads would not help).
+    For synthetic databases many times the size of Semio2Brain; the real one stays below min_rows.
+
+    max_workers: number of processes, all CPUs by default. With one CPU matching stays serial.
+    min_rows: rows a regex must be run on (after the literal prefilter) before the pool is used.
+    The pool is started on first use and reused by every query until disable_parallel_matching().
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers != _settings['max_workers']:
+        disable_parallel_matching()
+    _settings.update(max_workers=max_workers, min_rows=min_rows)
+
+
+def disable_parallel_matching():
+    """Back to serial matching; shuts the worker processes down."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+    _settings['max_workers'] = 0
+
+
+def use_process_pool(n_rows):
+    """Whether searching n_rows rows goes to the process pool."""
+    return _settings['max_workers'] > 1 and n_rows >= _settings['min_rows']
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=_settings['max_workers'])
+    return _executor
+
+
+@lru_cache(maxsize=1024)
+def _compiled(pattern):
+    return re.compile(pattern)
+
+
+def _search_chunk(pattern, texts):
+    """Runs in a worker: positions within texts where the pattern is found."""
+    search = _compiled(pattern).search
+    return np.array([i for i, text in enumerate(texts) if search(text) is not None],
+                    dtype=np.intp)
+
+
+def search_rows_in_parallel(pattern, values, rows):
+    """
+    The positions among rows (row positions into values, all strings) where the regex is found,
+    searched in chunks by the process pool and merged in order.
+    returns None if the pool broke (e.g. a worker was killed), so the caller can search serially.
+    """
+    global _executor
+    n_chunks = max(_settings['max_workers'], -(-len(rows) // ROWS_PER_CHUNK))
+    chunks = np.array_split(rows, n_chunks)
+    try:
+        executor = _get_executor()
+        futures = [executor.submit(_search_chunk, pattern, values[chunk].tolist())
+                   for chunk in chunks]
+        return np.concatenate([chunk[future.result()] for chunk, future in zip(chunks, futures)])
+    except BrokenProcessPool:
+        logging.warning('Parallel matching process pool broke, searching serially')
+        _executor = None
+        return None
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .literal_prefilter import ColumnText, prefiltered_pattern
+from .semiology_dictionary import (
+    flatten_semiology_dictionary,
+    load_semiology_dictionary,
+)
+
+
+class PatternProvenance:
+    """
+    Sparse (SemioDict pattern x database row) match matrix for dictionary curation.
+
+    A row counts as matched by a pattern if the case-insensitive regex is found in either
+    'Reported Semiology' or 'Semiology Category', exactly as QUERY_SEMIOLOGY searches.
+    Answers without re-running any query:
+        rows_for_pattern: which rows a pattern catches
+        patterns_for_row: which (key, pattern) pairs caught a row
+        unmatched_rows: which rows with semiology text no key catches at all
+
+    update() takes an edited dictionary and only runs the patterns that are new,
+    so iterating on semiology_dictionary.yaml costs the changed patterns only.
+
+    e.g.
+        provenance = PatternProvenance.from_yaml(mega_analysis_df, semiology_dict_path)
+        provenance.patterns_for_row(42)
+        provenance.export('provenance.csv')
+    """
+
+    def __init__(self, df, semiology_dictionary,
+                 col1='Reported Semiology', col2='Semiology Category'):
+        self.df = df
+        self.col1 = col1
+        self.col2 = col2
+        col1_text = ColumnText(df[col1])
+        col2_text = col1_text if col2 == col1 else ColumnText(df[col2])
+        self._column_texts = (col1_text, col2_text)
+        self._has_text = col1_text.is_text | col2_text.is_text
+        self._pattern_rows = {}  # pattern string -> sorted row positions
+        self.keys = {}  # SemioDict key -> list of patterns
+        self._pairs = None
+        self._matrix = None
+        self.update(semiology_dictionary)
+
+    @classmethod
+    def from_yaml(cls, df, semiology_dict_path, **kwargs):
+        return cls(df, load_semiology_dictionary(semiology_dict_path), **kwargs)
+
+    def _match(self, pattern):
+        matcher = prefiltered_pattern(r'(?i)' + pattern)
+        col1_text, col2_text = self._column_texts
+        mask = matcher.mask(col1_text)
+        if col2_text is not col1_text:
+            mask |= matcher.mask(col2_text)
+        return np.flatnonzero(mask)
+
+    def update(self, semiology_dictionary):
+        """
+        Bring the matrix in line with an edited (nested or already flattened) SemioDict.
+        Only patterns not matched before are run; patterns no longer in the dictionary are dropped.
+
+        returns the sorted list of pattern strings that were (re)matched.
+        """
+        if any(isinstance(value, dict) for value in semiology_dictionary.values()):
+            semiology_dictionary = flatten_semiology_dictionary(
+                semiology_dictionary)
+        keys = {key: list(patterns) if isinstance(patterns, list) else [patterns]
+                for key, patterns in semiology_dictionary.items()}
+        wanted = {pattern for patterns in keys.values() for pattern in patterns}
+
+        new_patterns = sorted(wanted - set(self._pattern_rows))
+        for pattern in new_patterns:
+            self._pattern_rows[pattern] = self._match(pattern)
+        for pattern in set(self._pattern_rows) - wanted:
+            del self._pattern_rows[pattern]
+
+        self.keys = keys
+        self._pairs = None
+        self._matrix = None
+        return new_patterns
+
+    @property
+    def pairs(self):
+        """(key, pattern) labels of the matrix rows, in dictionary order."""
+        if self._pairs is None:
+            self._pairs = [(key, pattern)
+                           for key, patterns in self.keys.items()
+                           for pattern in patterns]
+        return self._pairs
+
+    def to_sparse(self):
+        """
+        returns the boolean scipy.sparse.csr_matrix of shape (len(pairs), len(df)).
+        Matrix rows follow self.pairs, columns follow df.index.
+        """
+        if self._matrix is None:
+            indices = [self._pattern_rows[pattern]
+                       for _, pattern in self.pairs]
+            indptr = np.zeros(len(indices) + 1, dtype=np.intp)
+            indptr[1:] = np.cumsum([len(rows) for rows in indices])
+            indices = (np.concatenate(indices) if indices
+                       else np.array([], dtype=np.intp))
+            data = np.ones(len(indices), dtype=bool)
+            self._matrix = sparse.csr_matrix(
+                (data, indices, indptr), shape=(len(indptr) - 1, len(self.df)))
+            self._matrix_by_row = self._matrix.T.tocsr()
+        return self._matrix
+
+    def rows_for_pattern(self, pattern):
+        """Row labels (df.index) matched by a single pattern string."""
+        return self.df.index[self._pattern_rows[pattern]]
+
+    def rows_for_key(self, key):
+        """Row labels matched by any pattern of a SemioDict key."""
+        positions = [self._pattern_rows[pattern] for pattern in self.keys[key]]
+        positions = np.unique(np.concatenate(positions)) if positions else []
+        return self.df.index[positions]
+
+    def patterns_for_row(self, row):
+        """List of (key, pattern) pairs matching the row with label `row`."""
+        self.to_sparse()
+        position = self.df.index.get_loc(row)
+        pairs = self.pairs
+        return [pairs[i] for i in self._matrix_by_row[position].indices]
+
+    def unmatched_rows(self):
+        """Labels of rows with semiology text that no SemioDict key matches."""
+        matched = np.zeros(len(self.df), dtype=bool)
+        for rows in self._pattern_rows.values():
+            matched[rows] = True
+        return self.df.index[self._has_text & ~matched]
+
+    def to_frame(self):
+        """Long format: one line per (key, pattern, row) match with the row's text."""
+        records = []
+        for key, pattern in self.pairs:
+            for row in self.rows_for_pattern(pattern):
+                records.append((key, pattern, row))
+        frame = pd.DataFrame.from_records(
+            records, columns=['Key', 'Pattern', 'Row'])
+        text = self.df[[self.col1, self.col2]]
+        return frame.join(text, on='Row')
+
+    def export(self, path, unmatched_path=None):
+        """Write the long format matches to csv, and optionally the unmatched rows."""
+        self.to_frame().to_csv(path, index=False)
+        if unmatched_path is not None:
+            self.df.loc[self.unmatched_rows(), [self.col1, self.col2]].to_csv(
+                unmatched_path, index_label='Row')
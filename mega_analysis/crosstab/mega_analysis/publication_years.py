@@ -0,0 +1,49 @@
+import numpy as np
+
+from .dataframe_cache import per_dataframe_cache
+
+
+# the year of publication of a row is the first four digits of its Reference,
+# as Sankey_Functions.extract_year_of_publication parses it
+YEAR_PATTERN = r'(?P<Year>\d\d\d\d)'
+NO_YEAR = -1
+
+
+class PublicationYearIndex:
+    """
+    The year of publication of each row of one DataFrame, parsed once, and the rows sorted by year,
+    so the rows published in a range of years are a slice, and totals over the rows published up to each year
+    are prefix sums over per-year totals (see RowGifs.cumulative_scores).
+
+        years = publication_year_index(mega_analysis_df)
+        years.rows_between(2005, 2010)  # positions of the rows published from 2005 to 2010, by year
+    """
+
+    def __init__(self, df):
+        years = df['Reference'].str.extract(YEAR_PATTERN, expand=False)
+        self.years = years.fillna(NO_YEAR).astype('int32').to_numpy()
+        self.years.flags.writeable = False
+        # rows by year, then by position
+        self.order = np.argsort(self.years, kind='stable')
+        self.order.flags.writeable = False
+        self._sorted_years = self.years[self.order]
+
+    def rows_between(self, first=None, last=None):
+        """Positions of the rows published from the first to the last year (None for no bound), by year."""
+        start = np.searchsorted(self._sorted_years, NO_YEAR + 1 if first is None else max(first, NO_YEAR + 1))
+        stop = len(self._sorted_years) if last is None else np.searchsorted(self._sorted_years, last, side='right')
+        return self.order[start:max(start, stop)]
+
+    def year_groups(self, rows):
+        """
+        (years, groups): the distinct years of publication of the rows (positions), increasing,
+        and the position in years of the year of each row, -1 for rows without a year.
+        """
+        years = self.years[rows]
+        has_year = years != NO_YEAR
+        groups = np.full(len(years), -1)
+        distinct, groups[has_year] = np.unique(years[has_year], return_inverse=True)
+        return distinct, groups
+
+
+publication_year_index = per_dataframe_cache(PublicationYearIndex)
@@ -0,0 +1,162 @@
+import math
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from .literal_prefilter import ColumnText, PrefilteredPattern, required_literals
+from .semiology_dictionary import (
+    flatten_semiology_dictionary,
+    load_semiology_dictionary,
+)
+
+
+# exponent of time ~ length**exponent above which a pattern is flagged
+SUPER_LINEAR_EXPONENT = 1.5
+# synthetic inputs grow geometrically from the first to the last length
+SYNTHETIC_LENGTHS = (8, 4000)
+LENGTH_RATIO = 1.5
+# a single search slower than this stops the ladder: the pattern is flagged
+SEARCH_BUDGET_SECONDS = 0.05
+
+
+def _best_time(function, repeats=3):
+    """Minimum wall time of several runs, the least noisy estimate."""
+    best = math.inf
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - tic)
+    return best
+
+
+def _search_time(regex, text, repeats=3):
+    """Seconds per regex.search(text), looping short searches above timer resolution."""
+    loops = 1
+    while True:
+        elapsed = _best_time(
+            lambda: [regex.search(text) for _ in range(loops)], repeats)
+        if elapsed >= 1e-3:
+            return elapsed / loops
+        loops *= 10
+
+
+def synthetic_inputs(pattern, length):
+    """
+    Long texts built from the pattern's own literals that almost, but do not, match.
+    These are the inputs that make nested optional groups and ".*" alternations backtrack:
+    every repeated literal is a new starting point for the regex engine.
+    """
+    literals = required_literals(pattern) or ()
+    words = [literal.strip() for literal in literals if literal.strip()]
+    words += [word[:-1] for word in words if len(word) > 1]
+    letters = ''.join(sorted(set(re.sub(r'[^a-z]', '', pattern.lower())))) or 'a'
+    seeds = [word + ' ' for word in words] + [letters + ' ', 'a']
+    inputs = []
+    for seed in seeds:
+        text = (seed * (length // len(seed) + 1))[:length]
+        inputs.append(text)
+    return inputs
+
+
+def _probe_time(regex, text):
+    """Wall time of a single regex.search(text)."""
+    return _best_time(lambda: regex.search(text), repeats=1)
+
+
+def backtracking_growth(pattern, lengths=SYNTHETIC_LENGTHS, search_time=None):
+    """
+    Estimate how the search time of a pattern grows with input length on synthetic near-miss inputs.
+
+    Lengths grow geometrically and stop as soon as one search exceeds SEARCH_BUDGET_SECONDS,
+    so exponential patterns are caught on short inputs instead of hanging the profiler.
+
+    search_time: called as search_time(regex, text) for the seconds one search takes,
+    instead of timing it (e.g. a cost model, to test the estimate without the clock).
+
+    returns the worst exponent k of time ~ length**k over the synthetic inputs
+    (math.inf if the budget was exceeded before reaching the longest length).
+    Around 1 is linear; 2 or more means catastrophic-looking backtracking.
+    """
+    probe_time = _probe_time if search_time is None else search_time
+    if search_time is None:
+        search_time = _search_time
+    regex = re.compile(pattern)
+    shortest, longest = lengths
+    ladder = [shortest]
+    while ladder[-1] < longest:
+        ladder.append(min(longest, int(ladder[-1] * LENGTH_RATIO) + 1))
+
+    n_inputs = len(synthetic_inputs(pattern, shortest))
+    worst = 0.0
+    for i in range(n_inputs):
+        # single probes up the ladder, so a blow up is caught on a short input
+        for length in ladder:
+            text = synthetic_inputs(pattern, length)[i]
+            if probe_time(regex, text) > SEARCH_BUDGET_SECONDS:
+                return math.inf
+        # then time the longest input against one a quarter of its length
+        reference_length = max(shortest, longest // 4)
+        seconds = search_time(regex, synthetic_inputs(pattern, longest)[i])
+        reference_seconds = search_time(
+            regex, synthetic_inputs(pattern, reference_length)[i])
+        if reference_seconds <= 0 or seconds <= 0:
+            continue
+        exponent = (math.log(seconds / reference_seconds)
+                    / math.log(longest / reference_length))
+        worst = max(worst, exponent)
+    return worst
+
+
+def profile_semiology_dictionary(df, semiology_dict_path,
+                                 columns=('Reported Semiology',
+                                          'Semiology Category'),
+                                 check_backtracking=True,
+                                 search_time=None):
+    """
+    Rank SemioDict patterns by matching cost against the real text columns.
+
+    For each (key, pattern):
+        full_scan_seconds: time to search the regex in every text row of all columns
+        prefiltered_seconds: same, with the literal prefilter QUERY_SEMIOLOGY uses
+        matched_rows: rows matched in any of the columns
+        growth_exponent / super_linear: see backtracking_growth (with search_time)
+
+    returns a DataFrame sorted by full_scan_seconds, most expensive first.
+    """
+    flat_dictionary = flatten_semiology_dictionary(
+        load_semiology_dictionary(semiology_dict_path))
+    column_texts = [ColumnText(df[col]) for col in columns]
+    records = []
+    for key, patterns in flat_dictionary.items():
+        for pattern in patterns:
+            matcher = PrefilteredPattern(r'(?i)' + pattern)
+            search = matcher.regex.search
+            matched = np.zeros(len(df), dtype=bool)
+            full_scan_seconds = 0.0
+            prefiltered_seconds = 0.0
+            for column_text in column_texts:
+                texts = column_text.values[column_text.is_text]
+                full_scan_seconds += _best_time(
+                    lambda: [search(text) for text in texts])
+                prefiltered_seconds += _best_time(
+                    lambda: matcher.mask(column_text))
+                matched |= matcher.mask(column_text)
+            record = dict(
+                key=key,
+                pattern=pattern,
+                full_scan_seconds=full_scan_seconds,
+                prefiltered_seconds=prefiltered_seconds,
+                has_literal=matcher.literals is not None,
+                matched_rows=int(matched.sum()),
+            )
+            if check_backtracking:
+                exponent = backtracking_growth(matcher.pattern, search_time=search_time)
+                record['growth_exponent'] = exponent
+                record['super_linear'] = exponent > SUPER_LINEAR_EXPONENT
+            records.append(record)
+    report = pd.DataFrame.from_records(records)
+    report = report.sort_values(
+        'full_scan_seconds', ascending=False).reset_index(drop=True)
+    return report
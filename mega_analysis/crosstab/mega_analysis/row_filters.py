@@ -0,0 +1,117 @@
+import abc
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+from .dataframe_cache import per_dataframe_cache
+from .publication_years import NO_YEAR, publication_year_index
+from .term_masks import term_mask_cache
+
+
+class RowFilter(abc.ABC):
+    """
+    A filter on the rows of the database beyond the include_* flags, e.g. PublicationYears(2010, None).
+    Row filters are hashable values: the exclusions apply them as row masks computed once per DataFrame,
+    and the rows kept are cached per flags and row filters (see ExclusionViewCache).
+    Unlike plain tuples, filters of different kinds with the same fields are not equal.
+    Subclasses are namedtuples implementing mask.
+    """
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        # tuple.__new__ skips the abstract methods check of object.__new__
+        if cls.__abstractmethods__:
+            raise TypeError("Can't instantiate abstract row filter {} with abstract methods {}".format(
+                cls.__name__, ', '.join(sorted(cls.__abstractmethods__))))
+        return super().__new__(cls, *args, **kwargs)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self).__name__, tuple(self)))
+
+    @abc.abstractmethod
+    def mask(self, df):
+        """Boolean numpy array of the rows of df the filter keeps."""
+
+
+class PublicationYears(RowFilter, namedtuple('PublicationYears', ['first', 'last', 'include_undated'])):
+    """
+    Rows published from the first to the last year, both included; None for no bound.
+    Rows whose Reference has no year are dropped, even with no bounds, unless include_undated.
+    """
+    __slots__ = ()
+
+    def __new__(cls, first=None, last=None, include_undated=False):
+        if first is not None and last is not None and first > last:
+            raise ValueError('First year {} after last year {}'.format(first, last))
+        return super().__new__(cls, first, last, bool(include_undated))
+
+    def mask(self, df):
+        years = publication_year_index(df)
+        keep = np.zeros(len(df), dtype=bool)
+        keep[years.rows_between(self.first, self.last)] = True
+        if self.include_undated:
+            keep |= years.years == NO_YEAR
+        return keep
+
+
+class ReferenceMatches(RowFilter, namedtuple('ReferenceMatches', ['pattern'])):
+    """Rows whose Reference the regex pattern is found in (str.contains), e.g. '(?i)kotagal'."""
+    __slots__ = ()
+
+    def mask(self, df):
+        return term_mask_cache(df).regex_mask(self.pattern, 'Reference')
+
+
+class MinimumPatients(RowFilter, namedtuple('MinimumPatients', ['patients'])):
+    """Rows of studies including at least this many patients ('Tot Pt included')."""
+    __slots__ = ()
+
+    def mask(self, df):
+        return (df['Tot Pt included'] >= self.patients).to_numpy()
+
+
+class OtherFactors(RowFilter, namedtuple('OtherFactors', ['present'])):
+    """Rows with (present=True) or without (present=False) other factors, e.g. antibodies or genetic mutations."""
+    __slots__ = ()
+
+    def __new__(cls, present=True):
+        return super().__new__(cls, bool(present))
+
+    def mask(self, df):
+        return df['Other factors (e.g. Abs, genetic mutations)'].notnull().to_numpy() == self.present
+
+
+def normalise_row_filters(row_filters=()):
+    """The row filters as a tuple without repeats, in a stable order (their order makes no difference)."""
+    row_filters = set(row_filters)
+    unknown = [row_filter for row_filter in row_filters if not isinstance(row_filter, RowFilter)]
+    if unknown:
+        raise ValueError('Not row filters: {}'.format(unknown))
+    return tuple(sorted(row_filters, key=repr))
+
+
+class RowFilterMasks:
+    """
+    The row filter masks of one DataFrame, computed once and reused by every exclusion view of that DataFrame.
+    """
+
+    def __init__(self, df):
+        self._df = weakref.ref(df)
+        self._masks = {}
+
+    def mask(self, row_filter):
+        if row_filter not in self._masks:
+            mask = np.array(row_filter.mask(self._df()), dtype=bool)
+            mask.flags.writeable = False
+            self._masks[row_filter] = mask
+        return self._masks[row_filter]
+
+
+row_filter_masks = per_dataframe_cache(RowFilterMasks)
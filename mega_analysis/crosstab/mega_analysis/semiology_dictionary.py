@@ -0,0 +1,61 @@
+import os
+
+import yaml
+
+
+# libyaml's loader parses the file ten times faster, with the same all-string result
+_Loader = getattr(yaml, 'CBaseLoader', yaml.BaseLoader)
+_parsed_files = {}
+
+
+def read_semiology_yaml(semiology_dict_path):
+    """
+    The whole SemioDict yaml file parsed with the BaseLoader (every value a string).
+    The result is kept until the file is modified (a new object is returned after an edit);
+    treat it as read only.
+    """
+    stat = os.stat(semiology_dict_path)
+    key = os.path.abspath(semiology_dict_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsed_files.get(key)
+    if cached is None or cached[0] != version:
+        with open(semiology_dict_path) as file:
+            semiology_dictionary = yaml.load(file, Loader=_Loader)
+        cached = (version, semiology_dictionary)
+        _parsed_files[key] = cached
+    return cached[1]
+
+
+def load_semiology_dictionary(semiology_dict_path):
+    """
+    Read the SemioDict yaml file and return the nested dictionary under the top level "semiology" key.
+    Uses the same BaseLoader as QUERY_SEMIOLOGY so every value is read as a string.
+    """
+    return read_semiology_yaml(semiology_dict_path)['semiology']
+
+
+def flatten_semiology_dictionary(dictionary):
+    """
+    Flatten the nested SemioDict to {lowest level key: [regex patterns]}.
+    Category keys (e.g. "auras", "motor") are not returned, only the keys holding patterns.
+    A single regex string value is returned as a one item list.
+    """
+    flat = {}
+    for key, value in dictionary.items():
+        if isinstance(value, dict):
+            flat.update(flatten_semiology_dictionary(value))
+        elif isinstance(value, list):
+            flat[key] = list(value)
+        else:
+            flat[key] = [value]
+    return flat
+
+
+def all_dictionary_keys(dictionary):
+    """All keys of the nested SemioDict at every level, categories included."""
+    keys = []
+    for key, value in dictionary.items():
+        keys.append(key)
+        if isinstance(value, dict):
+            keys.extend(all_dictionary_keys(value))
+    return keys
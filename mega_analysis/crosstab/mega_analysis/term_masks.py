@@ -0,0 +1,61 @@
+import weakref
+
+import numpy as np
+
+from .dataframe_cache import per_dataframe_cache
+from .literal_prefilter import ColumnText, prefiltered_pattern
+
+
+class TermMaskCache:
+    """
+    Folded text columns and regex row masks of one DataFrame, computed once and reused
+    by every query on that DataFrame (QUERY_SEMIOLOGY, QUERY_BOOLEAN, QUERY_INTERSECTION_TERMS).
+
+    Masks are numpy boolean arrays aligned with df.index.
+    Text columns are assumed not to be edited in place (the exclusions never do).
+    """
+
+    def __init__(self, df):
+        self._df = weakref.ref(df)
+        self.index = df.index
+        self._column_texts = {}
+        self._regex_masks = {}
+        self._masks = {}
+
+    def column_text(self, col):
+        if col not in self._column_texts:
+            self._column_texts[col] = ColumnText(self._df()[col])
+        return self._column_texts[col]
+
+    def regex_mask(self, regex, col):
+        """Rows where the regex is found in one column (str.contains with na=False)."""
+        key = (regex, col)
+        if key not in self._regex_masks:
+            self._regex_masks[key] = prefiltered_pattern(
+                regex).mask(self.column_text(col))
+        return self._regex_masks[key]
+
+    def mask(self, regexes, columns):
+        """Rows where ANY of the regexes is found in ANY of the columns."""
+        key = (tuple(regexes), tuple(columns))
+        if key not in self._masks:
+            mask = np.zeros(len(self.index), dtype=bool)
+            for regex in regexes:
+                for col in dict.fromkeys(columns):
+                    mask |= self.regex_mask(regex, col)
+            mask.flags.writeable = False
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def discard(self, regexes):
+        """Forget the masks of these regexes, e.g. patterns removed from the SemioDict."""
+        regexes = set(regexes)
+        if not regexes:
+            return
+        for key in [key for key in self._regex_masks if key[0] in regexes]:
+            del self._regex_masks[key]
+        for key in [key for key in self._masks if regexes.intersection(key[0])]:
+            del self._masks[key]
+
+
+term_mask_cache = per_dataframe_cache(TermMaskCache)
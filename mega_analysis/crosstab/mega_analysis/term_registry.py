@@ -0,0 +1,161 @@
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+
+from .semiology_dictionary import load_semiology_dictionary
+
+
+TermMetadata = namedtuple('TermMetadata', [
+    'term',
+    'possible_lateralities',  # tuple of laterality values: 'L', 'R' and/or None (neutral)
+    'postictal_only',
+    'in_dictionary',  # the term has its own SemioDict values (a lowest level key)
+    'parent',  # SemioDict category the key is under, None if top level or not a key
+])
+
+LEFT, RIGHT, NEUTRAL = 'L', 'R', None
+
+LIST_FILENAMES = dict(
+    neutral_only='semiologies_neutral_only.txt',
+    neutral_also='semiologies_neutral_also.txt',
+    postictal_neutral_only='semiologies_postictalsonly_neutral_only.txt',
+    postictal_neutral_also='semiologies_postictalsonly_neutral_also.txt',
+)
+
+
+def dictionary_version(semiology_dict_path, other_paths=()):
+    """sha256 of the dictionary file (and any other resource files), changes whenever their content does."""
+    hasher = hashlib.sha256()
+    for path in (semiology_dict_path, *other_paths):
+        hasher.update(Path(path).read_bytes())
+    return hasher.hexdigest()
+
+
+def _list_paths(resources_dir):
+    resources_dir = Path(resources_dir)
+    return {name: resources_dir / filename for name, filename in LIST_FILENAMES.items()}
+
+
+class TermRegistry:
+    """
+    Everything known about each semiology term before querying, built once per dictionary version:
+    possible lateralities, postictal only flag, dictionary membership and parent category
+    (and the number of database rows it matches, computed on first use).
+    All lookups are dictionary or set lookups.
+
+    Terms absent from the dictionary and resource lists get the free text defaults:
+    left or right, not postictal only, not in the dictionary, no parent.
+    """
+
+    def __init__(self, semiology_dictionary, neutral_only, neutral_also,
+                 postictal_neutral_only, postictal_neutral_also, version=None):
+        self.version = version
+        self.parents = {}
+        self.leaf_terms = []
+        self._add_keys(semiology_dictionary, parent=None)
+        self.dictionary_terms = frozenset(self.leaf_terms)
+        self.postictal_terms = frozenset(postictal_neutral_only + postictal_neutral_also)
+        neutral_only = frozenset(neutral_only + postictal_neutral_only)
+        neutral_also = frozenset(neutral_also + postictal_neutral_also)
+        self.known_terms = frozenset(
+            self.leaf_terms).union(neutral_only, neutral_also, self.postictal_terms)
+
+        self._metadata = {}
+        for term in self.known_terms:
+            lateralities = [LEFT, RIGHT]
+            if term in neutral_only:
+                lateralities = [NEUTRAL]
+            if term in neutral_also:
+                lateralities.append(NEUTRAL)
+            self._metadata[term] = TermMetadata(
+                term=term,
+                possible_lateralities=tuple(lateralities),
+                postictal_only=term in self.postictal_terms,
+                in_dictionary=term in self.dictionary_terms,
+                parent=self.parents.get(term),
+            )
+        self._row_counts = None
+        self._row_counts_df = None
+
+    def _add_keys(self, dictionary, parent):
+        for key, value in dictionary.items():
+            self.parents[key] = parent
+            if isinstance(value, dict):
+                self._add_keys(value, parent=key)
+            else:
+                self.leaf_terms.append(key)
+
+    @classmethod
+    def from_resources(cls, resources_dir, semiology_dict_path, version=None):
+        """
+        Registry of the SemioDict yaml file and the laterality lists in resources_dir.
+        version: the dictionary_version of these files, if already computed.
+        """
+        list_paths = _list_paths(resources_dir)
+        lists = {name: path.read_text().splitlines()
+                 for name, path in list_paths.items()}
+        if version is None:
+            version = dictionary_version(semiology_dict_path, list_paths.values())
+        return cls(
+            load_semiology_dictionary(semiology_dict_path),
+            version=version,
+            **lists,
+        )
+
+    def __contains__(self, term):
+        return term in self.known_terms
+
+    def metadata(self, term):
+        metadata = self._metadata.get(term)
+        if metadata is None:
+            metadata = TermMetadata(
+                term=term,
+                possible_lateralities=(LEFT, RIGHT),
+                postictal_only=False,
+                in_dictionary=False,
+                parent=self.parents.get(term),
+            )
+        return metadata
+
+    def possible_lateralities(self, term):
+        return self.metadata(term).possible_lateralities
+
+    def is_postictal_only(self, term):
+        return term in self.postictal_terms
+
+    def in_dictionary(self, term):
+        return term in self.dictionary_terms
+
+    def parent(self, term):
+        return self.parents.get(term)
+
+    def row_count(self, term, df, semiology_dict_path):
+        """
+        Rows of df the dictionary term matches, before any exclusion (None for other terms).
+        All dictionary terms are counted together on first use for a df, with one QUERY_SEMIOLOGY_BATCH.
+        """
+        if self._row_counts is None or self._row_counts_df is not df:
+            from .QUERY_SEMIOLOGY_BATCH import QUERY_SEMIOLOGY_BATCH
+            membership = QUERY_SEMIOLOGY_BATCH(
+                df, sorted(self.dictionary_terms), semiology_dict_path=semiology_dict_path)
+            self._row_counts = membership.counts().to_dict()
+            self._row_counts_df = df
+        return self._row_counts.get(term)
+
+
+# the latest registry of each dictionary file
+_registries = {}
+
+
+def get_term_registry(resources_dir, semiology_dict_path):
+    """
+    The TermRegistry of the resource files as they are now.
+    The latest registry of each dictionary file is kept, so one is only built when the files' content changes.
+    """
+    version = dictionary_version(semiology_dict_path, _list_paths(resources_dir).values())
+    key = str(Path(semiology_dict_path).resolve())
+    registry = _registries.get(key)
+    if registry is None or registry.version != version:
+        registry = TermRegistry.from_resources(resources_dir, semiology_dict_path, version=version)
+        _registries[key] = registry
+    return registry
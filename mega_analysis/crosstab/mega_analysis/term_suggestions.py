@@ -0,0 +1,114 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .literal_prefilter import fold_case
+from .semiology_dictionary import load_semiology_dictionary
+
+
+Suggestion = namedtuple('Suggestion', ['text', 'source', 'score'])
+
+# below this trigram similarity a suggestion is more noise than help
+MIN_SCORE = 0.45
+NGRAM = 3
+
+_LOOKBEHIND = re.compile(r'\(\?<?[!=][^)]*\)')
+_NOT_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+
+def normalise_text(text):
+    """Case folded words separated by single spaces; punctuation and regex syntax become spaces."""
+    return _NOT_ALPHANUMERIC.sub(' ', fold_case(text)).strip()
+
+
+def pattern_words(pattern):
+    """The words a SemioDict regex is written with, e.g. "(?<!no )epigastric ?(sensation)?" -> "epigastric sensation"."""
+    return normalise_text(_LOOKBEHIND.sub(' ', pattern))
+
+
+def character_ngrams(text):
+    """Character trigrams of the normalised text, padded so word starts and ends count."""
+    padded = f' {text} '
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class TermSuggester:
+    """
+    Ranked near matches for a semiology term nothing matched, e.g. a misspelling or a missing hyphen.
+
+    Entries are SemioDict keys, the words of their patterns (suggested as the key they belong to)
+    and the distinct "Reported Semiology" values of the database. Each entry's character trigrams
+    go in an inverted index, so suggest() scores only the entries sharing a trigram with the term:
+        score = 2 * shared trigrams / (trigrams of term + trigrams of entry)   (Dice coefficient)
+    """
+
+    def __init__(self, entries):
+        """entries: iterable of (text to suggest, source, text to compare against)."""
+        self.texts = []
+        self.sources = []
+        self.sizes = []
+        postings = {}
+        for text, source, searchable in entries:
+            ngrams = character_ngrams(normalise_text(searchable))
+            if not ngrams:
+                continue
+            entry_id = len(self.texts)
+            self.texts.append(text)
+            self.sources.append(source)
+            self.sizes.append(len(ngrams))
+            for ngram in ngrams:
+                postings.setdefault(ngram, []).append(entry_id)
+        self.postings = {ngram: np.array(ids, dtype=np.intp)
+                         for ngram, ids in postings.items()}
+        self.sizes = np.array(self.sizes, dtype=float)
+
+    @classmethod
+    def from_dataframe(cls, df, semiology_dict_path, column='Reported Semiology'):
+        """Index the SemioDict keys and patterns plus the distinct values of a text column of df."""
+        entries = []
+
+        def add_dictionary(dictionary):
+            for key, value in dictionary.items():
+                entries.append((key, 'key', key))
+                if isinstance(value, dict):
+                    add_dictionary(value)
+                    continue
+                for pattern in (value if isinstance(value, list) else [value]):
+                    entries.append((key, 'pattern', pattern_words(pattern)))
+
+        add_dictionary(load_semiology_dictionary(semiology_dict_path))
+        for value in df[column].dropna().unique():
+            if isinstance(value, str):
+                entries.append((value, column, value))
+        return cls(entries)
+
+    def suggest(self, term, limit=5, min_score=MIN_SCORE):
+        """
+        Up to limit Suggestion(text, source, score) tuples, best first.
+        Texts differing only in case or punctuation (e.g. a key and its patterns, or "Head version" and "head version ")
+        are suggested once, with their best score; keys win ties.
+        """
+        ngrams = character_ngrams(normalise_text(term))
+        posting_lists = [self.postings[ngram] for ngram in ngrams if ngram in self.postings]
+        if not posting_lists:
+            return []
+        shared = np.bincount(np.concatenate(posting_lists), minlength=len(self.texts))
+        candidates = np.flatnonzero(shared)
+        scores = 2 * shared[candidates] / (len(ngrams) + self.sizes[candidates])
+        order = np.lexsort((candidates, -scores))
+
+        suggestions = []
+        seen = set()
+        for i in order:
+            score = scores[i]
+            if score < min_score or len(suggestions) >= limit:
+                break
+            entry_id = candidates[i]
+            text = self.texts[entry_id]
+            normalised = normalise_text(text)
+            if normalised in seen:
+                continue
+            seen.add(normalised)
+            suggestions.append(Suggestion(text.strip(), self.sources[entry_id], float(score)))
+        return suggestions
@@ -2,27 +2,14 @@ import copy
 import warnings
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
-import yaml
 import numpy as np
 import pandas as pd
 
 from .crosstab.file_paths import file_paths
 from .crosstab.hierarchy_class import Hierarchy
 from .crosstab.gif_sheet_names import gif_sheet_names
-from .crosstab.mega_analysis.exclusions import (
-    exclude_cortical_stimulation,
-    exclude_ET,
-    exclude_sEEG,
-    exclude_seizure_free,
-    exclude_spontaneous_semiology,
-    exclude_paediatric_cases,
-    exclude_postictals,
-    exclusions,
-    only_paediatric_cases,
-    only_postictal_cases,
-)
 from .crosstab.mega_analysis.mapping import pivot_result_to_one_map, big_map
 from .crosstab.mega_analysis.MEGA_ANALYSIS import MEGA_ANALYSIS
 from .crosstab.mega_analysis.melt_then_pivot_query import melt_then_pivot_query
@@ -30,7 +17,17 @@ from .crosstab.mega_analysis.pivot_result_to_pixel_intensities import \
     pivot_result_to_pixel_intensities
 from .crosstab.mega_analysis.QUERY_LATERALISATION import QUERY_LATERALISATION
 from .crosstab.mega_analysis.QUERY_LATERALISATION_GLOBAL import QUERY_LATERALISATION_GLOBAL
-from .crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from .crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY, QUERY_SEMIOLOGY_MASK
+from .crosstab.mega_analysis.criteria import criterion_masks
+from .crosstab.mega_analysis.exclusion_views import FunnelStep, exclusion_view_cache
+from .crosstab.mega_analysis.flag_sweep import SWEEP_FLAGS, RowGifs, flag_combinations
+from .crosstab.mega_analysis.localisation_cube import discard_cube_terms, localisation_cube
+from .crosstab.mega_analysis.dictionary_reload import SemioDictIndex
+from .crosstab.mega_analysis.publication_years import publication_year_index
+from .crosstab.mega_analysis.row_filters import PublicationYears, RowFilter, normalise_row_filters, row_filter_masks
+from .crosstab.mega_analysis.semiology_dictionary import read_semiology_yaml
+from .crosstab.mega_analysis.term_registry import get_term_registry
+from .crosstab.mega_analysis.term_suggestions import TermSuggester
 from .crosstab.NORMALISE_TO_LOCALISING_VALUES import NORMALISE_TO_LOCALISING_VALUES
 from .crosstab.lobe_top_level_hierarchy_only import drop_minor_localisations
 
@@ -46,6 +43,8 @@ semiology_dict_path = resources_dir / 'semiology_dictionary.yaml'
 # Read Excel file only three times at initialisation
 mega_analysis_df, _, _, num_database_articles, num_database_patients, num_database_lat, num_database_loc = MEGA_ANALYSIS(
     excel_data=excel_path)
+# exclusion criteria of every row, packed into one integer per row
+mega_analysis_criteria = criterion_masks(mega_analysis_df)
 map_df_dict = pd.read_excel(
     excel_path,
     header=1,
@@ -84,14 +83,84 @@ def recursive_items(dictionary):
 
 
 def get_all_semiology_terms():
-    with open(semiology_dict_path) as f:
-        dictionary = yaml.load(f, Loader=yaml.FullLoader)
-    return sorted(recursive_items(dictionary))
+    return sorted(recursive_items(read_semiology_yaml(semiology_dict_path)))
 
 
 # Read YAML
 all_semiology_terms = get_all_semiology_terms()
 
+# Lateralities, postictal flags and dictionary membership of every known term
+term_registry = get_term_registry(resources_dir, semiology_dict_path)
+
+# SemioDict key row masks, re-indexed key by key when the yaml file is edited
+semiology_dictionary_index = SemioDictIndex(mega_analysis_df, semiology_dict_path)
+
+
+def canonical_term(term: str) -> str:
+    """
+    The known dictionary or resource list term a user term stands for, e.g. " Head  Version " -> "Head Version".
+    Other terms are searched as regexes, where spaces count, so they are returned unchanged.
+    Case is not folded here: "tonic" is searched as free text while "Tonic" uses the dictionary.
+    """
+    collapsed = ' '.join(term.split())
+    if collapsed in term_registry:
+        return collapsed
+    return term
+
+
+_term_suggester = None
+
+
+def get_term_suggester() -> TermSuggester:
+    """Near-match index over the SemioDict and the database, built on first use."""
+    global _term_suggester
+    if _term_suggester is None:
+        _term_suggester = TermSuggester.from_dataframe(
+            mega_analysis_df, semiology_dict_path)
+    return _term_suggester
+
+
+def suggest_semiology_terms(term: str, limit: int = 5) -> List[str]:
+    """Keys or reported semiologies spelled like term, best first."""
+    return [suggestion.text for suggestion in get_term_suggester().suggest(term, limit=limit)]
+
+
+def reload_semiology_dictionary():
+    """
+    Pick up edits of semiology_dictionary.yaml in a running session, e.g. while a curator works on it.
+    Only the edited keys are matched again; the term lists, registry and suggestions are rebuilt.
+    Called before each query and by canonical_query_key, not when a Semiology is created:
+    when nothing changed this costs one stat of the file (modification time and size),
+    and the dictionary is only hashed and matched again after an edit.
+
+    returns the DictionaryChange, or None if the file is unchanged.
+    """
+    global all_semiology_terms, term_registry, _term_suggester
+    change = semiology_dictionary_index.refresh()
+    if change is not None:
+        discard_cube_terms(mega_analysis_df, change.affected)
+        all_semiology_terms = get_all_semiology_terms()
+        term_registry = get_term_registry(resources_dir, semiology_dict_path)
+        _term_suggester = None
+    return change
+
+
+def _localisation_cube(df: pd.DataFrame):
+    # the dictionary terms are summed when the cube of the database is built, other terms on first use
+    return localisation_cube(df, term_registry.leaf_terms, semiology_dict_path)
+
+
+# characters that make a free text term a regex rather than plain text
+_REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+
+def _no_results_message(message: str, term: str) -> str:
+    suggestions = [s for s in suggest_semiology_terms(term) if s.lower() != term.lower()]
+    if suggestions:
+        message += '. Did you mean: ' + ', '.join(f'"{s}"' for s in suggestions) + '?'
+    return message
+
+
 # Define constants
 
 
@@ -121,8 +190,9 @@ class Semiology:
             normalise_to_localising_values: bool = False,
             top_level_lobes: bool = False,
             global_lateralisation: bool = False,
+            row_filters: Sequence[RowFilter] = (),
     ):
-        self.term = term
+        self.term = canonical_term(term)
         self.symptoms_side = symptoms_side
         self.dominant_hemisphere = dominant_hemisphere
         self.include_seizure_freedom = include_seizure_freedom
@@ -145,50 +215,149 @@ class Semiology:
         if self.include_only_postictals:
             self.include_postictals = True
         self.global_lateralisation = global_lateralisation
+        # e.g. [PublicationYears(2010, None), MinimumPatients(10)], applied before the exclusions
+        self.row_filters = normalise_row_filters(row_filters)
+        # what the funnel of the last query_semiology is worked out from, when asked for
+        self._funnel_query = None
+        self._funnel: Optional[List[FunnelStep]] = None
+
+    def query_key(self) -> tuple:
+        """
+        Stable key of everything that can change the result of this query, for caches.
+        Free text terms are searched ignoring case, so the case of plain text is folded
+        (not that of regexes, where e.g. \\s and \\S differ);
+        flags that are ignored for this term or combination of flags are left out.
+        """
+        flags = dict(
+            include_seizure_freedom=self.include_seizure_freedom,
+            include_concordance=self.include_concordance,
+            include_seeg=self.include_seeg,
+            include_cortical_stimulation=self.include_cortical_stimulation,
+            include_et_topology_ez=self.include_et_topology_ez,
+            include_spontaneous_semiology=self.include_spontaneous_semiology,
+            include_only_paediatric_cases=self.include_only_paediatric_cases,
+            global_lateralisation=self.global_lateralisation,
+        )
+        if not self.include_only_postictals:
+            # postictal only terms always include postictals
+            flags['include_postictals'] = self.include_postictals
+        if not self.include_only_paediatric_cases:
+            flags['include_paeds_and_adults'] = self.include_paeds_and_adults
+        if self.granular:
+            flags['granular'] = True
+        elif self.top_level_lobes:
+            flags['top_level_lobes'] = True
+        if self.granular or self.top_level_lobes:
+            flags['normalise_to_localising_values'] = self.normalise_to_localising_values
+        if self.row_filters:
+            flags['row_filters'] = self.row_filters
+        term = self.term
+        if term not in term_registry and not _REGEX_METACHARACTERS.intersection(term):
+            term = term.lower()
+        return (
+            term,
+            self.symptoms_side.value,
+            self.dominant_hemisphere.value,
+            tuple(sorted(laterality.value or '' for laterality in self.possible_lateralities)),
+            tuple(sorted(flags.items())),
+        )
 
     def is_postictals_only(self) -> bool:
-        postictals = (
-            postictal_semiologies_neutral_only
-            + postictal_semiologies_neutral_also
+        return term_registry.is_postictal_only(self.term)
+
+    def exclusion_flags(self) -> dict:
+        return dict(
+            include_postictals=self.include_postictals,
+            include_only_postictals=self.include_only_postictals,
+            include_only_paediatric_cases=self.include_only_paediatric_cases,
+            include_paeds_and_adults=self.include_paeds_and_adults,
+            include_concordance=self.include_concordance,
+            include_seizure_freedom=self.include_seizure_freedom,
+            include_et_topology_ez=self.include_et_topology_ez,
+            include_seeg=self.include_seeg,
+            include_cortical_stimulation=self.include_cortical_stimulation,
+            include_spontaneous_semiology=self.include_spontaneous_semiology,
+            row_filters=self.row_filters,
         )
-        return self.term in postictals
 
-    def remove_exclusions(self, df: pd.DataFrame) -> pd.DataFrame:
-        if not self.include_postictals:
-            df = exclude_postictals(df)
-        if self.include_only_postictals:
-            df = only_postictal_cases(df)
-        if self.include_only_paediatric_cases:
-            df = only_paediatric_cases(df)
-        elif self.include_paeds_and_adults:
-            pass
-        else:
-            df = exclude_paediatric_cases(df)
-        if not self.include_concordance:
-            df = exclusions(df, CONCORDANCE=True)
-        if not self.include_seizure_freedom:
-            df = exclude_seizure_free(df)
-        if not self.include_et_topology_ez:
-            df = exclude_ET(df)
-        if not self.include_seeg:
-            df = exclude_sEEG(df)
-        if not self.include_cortical_stimulation:
-            df = exclude_cortical_stimulation(df)
-        if not self.include_spontaneous_semiology:
-            df = exclude_spontaneous_semiology(df)
-        return df
+    def remove_exclusions(self, df: pd.DataFrame, term_mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        # the rows kept for this combination of flags are cached per DataFrame,
+        # so every semiology of a query and every toggle back to these flags reuses them
+        return exclusion_view_cache(df).select(term_mask, **self.exclusion_flags())
 
     def query_semiology(self) -> pd.DataFrame:
-        if self.term in all_semiology_terms:
+        reload_semiology_dictionary()
+        if term_registry.in_dictionary(self.term):
             path = semiology_dict_path
         else:
             path = None
-        self.data_frame = self.remove_exclusions(self.data_frame)
+        # term first: the exclusions work row by row, so only the rows matching the term need filtering.
+        # Not so for the concordance exclusion, which merges whole tables, so then the order is kept.
+        term_mask = QUERY_SEMIOLOGY_MASK(
+            self.data_frame,
+            semiology_term=self.term,
+            semiology_dict_path=path,
+        )
+        self._funnel = None
+        self._funnel_query = None
+        if term_mask is not None:
+            self._funnel_query = [self.data_frame, term_mask, self.exclusion_flags(), None]
+        if not self.include_concordance:
+            term_mask = None
+        self.data_frame = self.remove_exclusions(self.data_frame, term_mask)
+        if self.data_frame.empty and not self.include_concordance:
+            # the concordance exclusion left no rows, and so none of the columns QUERY_SEMIOLOGY searches
+            message = f'No query_semiology results for term "{self.term}"' + self.funnel_message()
+            raise ValueError(self.no_results_message(message))
         inspect_result, num_query_lat, num_query_loc = QUERY_SEMIOLOGY(
             self.data_frame,
             semiology_term=self.term,
             semiology_dict_path=path,
         )
+        if self._funnel_query is not None:
+            self._funnel_query[-1] = FunnelStep('drop_duplicates', len(inspect_result),
+                                                float(num_query_loc), float(num_query_lat))
+        return self.resolve_localisations(inspect_result)
+
+    @property
+    def funnel(self) -> Optional[List[FunnelStep]]:
+        """
+        The rows and Localising/Lateralising totals of the term left after each exclusion of the last
+        query_semiology (see ExclusionViewCache.funnel), then after QUERY_SEMIOLOGY dropped duplicates.
+        Worked out when first asked for (e.g. by funnel_message), not by every query.
+        None before query_semiology, or if the term has no mask.
+        """
+        if self._funnel is None and self._funnel_query is not None:
+            data_frame, term_mask, flags, drop_duplicates = self._funnel_query
+            funnel = exclusion_view_cache(data_frame).funnel(term_mask, **flags)
+            if drop_duplicates is not None:
+                funnel.append(drop_duplicates)
+            self._funnel = funnel
+        return self._funnel
+
+    def funnel_message(self) -> str:
+        """Where the Localising and Lateralising data of the last query_semiology ran out, if it did."""
+        if not self.funnel:
+            return ''
+        for step in self.funnel:
+            if step.localising + step.lateralising == 0:
+                if step.step == 'matched':
+                    return ' (the term matched no Localising or Lateralising data)'
+                if step.step == 'drop_duplicates':
+                    return ''
+                if isinstance(step.step, RowFilter):
+                    return f' (no Localising or Lateralising data left with {step.step!r})'
+                return f' (no Localising or Lateralising data left with {step.step}={getattr(self, step.step)})'
+        return ''
+
+    def no_results_message(self, message: str) -> str:
+        """The message with similar terms to try, unless the term matched rows the exclusions then dropped."""
+        if self.funnel and self.funnel[0].rows > 0:
+            return message
+        return _no_results_message(message, self.term)
+
+    def resolve_localisations(self, inspect_result: pd.DataFrame) -> pd.DataFrame:
+        # granular (hierarchy reversal) or top level lobes only, each row on its own
         if self.granular:
             hierarchy_df = Hierarchy(inspect_result)
             hierarchy_df.all_hierarchy_reversal()
@@ -201,10 +370,23 @@ class Semiology:
                 inspect_result = NORMALISE_TO_LOCALISING_VALUES(inspect_result)
         return inspect_result
 
+    def query_totals(self) -> Optional[pd.Series]:
+        """
+        Column sums (Localising, lateralisation and localisation columns) of the rows query_semiology
+        selects, before the hierarchy reversal, from the pre-aggregated localisation cube of the DataFrame.
+        None if the semiology dictionary lookup fails, as query_semiology.
+        """
+        reload_semiology_dictionary()
+        if term_registry.in_dictionary(self.term):
+            path = semiology_dict_path
+        else:
+            path = None
+        return _localisation_cube(self.data_frame).totals(self.term, path, **self.exclusion_flags())
+
     def query_lateralisation(self, one_map=one_map) -> Optional[pd.DataFrame]:
         query_semiology_result = self.query_semiology()
         if query_semiology_result is None:
-            print('No such semiology found')
+            print(self.no_results_message('No such semiology found'))
             return None
         else:
             # Same as saying (query_semiology_result['Localising'].sum() != 0)
@@ -215,8 +397,8 @@ class Semiology:
             ll_empty = localising_lateralising.sum().sum() == 0
 
             if ll_empty:
-                message = f'No query_semiology results for term "{self.term}"'
-                raise ValueError(message)
+                message = f'No query_semiology results for term "{self.term}"' + self.funnel_message()
+                raise ValueError(self.no_results_message(message))
             elif self.global_lateralisation:
                 all_combined_gifs, num_QL_lat, num_QL_CL, num_QL_IL, num_QL_BL, num_QL_DomH, num_QL_NonDomH = \
                     QUERY_LATERALISATION_GLOBAL(
@@ -256,7 +438,7 @@ class Semiology:
         query_lateralisation_result = self.query_lateralisation()
         if query_lateralisation_result is None:
             message = f'No results generated for semiology term "{self.term}"'
-            raise ValueError(message)
+            raise ValueError(self.no_results_message(message))
         array = np.array(query_lateralisation_result)
         _, labels, patients = array.T
         num_datapoints_dict = {
@@ -275,14 +457,164 @@ class Semiology:
                 k: v*100/total for (k, v) in num_datapoints_dict.items()}
             return new_datatpoints
 
+    def sweep_inclusion_flags(
+            self,
+            flags: Sequence[str] = SWEEP_FLAGS,
+            method: str = 'proportions',
+    ) -> pd.DataFrame:
+        """
+        get_num_datapoints_dict for each of the 2^k combinations of the flags (include_* options) included or
+        excluded, the other options as set: a tidy table with a column per flag, 'Gif Parcellations' and 'Score'.
+
+        The term is matched once and each row it matches is mapped to the gif parcellations once,
+        then every combination adds up the rows it keeps. Combinations that leave no data have no rows.
+        """
+        reload_semiology_dictionary()
+        combinations = flag_combinations(flags)
+        if self.global_lateralisation:
+            # QUERY_LATERALISATION_GLOBAL maps the data as a whole, not row by row
+            scores = [_num_datapoints_dict_or_none(self._flag_combination(**combination), method)
+                      for combination in combinations]
+        else:
+            scores = self._sweep_row_gifs(combinations, method)
+
+        records = []
+        for combination, num_datapoints_dict in zip(combinations, scores):
+            if num_datapoints_dict is None:
+                warnings.warn(f'No data for semiology term "{self.term}" with {combination}')
+                continue
+            for label, score in num_datapoints_dict.items():
+                records.append(dict(combination, **{'Gif Parcellations': label, 'Score': score}))
+        return pd.DataFrame.from_records(records, columns=list(flags) + ['Gif Parcellations', 'Score'])
+
+    def _flag_combination(self, **flags) -> 'Semiology':
+        semiology = copy.copy(self)
+        for flag, value in flags.items():
+            setattr(semiology, flag, value)
+        return semiology
+
+    def _sweep_row_gifs(self, combinations: List[dict], method: str) -> List[Optional[dict]]:
+        path = semiology_dict_path if term_registry.in_dictionary(self.term) else None
+        cube = _localisation_cube(self.data_frame)
+        selections = []
+        for combination in combinations:
+            try:
+                rows = cube.query_rows(self.term, path, **dict(self.exclusion_flags(), **combination))
+            except KeyError:
+                # the concordance exclusion dropped a column the ET or SS exclusion needs, as query_semiology
+                rows = None
+            selections.append(rows)
+        candidates = [rows for rows in selections if rows is not None]
+        if not candidates:
+            return [None] * len(combinations)
+
+        # every row any combination keeps, resolved and mapped once
+        candidates = np.unique(np.concatenate(candidates))
+        inspect_result = self.resolve_localisations(self.data_frame.take(candidates))
+        row_gifs = RowGifs(
+            inspect_result, one_map, gif_lat_file,
+            side_of_symptoms_signs=self.symptoms_side.value,
+            pts_dominant_hemisphere_R_or_L=self.dominant_hemisphere.value,
+        )
+        scores = []
+        for rows in selections:
+            if rows is None:
+                scores.append(None)
+                continue
+            rows = np.searchsorted(candidates, rows)
+            if row_gifs.localising[rows].sum() + row_gifs.lateralising[rows].sum() == 0:
+                # query_lateralisation: no query_semiology results
+                scores.append(None)
+                continue
+            scores.append(_pt_numbers_to_num_datapoints_dict(row_gifs.score(rows), method))
+        return scores
+
+    def scores_by_publication_year(self, method: str = 'proportions') -> pd.DataFrame:
+        """
+        get_num_datapoints_dict of the rows published up to each year, for every year of publication
+        of the rows of the term: a tidy table with columns 'Year', 'Gif Parcellations' and 'Score',
+        showing how the map built up as the literature accumulated. Years that leave no data have no rows,
+        and rows whose Reference has no year are left out.
+
+        The exclusions keep or drop each row on its own, so the rows kept up to a year are the rows kept
+        up to that year: the term is matched and its rows mapped once, then the scores of every year
+        are prefix sums over the years (see RowGifs.cumulative_scores).
+        """
+        reload_semiology_dictionary()
+        path = semiology_dict_path if term_registry.in_dictionary(self.term) else None
+        years_index = publication_year_index(self.data_frame)
+        if self.global_lateralisation or not self.include_concordance:
+            # QUERY_LATERALISATION_GLOBAL maps the data as a whole, and the concordance exclusion
+            # merges whole tables, so each year is queried on its own
+            mask = QUERY_SEMIOLOGY_MASK(self.data_frame, semiology_term=self.term, semiology_dict_path=path)
+            if mask is None:
+                return pd.DataFrame(columns=['Year', 'Gif Parcellations', 'Score'])
+            masks = row_filter_masks(self.data_frame)
+            for row_filter in self.row_filters:
+                mask = mask & masks.mask(row_filter)
+            years, _ = years_index.year_groups(np.flatnonzero(mask))
+            scores = [
+                _num_datapoints_dict_or_none(self._flag_combination(row_filters=normalise_row_filters(
+                    self.row_filters + (PublicationYears(None, year),))), method)
+                for year in years
+            ]
+        else:
+            rows = _localisation_cube(self.data_frame).query_rows(self.term, path, **self.exclusion_flags())
+            if rows is None:
+                return pd.DataFrame(columns=['Year', 'Gif Parcellations', 'Score'])
+            years, groups = years_index.year_groups(rows)
+            inspect_result = self.resolve_localisations(self.data_frame.take(rows))
+            row_gifs = RowGifs(
+                inspect_result, one_map, gif_lat_file,
+                side_of_symptoms_signs=self.symptoms_side.value,
+                pts_dominant_hemisphere_R_or_L=self.dominant_hemisphere.value,
+            )
+            scores = [
+                None if year_pt_numbers.isnull().all() else _pt_numbers_to_num_datapoints_dict(year_pt_numbers, method)
+                for _, year_pt_numbers in row_gifs.cumulative_scores(groups, len(years)).iterrows()
+            ]
+
+        records = []
+        for year, num_datapoints_dict in zip(years, scores):
+            if num_datapoints_dict is None:
+                continue
+            for label, score in num_datapoints_dict.items():
+                records.append({'Year': int(year), 'Gif Parcellations': label, 'Score': score})
+        return pd.DataFrame.from_records(records, columns=['Year', 'Gif Parcellations', 'Score'])
+
+
+def _pt_numbers_to_num_datapoints_dict(pt_numbers: pd.Series, method: str) -> dict:
+    """get_num_datapoints_dict of a pd.Series of pt #s per gif parcellation."""
+    num_datapoints_dict = {
+        int(label): float(num_datapoints)
+        for (label, num_datapoints)
+        in pt_numbers.items()
+        if num_datapoints > 0
+    }
+    if method == 'proportions':
+        total = sum(list(num_datapoints_dict.values()))
+        num_datapoints_dict = {
+            k: v*100/total for (k, v) in num_datapoints_dict.items()}
+    return num_datapoints_dict
+
+
+def _num_datapoints_dict_or_none(semiology: Semiology, method: str) -> Optional[dict]:
+    try:
+        return semiology.get_num_datapoints_dict(method=method)
+    except (KeyError, ValueError):
+        return None
+
 
 def get_possible_lateralities(term) -> List[Laterality]:
-    lateralities = [Laterality.LEFT, Laterality.RIGHT]
-    if term in (semiologies_neutral_only + postictal_semiologies_neutral_only):
-        lateralities = [Laterality.NEUTRAL]
-    if term in (semiologies_neutral_also + postictal_semiologies_neutral_also):
-        lateralities.append(Laterality.NEUTRAL)
-    return lateralities
+    return [
+        Laterality(value)
+        for value in term_registry.possible_lateralities(term)
+    ]
+
+
+def expected_row_count(term) -> Optional[int]:
+    """Database rows a dictionary term matches before exclusions (None for free text)."""
+    return term_registry.row_count(term, mega_analysis_df, semiology_dict_path)
 
 
 def combine_semiologies(
@@ -327,6 +659,15 @@ def get_df_from_dicts(
     return df
 
 
+def canonical_query_key(semiologies: List[Semiology]) -> tuple:
+    """
+    Cache key of a list of semiologies queried together, with the version of the SemioDict
+    and term lists (picking up any edit first), so cached results of older patterns are not reused.
+    """
+    reload_semiology_dictionary()
+    return term_registry.version, tuple(semiology.query_key() for semiology in semiologies)
+
+
 def normalise_semiologies_df(
         semiologies_df: pd.DataFrame,
         method='proportions',
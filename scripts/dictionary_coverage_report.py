@@ -0,0 +1,18 @@
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.dictionary_coverage import dictionary_coverage
+
+
+keys_path = 'dictionary_coverage_keys.csv'
+overlap_path = 'dictionary_coverage_overlap.csv'
+uncovered_path = 'dictionary_coverage_uncovered.csv'
+
+report = dictionary_coverage(mega_analysis_df, semiology_dict_path)
+report.keys.to_csv(keys_path)
+report.overlap.to_csv(overlap_path, index=False)
+report.uncovered.to_csv(uncovered_path, index_label='Row')
+
+print(f'{len(report.keys)} SemioDict keys, per key totals written to {keys_path}')
+print('Sibling keys sharing the most rows:')
+print(report.overlap[report.overlap['siblings']].head(10).to_string(index=False))
+print(f'{len(report.overlap)} overlapping key pairs written to {overlap_path}')
+print(f'{len(report.uncovered)} rows with semiology text no key matches written to {uncovered_path}')
@@ -0,0 +1,12 @@
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.pattern_provenance import PatternProvenance
+
+
+provenance_path = 'pattern_provenance.csv'
+unmatched_path = 'unmatched_rows.csv'
+
+provenance = PatternProvenance.from_yaml(mega_analysis_df, semiology_dict_path)
+provenance.export(provenance_path, unmatched_path=unmatched_path)
+
+print(f'{provenance.to_sparse().nnz} pattern-row matches written to {provenance_path}')
+print(f'{len(provenance.unmatched_rows())} rows no SemioDict key matches written to {unmatched_path}')
@@ -0,0 +1,16 @@
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.regex_profiler import profile_semiology_dictionary
+
+
+report_path = 'regex_cost_report.csv'
+
+report = profile_semiology_dictionary(mega_analysis_df, semiology_dict_path)
+report.to_csv(report_path, index=False)
+
+columns = ['key', 'pattern', 'full_scan_seconds', 'prefiltered_seconds', 'growth_exponent']
+print('Most expensive SemioDict patterns:')
+print(report[columns].head(20).to_string(index=False))
+print()
+print('Patterns with super-linear backtracking on long synthetic inputs:')
+print(report.loc[report['super_linear'], columns].to_string(index=False))
+print(f'\nFull report written to {report_path}')
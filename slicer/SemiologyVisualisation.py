@@ -1718,7 +1718,8 @@ class Query:
         return content
 
     def hash(self):
-        return make_hash_sha256(self.toDicts())
+        from mega_analysis.semiology import canonical_query_key
+        return make_hash_sha256(canonical_query_key(self.semiologies))
 
     def write(self, path):
         import yaml
@@ -1796,14 +1797,20 @@ class CustomSemiologyDialog(qt.QDialog):
         self.buttonBox.rejected.connect(self.reject)
         self.lineEdit.textChanged.connect(self.textChanged)
         self.searchFunction = self.getSearchFunction()
+        self.suggestFunction = self.getSuggestFunction()
 
     @property
     def term(self):
         return self.lineEdit.text
 
     def getSearchFunction(self):
-        from mega_analysis import custom_semiology_lookup
-        return custom_semiology_lookup
+        # the SemioDict index is built once and shared, the text typed so far is this dialog's own
+        from mega_analysis import semiodict_lookup
+        return semiodict_lookup().as_you_type()
+
+    def getSuggestFunction(self):
+        from mega_analysis import suggest_semiology_terms
+        return suggest_semiology_terms
 
     def textChanged(self):
         if not self.term or len(self.term) < self.minimumTermLength:
@@ -1811,7 +1818,14 @@ class CustomSemiologyDialog(qt.QDialog):
             return
         terms = self.searchFunction(self.term)
         if not terms:
-            self.label_2.setText('')
+            suggestions = self.suggestFunction(self.term)
+            if not suggestions:
+                self.label_2.setText('')
+                return
+            lines = ['This semiology term was not found. Similar terms:\n']
+            for suggestion in suggestions:
+                lines.append(f'- {suggestion}')
+            self.label_2.setText('\n'.join(lines))
             return
         lines = ['This semiology term exists under the following categories:\n']
         for term in terms:
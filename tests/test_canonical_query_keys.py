@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+import mega_analysis.semiology as semiology_module
+from mega_analysis.semiology import (
+    Laterality,
+    Semiology,
+    canonical_query_key,
+    canonical_term,
+    mega_analysis_df,
+    semiology_dict_path,
+)
+from mega_analysis.crosstab.mega_analysis.dictionary_reload import SemioDictIndex
+
+
+class TestCanonicalQueryKeys(unittest.TestCase):
+    def test_canonical_term(self):
+        assert canonical_term('Tonic') == 'Tonic'
+        assert canonical_term(' Tonic ') == 'Tonic'
+        assert canonical_term('Head   Version') == 'Head Version'
+        assert canonical_term(' Postictal  Dysphasia') == 'Postictal Dysphasia'
+        # free text is a regex: spaces and case are kept
+        assert canonical_term(' tonic ') == ' tonic '
+        assert canonical_term('my Custom  term') == 'my Custom  term'
+
+    def test_equivalent_terms_share_key(self):
+        keys = {
+            Semiology(term, Laterality.LEFT, Laterality.LEFT).query_key()
+            for term in ['Tonic', ' Tonic ', 'Tonic  ']
+        }
+        assert len(keys) == 1
+        free_text_keys = {
+            Semiology(term, Laterality.LEFT, Laterality.LEFT).query_key()
+            for term in ['tonic', 'TONIC']
+        }
+        assert len(free_text_keys) == 1
+        assert keys != free_text_keys
+
+    def test_regex_case_kept(self):
+        for pattern in [r'head\s', r'\d+ sec', r'\bfear', r'[A-Z]ura']:
+            keys = {
+                Semiology(term, Laterality.LEFT, Laterality.LEFT).query_key()
+                for term in [pattern, pattern.swapcase()]
+            }
+            assert len(keys) == 2, pattern
+
+    def test_ignored_flags_dropped(self):
+        postictal = [
+            Semiology('Postictal Dysphasia', Laterality.NEUTRAL, Laterality.LEFT,
+                      include_postictals=include_postictals)
+            for include_postictals in (True, False)
+        ]
+        assert postictal[0].query_key() == postictal[1].query_key()
+
+        paediatric = [
+            Semiology('Tonic', Laterality.LEFT, Laterality.LEFT,
+                      include_only_paediatric_cases=True,
+                      include_paeds_and_adults=include_paeds_and_adults)
+            for include_paeds_and_adults in (True, False)
+        ]
+        assert paediatric[0].query_key() == paediatric[1].query_key()
+
+    def test_relevant_flags_kept(self):
+        tonic = [
+            Semiology('Tonic', Laterality.LEFT, Laterality.LEFT,
+                      include_postictals=include_postictals)
+            for include_postictals in (True, False)
+        ]
+        assert tonic[0].query_key() != tonic[1].query_key()
+        right = Semiology('Tonic', Laterality.RIGHT, Laterality.LEFT)
+        assert canonical_query_key(tonic[:1]) != canonical_query_key([right])
+
+    def test_dictionary_edit_changes_key(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = Path(directory) / 'semiology_dictionary.yaml'
+        shutil.copy(semiology_dict_path, path)
+        with mock.patch.multiple(
+                semiology_module,
+                semiology_dict_path=path,
+                semiology_dictionary_index=SemioDictIndex(mega_analysis_df, path),
+                term_registry=semiology_module.term_registry,
+                all_semiology_terms=semiology_module.all_semiology_terms,
+                _term_suggester=None):
+            semiologies = [Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT)]
+            key = canonical_query_key(semiologies)
+            assert canonical_query_key(semiologies) == key
+
+            with open(path) as f:
+                dictionary = yaml.load(f, Loader=yaml.BaseLoader)
+            dictionary['semiology']['auras']['Epigastric'].append('abdominal')
+            stat = os.stat(path)
+            with open(path, 'w') as f:
+                yaml.dump(dictionary, f, sort_keys=False)
+            # a later modification time, however coarse the file system clock
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert canonical_query_key(semiologies) != key
+
+    def test_reloaded_at_query_time(self):
+        with mock.patch.object(semiology_module, 'reload_semiology_dictionary',
+                               wraps=semiology_module.reload_semiology_dictionary) as reload:
+            semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT)
+            reload.assert_not_called()
+            semiology.query_semiology()
+            reload.assert_called_once_with()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_criteria, mega_analysis_df
+from mega_analysis.crosstab.mega_analysis.criteria import (
+    CS,
+    ET,
+    PAED,
+    SS,
+    Criterion,
+    criterion_masks,
+)
+from mega_analysis.crosstab.mega_analysis.exclusions import (
+    CONCORDANT,
+    POST_OP,
+    SEEG_ES,
+    SPECT_PET_TERMS,
+    exclude_postictals,
+)
+
+
+class TestCriteria(unittest.TestCase):
+    def setUp(self):
+        self.df = mega_analysis_df.copy()
+
+    def test_masks_equal_raw_predicates(self):
+        df = self.df
+        criteria = criterion_masks(df)
+        concordant = df[CONCORDANT].astype(str)
+        pet_hyper = (concordant.str.contains('(?i)PET') & concordant.str.contains('(?i)Hyper')
+                     & df[CONCORDANT].notnull())
+        spect_pet = concordant.str.contains('|'.join(SPECT_PET_TERMS), case=False) & df[CONCORDANT].notnull()
+        expected = {
+            Criterion.PAEDIATRIC: df[PAED] == 'y',
+            Criterion.ET: df[ET].notnull(),
+            Criterion.SS: df[SS].notnull(),
+            Criterion.CS: df[CS].notnull(),
+            Criterion.SEIZURE_FREE: df[POST_OP].notnull(),
+            Criterion.CONCORDANT: df[CONCORDANT].notnull(),
+            Criterion.SEEG_ES: df[SEEG_ES].notnull(),
+            Criterion.SEEG_ONLY: df[SEEG_ES] == 'y',
+            Criterion.ES: df[SEEG_ES].str.contains('ES', case=False, na=False),
+            Criterion.PET_HYPERMETABOLISM: pet_hyper,
+            Criterion.PET_HYPERMETABOLISM_ONLY: pet_hyper & df[POST_OP].isnull() & df[SEEG_ES].isnull(),
+            Criterion.SPECT_PET: spect_pet,
+            Criterion.SPECT_PET_ONLY: spect_pet & df[POST_OP].isnull() & df[SEEG_ES].isnull(),
+        }
+        for criterion, mask in expected.items():
+            assert np.array_equal(criteria.mask(criterion), mask.to_numpy(dtype=bool)), criterion
+            assert criteria.mask(criterion).any(), criterion
+
+    def test_postictal(self):
+        criteria = criterion_masks(self.df)
+        kept = exclude_postictals(self.df).index
+        dropped = criteria.mask(Criterion.POSTICTAL) & ~criteria.mask(Criterion.DUPLICATE_ROW)
+        assert np.array_equal(dropped, ~self.df.index.isin(kept))
+        assert np.array_equal(criteria.mask(Criterion.DUPLICATE_ROW), self.df.duplicated().to_numpy())
+
+    def test_combined_criteria(self):
+        criteria = mega_analysis_criteria
+        ground_truths = Criterion.SEIZURE_FREE | Criterion.CONCORDANT | Criterion.SEEG_ES
+        assert np.array_equal(
+            criteria.any(ground_truths),
+            mega_analysis_df[[POST_OP, CONCORDANT, SEEG_ES]].notnull().any(axis=1).to_numpy())
+        assert np.array_equal(
+            criteria.all(Criterion.ET | Criterion.SS),
+            (mega_analysis_df[ET].notnull() & mega_analysis_df[SS].notnull()).to_numpy())
+        assert criteria.bits.dtype == np.uint16
+        assert criterion_masks(mega_analysis_df) is criteria
@@ -1,5 +1,9 @@
-from mega_analysis.crosstab.mega_analysis.custom_semiology_SemioDict_lookup import \
-    custom_semiology_lookup
+from mega_analysis.crosstab.mega_analysis.custom_semiology_SemioDict_lookup import (
+    SemioDict,
+    SemioDictLookup,
+    custom_semiology_lookup,
+    semiodict_lookup,
+)
 
 
 def test_custom_semiology_lookup():
@@ -24,5 +28,33 @@ def test_custom_semiology_lookup():
     assert 'Head Version' in does_exist_hEaD_multiple
 
 
+def test_semiodict_lookup_as_you_type():
+    lookup = SemioDictLookup().as_you_type()
+    for term in ['butterflies', 'hEaD rUsh', 'epigastric rising', 'tonic|clonic', 'Semiology']:
+        for end in range(1, len(term) + 1):
+            typed = term[:end]
+            # a copy of the dictionary runs the original recursive search
+            expected = custom_semiology_lookup(typed, nested_dict=dict(SemioDict))
+            result = lookup(typed)
+            assert set(result) == set(expected)
+            assert len(result) == len(set(result))
+
+
+def test_text_boxes_keep_their_own_keystrokes():
+    shared = semiodict_lookup()
+    assert semiodict_lookup() is shared
+    first, second = shared.as_you_type(), shared.as_you_type()
+    assert first.semiodict_lookup is second.semiodict_lookup
+    first('epi')
+    second('ton')
+    # each narrows to its own previous keystroke, and the shared lookup to none
+    assert set(first('epig')) == set(custom_semiology_lookup('epig', nested_dict=dict(SemioDict)))
+    assert set(second('toni')) == set(custom_semiology_lookup('toni', nested_dict=dict(SemioDict)))
+    assert set(custom_semiology_lookup('epigas')) == set(shared('epigas'))
+    assert set(shared('epig')) == set(first('epig'))
+
+
 if __name__ == "__main__":
     test_custom_semiology_lookup()
+    test_semiodict_lookup_as_you_type()
+    test_text_boxes_keep_their_own_keystrokes()
@@ -0,0 +1,48 @@
+import gc
+import unittest
+
+import pandas as pd
+
+from mega_analysis.crosstab.mega_analysis.dataframe_cache import per_dataframe_cache
+
+
+class Built:
+    def __init__(self, df, *args):
+        self.rows = len(df)
+        self.args = args
+
+
+class TestPerDataFrameCache(unittest.TestCase):
+    def test_built_once_per_dataframe(self):
+        cache = per_dataframe_cache(Built)
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        built = cache(df, 'x')
+        assert cache(df) is built
+        assert built.args == ('x',)
+        assert cache.get(df) is built
+        assert cache(pd.DataFrame({'a': [1, 2, 3]})) is not built
+
+    def test_rebuilt_with_a_new_index(self):
+        cache = per_dataframe_cache(Built)
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        built = cache(df)
+        df.drop(index=[0], inplace=True)
+        assert cache.get(df) is None
+        assert cache(df) is not built
+        assert cache(df).rows == 2
+
+    def test_store(self):
+        cache = per_dataframe_cache(Built)
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        stored = Built(df.iloc[:1])
+        cache.store(df, stored)
+        assert cache(df) is stored
+
+    def test_dropped_with_the_dataframe(self):
+        cache = per_dataframe_cache(Built)
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        cache(df)
+        assert len(cache._entries) == 1
+        del df
+        gc.collect()
+        assert not cache._entries
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.dictionary_coverage import dictionary_coverage
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK, semiology_regexes
+
+
+class TestDictionaryCoverage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.report = dictionary_coverage(mega_analysis_df, semiology_dict_path)
+        cls.masks = {
+            key: QUERY_SEMIOLOGY_MASK(mega_analysis_df, key, semiology_dict_path=semiology_dict_path)
+            for key in cls.report.keys.index
+        }
+
+    def test_key_totals(self):
+        keys = self.report.keys
+        assert keys.loc['Epigastric', 'parent'] == 'auras'
+        for key, mask in self.masks.items():
+            assert keys.loc[key, 'rows'] == mask.sum()
+            assert keys.loc[key, 'Localising'] == mega_analysis_df.loc[mask, 'Localising'].sum()
+            assert keys.loc[key, 'Lateralising'] == mega_analysis_df.loc[mask, 'Lateralising'].sum()
+
+    def test_overlap_and_unique_rows(self):
+        overlap = self.report.overlap
+        assert (overlap['shared_rows'] > 0).all()
+        for pair in overlap.head(10).itertuples():
+            shared = self.masks[pair.key_1] & self.masks[pair.key_2]
+            assert pair.shared_rows == shared.sum()
+        coverage = np.sum(list(self.masks.values()), axis=0)
+        key = 'Epigastric'
+        assert self.report.keys.loc[key, 'unique_rows'] == (self.masks[key] & (coverage == 1)).sum()
+
+    def test_uncovered_rows(self):
+        uncovered = self.report.uncovered.index
+        positions = mega_analysis_df.index.get_indexer(uncovered)
+        coverage = np.sum(list(self.masks.values()), axis=0)
+        assert (coverage[positions] == 0).all()
+        assert uncovered.isin(mega_analysis_df.dropna(
+            how='all', subset=['Reported Semiology', 'Semiology Category']).index).all()
+
+    def test_category_lookup_does_not_accumulate(self):
+        first = semiology_regexes('motor', semiology_dict_path=semiology_dict_path)
+        semiology_regexes('auras', semiology_dict_path=semiology_dict_path)
+        assert semiology_regexes('motor', semiology_dict_path=semiology_dict_path) == first
+        assert '(?i)visual field' not in first
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.dictionary_reload import (
+    SemioDictIndex,
+    diff_semiology_dictionaries,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+
+
+class TestDictionaryReload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = Path(self.directory) / 'semiology_dictionary.yaml'
+        shutil.copy(semiology_dict_path, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def edit(self, edit_function):
+        with open(self.path) as f:
+            dictionary = yaml.load(f, Loader=yaml.BaseLoader)
+        edit_function(dictionary['semiology'])
+        stat = os.stat(self.path)
+        with open(self.path, 'w') as f:
+            yaml.dump(dictionary, f, sort_keys=False)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_diff(self):
+        old = {'auras': {'Epigastric': ['epigastric'], 'Fear': ['fear']}, 'Blink': ['blink']}
+        new = {'auras': {'Epigastric': ['epigastric', 'abdominal'], 'Fear': ['fear']}, 'Wink': ['wink']}
+        change = diff_semiology_dictionaries(old, new)
+        assert diff_semiology_dictionaries(old, {'Blink': ['blink'], 'auras': dict(reversed(old['auras'].items()))}) == ([], [], [], [])
+        assert change.added == ['Wink']
+        assert change.removed == ['Blink']
+        assert change.changed == ['Epigastric', 'auras']
+        assert change.affected == ['Blink', 'Epigastric', 'Wink', 'auras']
+
+    def test_refresh_reindexes_edited_keys(self):
+        index = SemioDictIndex(mega_analysis_df, self.path)
+        assert index.refresh() is None
+        epigastric = index.key_mask('Epigastric')
+        auras = index.key_mask('auras')
+        fear = index.key_mask('Fear-Anxiety')
+
+        self.edit(lambda semiology: semiology['auras'].__setitem__('Epigastric', ['epigastric']))
+        change = index.refresh()
+        assert change.changed == ['Epigastric', 'auras']
+        assert change.affected == ['Epigastric', 'auras']
+        assert index.key_mask('Fear-Anxiety') is fear
+        expected = QUERY_SEMIOLOGY_MASK(
+            mega_analysis_df, 'Epigastric', semiology_dict_path=self.path)
+        assert np.array_equal(index.key_mask('Epigastric'), expected)
+        leaf_masks = [index.key_mask(key) for key in index.patterns if index.parents[key] == 'auras']
+        assert np.array_equal(index.key_mask('auras'), np.logical_or.reduce(leaf_masks))
+        assert index.row_count('Epigastric') != epigastric.sum()
+        assert index.row_count('auras') != auras.sum()
+
+    def test_refresh_added_and_removed_keys(self):
+        index = SemioDictIndex(mega_analysis_df, self.path)
+
+        def edit(semiology):
+            del semiology['auras']['Fear-Anxiety']
+            semiology['motor']['Blink'] = ['blink']
+
+        self.edit(edit)
+        change = index.refresh()
+        assert change.added == ['Blink']
+        assert change.removed == ['Fear-Anxiety']
+        assert change.affected == ['Blink', 'Fear-Anxiety', 'auras', 'motor']
+        assert 'Fear-Anxiety' not in index
+        assert index.row_count('Blink') == QUERY_SEMIOLOGY_MASK(
+            mega_analysis_df, 'Blink', semiology_dict_path=self.path).sum()
@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from mega_analysis.semiology import Laterality, Semiology, mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.exclusion_mask import exclusion_mask
+from mega_analysis.crosstab.mega_analysis.exclusion_views import (
+    EXCLUSION_FLAGS,
+    ExclusionViewCache,
+    exclusion_view_cache,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+
+
+FLAGS = dict(include_paeds_and_adults=False, include_concordance=False, include_seeg=False,
+             include_et_topology_ez=False)
+
+
+class TestExclusionFunnel(unittest.TestCase):
+    def setUp(self):
+        self.views = exclusion_view_cache(mega_analysis_df)
+        self.mask = QUERY_SEMIOLOGY_MASK(mega_analysis_df, 'Tonic', semiology_dict_path=semiology_dict_path)
+
+    def test_last_step_is_the_rows_kept(self):
+        funnel = self.views.funnel(self.mask, **FLAGS)
+        assert [step.step for step in funnel] == [
+            'matched', 'include_postictals', 'include_paeds_and_adults', 'include_concordance',
+            'include_seeg', 'include_et_topology_ez']
+        kept = exclusion_mask(mega_analysis_df, **FLAGS) & self.mask
+        assert funnel[0].rows == self.mask.sum()
+        assert funnel[-1].rows == kept.sum()
+        assert funnel[-1].localising == mega_analysis_df.loc[kept, 'Localising'].sum()
+        assert funnel[-1].lateralising == mega_analysis_df.loc[kept, 'Lateralising'].sum()
+        assert all(np.diff([step.rows for step in funnel]) <= 0)
+
+    def test_each_step_as_if_the_last(self):
+        funnel = self.views.funnel(self.mask, **FLAGS)
+        applied = dict(include_postictals=True, include_paeds_and_adults=True)
+        for step in funnel[1:]:
+            applied[step.step] = FLAGS.get(step.step, EXCLUSION_FLAGS[step.step])
+            assert step.rows == (exclusion_mask(mega_analysis_df, **applied) & self.mask).sum(), step
+
+    def test_whole_database(self):
+        funnel = self.views.funnel()
+        assert funnel[0].rows == len(mega_analysis_df)
+        assert funnel[-1].rows == exclusion_mask(mega_analysis_df).sum()
+
+    def test_semiology_reports_where_the_data_ran_out(self):
+        semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, include_cortical_stimulation=False,
+                              include_et_topology_ez=False, include_spontaneous_semiology=False)
+        with self.assertRaises(ValueError) as raised:
+            semiology.query_lateralisation()
+        assert 'include_spontaneous_semiology=False' in str(raised.exception)
+        assert semiology.funnel[0].rows > 0
+        assert semiology.funnel[-1].step == 'drop_duplicates'
+        assert semiology.funnel[-1].rows == 0
+
+    def test_semiology_funnel_worked_out_when_asked_for(self):
+        semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, include_seeg=False)
+        funnel = ExclusionViewCache.funnel
+        with mock.patch.object(ExclusionViewCache, 'funnel', autospec=True, side_effect=funnel) as counted:
+            semiology.query_semiology()
+            assert counted.call_count == 0
+            assert semiology.funnel_message() == ''
+            assert semiology.funnel[-1].step == 'drop_duplicates'
+            assert counted.call_count == 1
+        assert semiology.funnel[:-1] == self.views.funnel(
+            QUERY_SEMIOLOGY_MASK(mega_analysis_df, 'Epigastric', semiology_dict_path=semiology_dict_path),
+            **semiology.exclusion_flags())
+
+    def test_no_rows_left_without_concordance(self):
+        # the post-ictal only rows are all dropped by the concordance exclusion
+        semiology = Semiology('Postictal Dysphasia', Laterality.LEFT, Laterality.LEFT, include_concordance=False)
+        with self.assertRaises(ValueError) as raised:
+            semiology.query_semiology()
+        assert 'include_concordance=False' in str(raised.exception)
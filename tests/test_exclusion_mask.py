@@ -0,0 +1,108 @@
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.criteria import criterion_masks, select_rows
+from mega_analysis.crosstab.mega_analysis.exclusion_mask import apply_exclusions, exclusion_mask
+from mega_analysis.crosstab.mega_analysis.exclusions import (
+    exclude_cortical_stimulation,
+    exclude_ET,
+    exclude_sEEG,
+    exclude_seizure_free,
+    exclude_spontaneous_semiology,
+    exclude_paediatric_cases,
+    exclude_postictals,
+    exclusions,
+    only_paediatric_cases,
+    only_postictal_cases,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+
+
+def legacy_exclusions(df,
+                      include_postictals=False,
+                      include_only_postictals=False,
+                      include_only_paediatric_cases=False,
+                      include_paeds_and_adults=False,
+                      include_concordance=True,
+                      include_seizure_freedom=True,
+                      include_et_topology_ez=True,
+                      include_seeg=True,
+                      include_cortical_stimulation=True,
+                      include_spontaneous_semiology=True):
+    """Semiology.remove_exclusions as it was, one exclusion function after the other."""
+    df = df.copy()
+    if not include_postictals:
+        df = exclude_postictals(df)
+    if include_only_postictals:
+        df = only_postictal_cases(df)
+    if include_only_paediatric_cases:
+        df = only_paediatric_cases(df)
+    elif not include_paeds_and_adults:
+        df = exclude_paediatric_cases(df)
+    if not include_concordance:
+        df = exclusions(df, CONCORDANCE=True)
+    if not include_seizure_freedom:
+        df = exclude_seizure_free(df)
+    if not include_et_topology_ez:
+        df = exclude_ET(df)
+    if not include_seeg:
+        df = exclude_sEEG(df)
+    if not include_cortical_stimulation:
+        df = exclude_cortical_stimulation(df)
+    if not include_spontaneous_semiology:
+        df = exclude_spontaneous_semiology(df)
+    return df
+
+
+FLAG_COMBINATIONS = [
+    {},
+    dict(include_postictals=True),
+    dict(include_only_postictals=True, include_postictals=True),
+    dict(include_only_paediatric_cases=True),
+    dict(include_paeds_and_adults=True),
+    dict(include_concordance=False),
+    dict(include_seizure_freedom=False),
+    dict(include_et_topology_ez=False),
+    dict(include_seeg=False),
+    dict(include_cortical_stimulation=False),
+    dict(include_spontaneous_semiology=False),
+    dict(include_concordance=False, include_seizure_freedom=False, include_paeds_and_adults=True),
+    dict(include_seeg=False, include_cortical_stimulation=False, include_et_topology_ez=False),
+]
+
+
+class TestExclusionMask(unittest.TestCase):
+    def assert_same_as_legacy(self, df, flags):
+        expected = legacy_exclusions(df, **flags)
+        result = apply_exclusions(df, criterion_masks(df), **flags)
+        assert result.equals(expected), flags
+        assert result.index.equals(expected.index), flags
+        assert list(result.columns) == list(expected.columns), flags
+        assert np.array_equal(exclusion_mask(df, **flags), df.index.isin(expected.index)), flags
+
+    def test_whole_database(self):
+        for flags in FLAG_COMBINATIONS:
+            self.assert_same_as_legacy(mega_analysis_df, flags)
+
+    def test_term_rows(self):
+        for term, path in [('Epigastric', semiology_dict_path), ('Postictal Aphasia', None)]:
+            mask = QUERY_SEMIOLOGY_MASK(mega_analysis_df, term, semiology_dict_path=path)
+            df = select_rows(mega_analysis_df, mask)
+            assert np.array_equal(criterion_masks(df).bits, criterion_masks(mega_analysis_df).bits[mask])
+            for flags in FLAG_COMBINATIONS:
+                self.assert_same_as_legacy(df, flags)
+
+    def test_missing_column_raises_as_before(self):
+        # the concordance exclusion drops the all null columns of an empty selection
+        flags = dict(include_only_postictals=True, include_postictals=True,
+                     include_concordance=False, include_et_topology_ez=False)
+        with self.assertRaises(KeyError):
+            legacy_exclusions(mega_analysis_df, **flags)
+        with self.assertRaises(KeyError):
+            apply_exclusions(mega_analysis_df, **flags)
+
+    def test_nothing_excluded_returns_same_frame(self):
+        assert apply_exclusions(mega_analysis_df, include_postictals=True,
+                                include_paeds_and_adults=True) is mega_analysis_df
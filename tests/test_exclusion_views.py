@@ -0,0 +1,70 @@
+import unittest
+
+from mega_analysis.semiology import Laterality, Semiology, mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.exclusion_mask import apply_exclusions
+from mega_analysis.crosstab.mega_analysis.exclusion_views import (
+    MAX_VIEWS,
+    ExclusionViewCache,
+    configure_exclusion_views,
+    exclusion_view_cache,
+    normalise_exclusion_flags,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+
+
+class TestExclusionViews(unittest.TestCase):
+    def setUp(self):
+        self.views = ExclusionViewCache(mega_analysis_df)
+
+    def tearDown(self):
+        configure_exclusion_views()
+
+    def test_normalised_flags(self):
+        assert normalise_exclusion_flags() == normalise_exclusion_flags(include_concordance=True)
+        assert normalise_exclusion_flags(include_only_paediatric_cases=True) == \
+            normalise_exclusion_flags(include_only_paediatric_cases=True, include_paeds_and_adults=True)
+        assert normalise_exclusion_flags(include_seeg=False) != normalise_exclusion_flags()
+        with self.assertRaises(ValueError):
+            normalise_exclusion_flags(include_everything=True)
+
+    def test_select_same_as_apply_exclusions(self):
+        mask = QUERY_SEMIOLOGY_MASK(mega_analysis_df, 'Epigastric', semiology_dict_path=semiology_dict_path)
+        for flags in [{}, dict(include_seeg=False), dict(include_paeds_and_adults=True, include_postictals=True),
+                      dict(include_seizure_freedom=False, include_et_topology_ez=False)]:
+            expected = apply_exclusions(mega_analysis_df.loc[mask], **flags)
+            assert self.views.select(mask, **flags).equals(expected), flags
+        expected = apply_exclusions(mega_analysis_df, include_concordance=False)
+        assert self.views.select(include_concordance=False).equals(expected)
+        with self.assertRaises(ValueError):
+            self.views.select(mask, include_concordance=False)
+
+    def test_toggles_reuse_views(self):
+        first = self.views.view(include_seeg=False)
+        self.views.view()
+        assert self.views.view(include_seeg=False) is first
+        info = self.views.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    def test_eviction(self):
+        configure_exclusion_views(maxsize=2)
+        oldest = self.views.view(include_seeg=False)
+        self.views.view(include_concordance=False)
+        self.views.view(include_seeg=False)
+        self.views.view(include_et_topology_ez=False)
+        assert self.views.cache_info().currsize == 2
+        assert self.views.view(include_seeg=False) is oldest  # used last, so kept
+        assert self.views.cache_info().misses == 3
+
+        view_bytes = oldest.rows.nbytes + oldest.dropped_by.nbytes
+        configure_exclusion_views(maxsize=MAX_VIEWS, max_bytes=view_bytes)
+        assert self.views.cache_info().currsize == 1
+        assert self.views.cache_info().nbytes <= view_bytes
+
+    def test_semiology_queries_share_the_view(self):
+        views = exclusion_view_cache(mega_analysis_df)
+        before = views.cache_info()
+        for term in ['Epigastric', 'Head Version', 'Tonic']:
+            Semiology(term, Laterality.LEFT, Laterality.LEFT, include_seeg=False).query_semiology()
+        after = views.cache_info()
+        assert after.misses - before.misses <= 1
+        assert after.hits - before.hits >= 2
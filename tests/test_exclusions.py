@@ -1,8 +1,16 @@
 import unittest
 import sys
 
+import numpy as np
+import pandas as pd
+
 from mega_analysis.semiology import mega_analysis_df
+from mega_analysis.crosstab.mega_analysis.criteria import Criterion, criterion_masks
+from mega_analysis.crosstab.mega_analysis import exclusions as exclusions_module
 from mega_analysis.crosstab.mega_analysis.exclusions import (
+    CONCORDANT,
+    POST_OP,
+    SEEG_ES,
     exclusions,
     exclude_ET,
     exclude_sEEG,
@@ -10,7 +18,9 @@ from mega_analysis.crosstab.mega_analysis.exclusions import (
     exclude_seizure_free,
     exclude_paediatric_cases,
     exclude_postictals,
-    exclude_spontaneous_semiology
+    exclude_spontaneous_semiology,
+    only_postictal_cases,
+    postictal_rows,
 )
 
 
@@ -47,6 +57,47 @@ class TestExclusions(unittest.TestCase):
     def test_exclude_spontaneous(self):
         assert not self.df.equals(exclude_spontaneous_semiology(self.df))
 
+    def test_exclusions_do_not_change_their_input(self):
+        for name in ['exclude_postictals', 'exclude_paediatric_cases', 'only_paediatric_cases',
+                     'exclude_seizure_free', 'exclude_ET', 'exclude_sEEG',
+                     'exclude_cortical_stimulation', 'exclude_spontaneous_semiology']:
+            exclude = getattr(exclusions_module, name)
+            rows = getattr(exclusions_module, name + '_rows')
+            result = exclude(self.df)
+            assert self.df.equals(mega_analysis_df), name
+            assert result.index.equals(self.df.index[rows(self.df)]), name
+
+    def test_ground_truth_exclusions_null_the_excluded_values(self):
+        assert exclude_seizure_free(self.df)[POST_OP].isnull().all()
+        assert not (exclude_sEEG(self.df)[SEEG_ES] == 'y').any()
+        assert not exclude_cortical_stimulation(self.df)[SEEG_ES].str.contains('ES', case=False, na=False).any()
+        # the rows left have another ground truth
+        assert len(exclude_seizure_free(self.df)) < len(self.df)
+
+    def test_postictal_rows(self):
+        rows = postictal_rows(self.df)
+        assert only_postictal_cases(self.df).index.equals(self.df.index[rows])
+        assert np.array_equal(exclusions_module.exclude_postictals_rows(self.df), ~rows)
+        assert len(exclude_postictals(self.df)) == len(self.df) - rows.sum()
+
+    def test_pet_spect_exclusions(self):
+        criteria = criterion_masks(self.df)
+        for spect_pet in [False, True]:
+            imaging = criteria.mask(Criterion.PET_HYPERMETABOLISM)
+            only = criteria.mask(Criterion.PET_HYPERMETABOLISM_ONLY)
+            if spect_pet:
+                imaging = imaging | criteria.mask(Criterion.SPECT_PET)
+                only = only | criteria.mask(Criterion.SPECT_PET_ONLY)
+            assert only.any() and (imaging & ~only).any()
+            result = exclusions(self.df, POST_ictals=False, SPECT_PET=spect_pet)
+            # the rows with imaging as their only ground truth are dropped, the others lose their imaging concordance
+            assert result.index.equals(self.df.index[~only])
+            assert result.loc[self.df.index[imaging & ~only], CONCORDANT].isnull().all()
+            kept = self.df.loc[~only, result.columns]
+            kept.loc[imaging[~only], CONCORDANT] = np.nan
+            pd.testing.assert_frame_equal(result, kept)
+        assert self.df.equals(mega_analysis_df)
+
     def test_cortical_stimulation_columns_data_integrity(self):
         """
         A test to ensure all SEEG_ES = 'ES' are the same as CES.notnull() in the data.
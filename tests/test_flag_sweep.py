@@ -0,0 +1,70 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from mega_analysis.semiology import Laterality, Semiology, gif_lat_file, one_map
+from mega_analysis.crosstab.mega_analysis.flag_sweep import SWEEP_FLAGS, RowGifs, _gifs_to_vector, flag_combinations
+from mega_analysis.crosstab.mega_analysis.mapping import pivot_result_to_one_map
+
+
+def sweep_scores(table, combination):
+    selection = table
+    for flag, value in combination.items():
+        selection = selection[selection[flag] == value]
+    return dict(zip(selection['Gif Parcellations'], selection['Score']))
+
+
+class TestFlagSweep(unittest.TestCase):
+    def assert_same_as_get_num_datapoints_dict(self, term, flags, method='proportions', **options):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            table = Semiology(term, Laterality.LEFT, Laterality.LEFT, **options).sweep_inclusion_flags(flags, method)
+        assert list(table.columns) == list(flags) + ['Gif Parcellations', 'Score']
+        for combination in flag_combinations(flags):
+            semiology = Semiology(term, Laterality.LEFT, Laterality.LEFT, **dict(options, **combination))
+            try:
+                expected = semiology.get_num_datapoints_dict(method=method)
+            except ValueError:
+                expected = {}
+            scores = sweep_scores(table, combination)
+            assert set(scores) == set(expected), combination
+            for label, score in expected.items():
+                assert np.isclose(scores[label], score), (combination, label)
+
+    def test_flag_combinations(self):
+        combinations = flag_combinations(['include_seeg', 'include_concordance'])
+        assert combinations[0] == dict(include_seeg=True, include_concordance=True)
+        assert combinations[-1] == dict(include_seeg=False, include_concordance=False)
+        assert len(flag_combinations()) == 2 ** len(SWEEP_FLAGS)
+        with self.assertRaises(ValueError):
+            flag_combinations(['include_everything'])
+
+    def test_lateralised(self):
+        self.assert_same_as_get_num_datapoints_dict(
+            'Head Version', ['include_concordance', 'include_seeg', 'include_seizure_freedom'])
+
+    def test_raw_numbers_top_level_lobes(self):
+        self.assert_same_as_get_num_datapoints_dict(
+            'Aphasia', ['include_cortical_stimulation', 'include_paeds_and_adults'], method='raw',
+            granular=False, top_level_lobes=True, normalise_to_localising_values=True)
+
+    def test_rows_mapped_as_pivot_result_to_one_map(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            inspect_result = Semiology('Epigastric', Laterality.NEUTRAL, Laterality.NEUTRAL).query_semiology()
+            row_gifs = RowGifs(inspect_result, one_map, gif_lat_file)
+            for position in range(0, len(inspect_result), 10):
+                row = inspect_result.iloc[[position]]
+                row = row[[col for col in row.columns if col in one_map]].dropna(how='all', axis='columns')
+                expected = _gifs_to_vector(pivot_result_to_one_map(row, one_map), row_gifs.labels)
+                assert np.allclose(row_gifs.localised[position], expected), position
+
+    def test_combinations_without_data(self):
+        # without concordance no post-ictal rows are left, so query_semiology fails
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            table = Semiology('Postictal Dysphasia', Laterality.LEFT, Laterality.LEFT).sweep_inclusion_flags(
+                ['include_concordance'])
+        assert set(table['include_concordance']) == {True}
+        assert any('No data' in str(warning.message) for warning in caught)
@@ -0,0 +1,55 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.literal_prefilter import (
+    ColumnText,
+    PrefilteredPattern,
+    prefilter_report,
+    required_literals,
+)
+from mega_analysis.crosstab.mega_analysis.semiology_dictionary import (
+    flatten_semiology_dictionary,
+    load_semiology_dictionary,
+)
+
+
+class TestLiteralPrefilter(unittest.TestCase):
+    def test_required_literals(self):
+        assert required_literals(
+            '(?i)((?<!no )(?<!denies )(?<!deny ))epigastric ?(sensation)?') == ('epigastric',)
+        assert required_literals(
+            '(?<!no )(abdo[a-z]* aura)|(abdo.* ((sens[a-z]*)|(feeling)))') == (' aura', 'abdo')
+        assert required_literals('butterfl(y|ies)') == ('butterfl',)
+        assert required_literals('(fear|panic)') == ('fear', 'panic')
+        assert required_literals('GTCS?') == ('gtc',)
+
+    def test_no_literal_falls_back(self):
+        assert required_literals('[a-z]+ .*') is None
+        assert required_literals('(metallic)?.?taste|.{2}') is None
+        assert required_literals('ab') is None
+
+    def test_masks_equal_str_contains(self):
+        """Every SemioDict pattern must select exactly the rows str.contains selects."""
+        flat_dictionary = flatten_semiology_dictionary(
+            load_semiology_dictionary(semiology_dict_path))
+        for col in ['Reported Semiology', 'Semiology Category']:
+            column_text = ColumnText(mega_analysis_df[col])
+            for patterns in flat_dictionary.values():
+                for pattern in patterns:
+                    pattern = r'(?i)' + pattern
+                    with warnings.catch_warnings():
+                        warnings.filterwarnings(
+                            'ignore', 'This pattern has match groups')
+                        expected = mega_analysis_df[col].str.contains(
+                            pattern, na=False).to_numpy()
+                    mask = PrefilteredPattern(pattern).mask(column_text)
+                    assert np.array_equal(mask, expected), pattern
+
+    def test_prefilter_report(self):
+        report = prefilter_report(mega_analysis_df, semiology_dict_path)
+        assert 'Epigastric' in report.index
+        assert (report['candidate_rows'] <= report['rows']).all()
+        assert (report['matched_rows'] <= report['candidate_rows']).all()
@@ -0,0 +1,140 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from mega_analysis.semiology import Laterality, Semiology, mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.exclusions import (
+    exclude_cortical_stimulation,
+    exclude_ET,
+    exclude_paediatric_cases,
+    exclude_postictals,
+    exclude_sEEG,
+    exclude_seizure_free,
+    exclude_spontaneous_semiology,
+    exclusions,
+    only_paediatric_cases,
+    only_postictal_cases,
+)
+from mega_analysis.crosstab.mega_analysis.localisation_cube import (
+    CUBE_CRITERIA,
+    LocalisationCube,
+    localisation_cube,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from mega_analysis.crosstab.mega_analysis.row_filters import PublicationYears
+
+
+FLAG_COMBINATIONS = [
+    {},
+    dict(include_seeg=False),
+    dict(include_concordance=False),
+    dict(include_seizure_freedom=False, include_cortical_stimulation=False),
+    dict(include_only_paediatric_cases=True),
+    dict(include_postictals=True, include_paeds_and_adults=True, include_et_topology_ez=False),
+    dict(include_concordance=False, row_filters=[PublicationYears(2005, None)]),
+]
+
+
+def exclusion_functions(df, row_filters=(), **flags):
+    """The row filters, then the include_* flags applied one exclusion function after the other."""
+    for row_filter in row_filters:
+        df = df.loc[row_filter.mask(df)]
+    if not flags.get('include_postictals', False):
+        df = exclude_postictals(df)
+    if flags.get('include_only_postictals', False):
+        df = only_postictal_cases(df)
+    if flags.get('include_only_paediatric_cases', False):
+        df = only_paediatric_cases(df)
+    elif not flags.get('include_paeds_and_adults', False):
+        df = exclude_paediatric_cases(df)
+    if not flags.get('include_concordance', True):
+        df = exclusions(df, CONCORDANCE=True)
+    if not flags.get('include_seizure_freedom', True):
+        df = exclude_seizure_free(df)
+    if not flags.get('include_et_topology_ez', True):
+        df = exclude_ET(df)
+    if not flags.get('include_seeg', True):
+        df = exclude_sEEG(df)
+    if not flags.get('include_cortical_stimulation', True):
+        df = exclude_cortical_stimulation(df)
+    if not flags.get('include_spontaneous_semiology', True):
+        df = exclude_spontaneous_semiology(df)
+    return df
+
+
+class TestLocalisationCube(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = LocalisationCube(mega_analysis_df)
+
+    def expected_totals(self, term, path, flags):
+        df = exclusion_functions(mega_analysis_df, **flags)
+        inspect_result, _, _ = QUERY_SEMIOLOGY(df, semiology_term=term, semiology_dict_path=path)
+        return inspect_result.reindex(columns=self.cube.measures).fillna(0).sum()
+
+    def test_totals_same_as_query(self):
+        for term, path in [('Epigastric', semiology_dict_path), ('Tonic', semiology_dict_path),
+                           ('Head Version', semiology_dict_path), ('Aphemia', None)]:
+            for flags in FLAG_COMBINATIONS:
+                expected = self.expected_totals(term, path, flags)
+                totals = self.cube.totals(term, path, **flags)
+                pd.testing.assert_series_equal(totals, expected, check_names=False, obj=str((term, flags)))
+
+    def test_no_match(self):
+        totals = self.cube.totals('enja hichi nist')
+        assert list(totals.index) == self.cube.measures
+        assert not totals.any()
+
+    def test_cells(self):
+        cells = self.cube.cells()
+        assert len(cells) == len(self.cube)
+        assert cells['rows'].sum() == len(mega_analysis_df)
+        assert not cells.drop(columns='rows').duplicated().any()
+        assert 'POSTICTAL' in cells and 'PET_HYPERMETABOLISM' not in cells
+        assert np.all(self.cube.cell_bits & ~np.uint16(CUBE_CRITERIA) == 0)
+
+    def test_selection(self):
+        selection = self.cube.selection(include_seeg=False)
+        assert self.cube.selection(include_seeg=False) is selection
+        assert selection.keep.sum() == len(exclusion_functions(mega_analysis_df, include_seeg=False))
+        # the rows totals reads one by one, besides the cells
+        assert len(selection.dropped) + len(selection.special) < len(mega_analysis_df) / 20
+
+    def test_selection_accounts_for_every_row(self):
+        regular = ~self.cube.special
+        for flags in FLAG_COMBINATIONS:
+            selection = self.cube.selection(**flags)
+            # the regular rows kept are those of the kept cells but the dropped ones
+            in_cells = selection.cells[self.cube.row_cells] & regular
+            assert not selection.keep[selection.dropped].any()
+            in_cells[selection.dropped] = False
+            assert np.array_equal(in_cells, selection.keep & regular), flags
+            assert np.array_equal(selection.special, np.flatnonzero(selection.keep & ~regular)), flags
+            assert len(selection.special_keys) == len(selection.special)
+            if not flags.get('row_filters'):
+                assert len(selection.dropped) == 0, flags
+
+    def test_terms_summed_when_built(self):
+        cube = LocalisationCube(mega_analysis_df, ['Epigastric', 'Tonic'], semiology_dict_path)
+        assert set(cube._terms) == {('Epigastric', semiology_dict_path), ('Tonic', semiology_dict_path)}
+
+    def test_precompute(self):
+        stacked = self.cube.precompute(['Epigastric', 'Tonic'], semiology_dict_path)
+        assert stacked.shape == (2, len(self.cube), len(self.cube.measures))
+        assert np.array_equal(stacked[0], self.cube.term_cells('Epigastric', semiology_dict_path))
+
+    def test_discard(self):
+        self.cube.term_cells('Epigastric', semiology_dict_path)
+        self.cube.term_cells('Tonic', semiology_dict_path)
+        self.cube.term_cells('Epigastric')
+        self.cube.discard(['Epigastric'])
+        assert ('Epigastric', semiology_dict_path) not in self.cube._terms
+        assert ('Tonic', semiology_dict_path) in self.cube._terms
+        assert ('Epigastric', None) in self.cube._terms  # free text, not a dictionary term
+
+    def test_semiology_query_totals(self):
+        semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, include_seeg=False)
+        assert localisation_cube(mega_analysis_df) is localisation_cube(mega_analysis_df)
+        expected = self.expected_totals('Epigastric', semiology_dict_path, dict(include_seeg=False))
+        pd.testing.assert_series_equal(semiology.query_totals(), expected, check_names=False)
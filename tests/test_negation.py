@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from mega_analysis.semiology import mega_analysis_df
+from mega_analysis.crosstab.mega_analysis.literal_prefilter import ColumnText, PrefilteredPattern
+from mega_analysis.crosstab.mega_analysis.negation import (
+    NEGATION_CUES,
+    NON_NEGATED_MARKER,
+    split_negation,
+)
+
+
+class TestNegation(unittest.TestCase):
+    def test_split_negation(self):
+        assert split_negation('(?i)((?<!no )(?<!denies ))epigastric') == (
+            '(?i)epigastric', ('denies ', 'no '))
+        assert split_negation('(?i)((?<!postictal )(?<!no ))aphasia') == (
+            '(?i)(?<!postictal )aphasia', ('no ',))
+        assert split_negation('(?i)' + NON_NEGATED_MARKER + 'epigastric') == (
+            '(?i)epigastric', NEGATION_CUES)
+
+    def test_unchanged(self):
+        for pattern in [
+                '((?<!no ))epigastric',  # case sensitive
+                '(?i)(?<!no )abdo aura|abdo feeling',  # guard only on the first alternative
+                '(?i)((?<!non)(?<!un))forced head turn',  # not negation cues
+                '(?i)(?<!no )(a)\\1',  # backreference
+        ]:
+            assert split_negation(pattern) == (pattern, ())
+
+    def test_negated_mentions_skipped(self):
+        texts = pd.Series([
+            'epigastric aura', 'no epigastric aura', 'No epigastric aura but epigastric pain',
+            'denies EPIGASTRIC rising', 'without epigastric', np.nan,
+        ])
+        column_text = ColumnText(texts)
+        guarded = PrefilteredPattern('(?i)((?<!no )(?<!denies ))epigastric')
+        expected = texts.str.contains(guarded.pattern, na=False).to_numpy()
+        assert np.array_equal(guarded.mask(column_text), expected)
+        assert list(expected) == [True, False, True, False, True, False]
+
+        marked = PrefilteredPattern('(?i)' + NON_NEGATED_MARKER + 'epigastric')
+        assert list(marked.mask(column_text)) == [True, False, True, False, False, False]
+
+    def test_marker_equals_lookbehinds_on_database(self):
+        chain = ''.join(f'(?<!{cue})' for cue in NEGATION_CUES)
+        column_text = ColumnText(mega_analysis_df['Reported Semiology'])
+        for word in ['aura', 'automatisms', 'head']:
+            marked = PrefilteredPattern('(?i)' + NON_NEGATED_MARKER + word)
+            expected = mega_analysis_df['Reported Semiology'].str.contains(
+                '(?i)' + chain + word, na=False).to_numpy()
+            assert np.array_equal(marked.mask(column_text), expected)
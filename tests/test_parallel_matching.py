@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df
+from mega_analysis.crosstab.mega_analysis import parallel_matching
+from mega_analysis.crosstab.mega_analysis.literal_prefilter import ColumnText, PrefilteredPattern
+from mega_analysis.crosstab.mega_analysis.parallel_matching import (
+    disable_parallel_matching,
+    enable_parallel_matching,
+    use_process_pool,
+)
+
+
+PATTERNS = [
+    '(?i)((?<!no )(?<!denies ))epigastric',
+    '(?i)head (turn|version)',
+    '(?i)^tonic',
+    'Aura',
+    '(?i)(?<!post)ictal',
+]
+
+
+class TestParallelMatching(unittest.TestCase):
+    def tearDown(self):
+        disable_parallel_matching()
+
+    def test_serial_by_default_and_for_small_databases(self):
+        assert not use_process_pool(10**7)
+        enable_parallel_matching(max_workers=2)
+        assert not use_process_pool(len(mega_analysis_df))
+        assert use_process_pool(parallel_matching.MIN_PARALLEL_ROWS)
+        enable_parallel_matching(max_workers=1, min_rows=1)
+        assert not use_process_pool(10**7)
+
+    def test_parallel_masks_equal_str_contains(self):
+        series = mega_analysis_df['Reported Semiology']
+        column_text = ColumnText(series)
+        enable_parallel_matching(max_workers=2, min_rows=1)
+        executors = set()
+        for pattern in PATTERNS:
+            mask = PrefilteredPattern(pattern).mask(column_text)
+            expected = series.str.contains(pattern, na=False).to_numpy()
+            assert np.array_equal(mask, expected), pattern
+            assert parallel_matching._executor is not None
+            executors.add(id(parallel_matching._executor))
+        # one pool for every query
+        assert len(executors) == 1
@@ -0,0 +1,70 @@
+import copy
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import (
+    mega_analysis_df,
+    semiology_dict_path,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+from mega_analysis.crosstab.mega_analysis.pattern_provenance import PatternProvenance
+from mega_analysis.crosstab.mega_analysis.semiology_dictionary import (
+    flatten_semiology_dictionary,
+    load_semiology_dictionary,
+)
+
+
+flat_dictionary = flatten_semiology_dictionary(
+    load_semiology_dictionary(semiology_dict_path))
+provenance = PatternProvenance(mega_analysis_df, flat_dictionary)
+
+
+class TestPatternProvenance(unittest.TestCase):
+    def test_key_rows_match_query_semiology(self):
+        for key in ['Epigastric', 'Head Version', 'Tonic']:
+            mask = QUERY_SEMIOLOGY_MASK(
+                mega_analysis_df,
+                semiology_term=key,
+                semiology_dict_path=semiology_dict_path,
+            )
+            assert provenance.rows_for_key(key).equals(mega_analysis_df.index[mask]), key
+
+    def test_head_version_provenance(self):
+        def contains(pattern):
+            return (mega_analysis_df['Reported Semiology'].str.contains('(?i)' + pattern, na=False)
+                    | mega_analysis_df['Semiology Category'].str.contains('(?i)' + pattern, na=False)).to_numpy()
+
+        patterns = provenance.keys['Head Version']
+        for pattern in patterns:
+            assert provenance.rows_for_pattern(pattern).equals(mega_analysis_df.index[contains(pattern)]), pattern
+        matches = np.array([contains(pattern) for pattern in patterns])
+        # a row more than one of the patterns catch
+        position = np.flatnonzero(matches.sum(axis=0) > 1)[0]
+        expected = [pair for pair in provenance.pairs if contains(pair[1])[position]]
+        assert len(expected) > 1
+        assert provenance.patterns_for_row(mega_analysis_df.index[position]) == expected
+
+    def test_patterns_for_row(self):
+        pattern = provenance.keys['Epigastric'][0]
+        rows = provenance.rows_for_pattern(pattern)
+        assert len(rows)
+        assert ('Epigastric', pattern) in provenance.patterns_for_row(rows[0])
+
+    def test_unmatched_rows(self):
+        unmatched = set(provenance.unmatched_rows())
+        for key in provenance.keys:
+            assert not unmatched & set(provenance.rows_for_key(key))
+
+    def test_sparse_shape(self):
+        matrix = provenance.to_sparse()
+        assert matrix.shape == (len(provenance.pairs), len(mega_analysis_df))
+        assert matrix.nnz == len(provenance.to_frame())
+
+    def test_incremental_update(self):
+        edited = copy.deepcopy(flat_dictionary)
+        edited['Epigastric'] = edited['Epigastric'] + ['tummy']
+        incremental = PatternProvenance(mega_analysis_df, flat_dictionary)
+        assert incremental.update(edited) == ['tummy']
+        assert incremental.update(flat_dictionary) == []
+        assert 'tummy' not in incremental._pattern_rows
@@ -0,0 +1,50 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from mega_analysis.semiology import Laterality, Semiology, mega_analysis_df
+from mega_analysis.crosstab.mega_analysis.publication_years import NO_YEAR, publication_year_index
+from mega_analysis.crosstab.mega_analysis.row_filters import PublicationYears
+
+
+class TestPublicationYears(unittest.TestCase):
+    def test_index(self):
+        index = publication_year_index(mega_analysis_df)
+        assert index is publication_year_index(mega_analysis_df)
+        years = mega_analysis_df['Reference'].str.extract(r'(?P<Year>\d\d\d\d)', expand=False).astype(int)
+        assert np.array_equal(index.years, years)
+        assert np.all(np.diff(index.years[index.order]) >= 0)
+        rows = index.rows_between(2005, 2010)
+        assert np.array_equal(np.sort(rows), np.flatnonzero(years.between(2005, 2010)))
+        assert len(index.rows_between(2010, 2005)) == 0
+        assert len(index.rows_between()) == np.sum(index.years != NO_YEAR)
+
+    def test_year_groups(self):
+        index = publication_year_index(mega_analysis_df)
+        rows = np.arange(0, len(mega_analysis_df), 7)
+        years, groups = index.year_groups(rows)
+        assert np.all(np.diff(years) > 0)
+        assert np.array_equal(years[groups], index.years[rows])
+
+    def assert_same_as_each_year(self, term, **options):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            table = Semiology(term, Laterality.LEFT, Laterality.LEFT, **options).scores_by_publication_year()
+        assert list(table.columns) == ['Year', 'Gif Parcellations', 'Score']
+        years = sorted(set(table['Year']))
+        assert years
+        for year in years[:2] + years[-2:]:
+            expected = Semiology(term, Laterality.LEFT, Laterality.LEFT, row_filters=[PublicationYears(None, year)],
+                                 **options).get_num_datapoints_dict()
+            selection = table[table['Year'] == year]
+            scores = dict(zip(selection['Gif Parcellations'], selection['Score']))
+            assert set(scores) == set(expected), year
+            for label, score in expected.items():
+                assert np.isclose(scores[label], score), (year, label)
+
+    def test_lateralised(self):
+        self.assert_same_as_each_year('Head Version')
+
+    def test_each_year_queried(self):
+        self.assert_same_as_each_year('Epigastric', include_concordance=False)
@@ -0,0 +1,68 @@
+import unittest
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.QUERY_BOOLEAN import (
+    And,
+    Not,
+    Or,
+    Term,
+    QUERY_BOOLEAN,
+    parse_query,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+
+
+def rows(result):
+    return set(result[0].index)
+
+
+def semiology_rows(term, **kwargs):
+    return rows(QUERY_SEMIOLOGY(mega_analysis_df, semiology_term=term, **kwargs))
+
+
+class TestQueryBoolean(unittest.TestCase):
+    def test_parse(self):
+        plan = parse_query(
+            '("head version" OR head turn) AND NOT postictal IN \'Semiology Category\'')
+        assert isinstance(plan, And)
+        assert isinstance(plan.children[0], Or)
+        assert plan.children[0].children[1].term == 'head turn'
+        negated = plan.children[1]
+        assert isinstance(negated, Not)
+        assert negated.child.columns == ('Semiology Category',)
+        assert isinstance(parse_query('"AND"'), Term)
+
+    def test_parse_errors(self):
+        for expression in ['', 'tonic AND', '(tonic', 'tonic)', '"tonic', 'tonic IN', 'OR tonic']:
+            with self.assertRaises(ValueError):
+                parse_query(expression)
+
+    def test_single_term_equals_query_semiology(self):
+        result = QUERY_BOOLEAN(mega_analysis_df, 'tonic')
+        expected = QUERY_SEMIOLOGY(mega_analysis_df, semiology_term='tonic')
+        assert result[0].equals(expected[0])
+        assert result[1] == expected[1]
+        assert result[2] == expected[2]
+
+    def test_set_algebra(self):
+        tonic = semiology_rows('tonic')
+        clonic = semiology_rows('clonic')
+        assert rows(QUERY_BOOLEAN(mega_analysis_df, 'tonic AND clonic')) == tonic & clonic
+        assert rows(QUERY_BOOLEAN(mega_analysis_df, 'tonic OR clonic')) == tonic | clonic
+        assert rows(QUERY_BOOLEAN(mega_analysis_df, 'tonic AND NOT clonic')) == tonic - clonic
+
+    def test_dictionary_keys(self):
+        result = QUERY_BOOLEAN(
+            mega_analysis_df, 'Epigastric OR Fear-Anxiety', semiology_dict_path=semiology_dict_path)
+        expected = (semiology_rows('Epigastric', semiology_dict_path=semiology_dict_path)
+                    | semiology_rows('Fear-Anxiety', semiology_dict_path=semiology_dict_path))
+        assert rows(result) == expected
+
+    def test_column_scope(self):
+        in_category = rows(QUERY_BOOLEAN(
+            mega_analysis_df, "postictal IN 'Semiology Category'"))
+        in_either = rows(QUERY_BOOLEAN(mega_analysis_df, 'postictal'))
+        assert in_category
+        assert in_category <= in_either
+        with self.assertRaises(KeyError):
+            QUERY_BOOLEAN(mega_analysis_df, "tonic IN 'No Such Column'")
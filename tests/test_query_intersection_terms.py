@@ -0,0 +1,33 @@
+import unittest
+
+from mega_analysis.semiology import mega_analysis_df
+from mega_analysis.crosstab.mega_analysis.QUERY_INTERSECTION_TERMS import QUERY_INTERSECTION_TERMS
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+
+
+def semiology_rows(term):
+    return set(QUERY_SEMIOLOGY(mega_analysis_df, semiology_term=term)[0].index)
+
+
+class TestQueryIntersectionTerms(unittest.TestCase):
+    def test_intersection_of_query_semiology_rows(self):
+        result = QUERY_INTERSECTION_TERMS(mega_analysis_df, 'head', 'version', 'left')
+        expected = semiology_rows('head') & semiology_rows('version') & semiology_rows('left')
+        assert expected
+        assert set(result.index) == expected
+        assert result.index.is_monotonic_increasing
+        assert not result.isnull().all().any()
+
+    def test_operand_order_does_not_matter(self):
+        result = QUERY_INTERSECTION_TERMS(mega_analysis_df, 'aura', 'fear')
+        reversed_result = QUERY_INTERSECTION_TERMS(mega_analysis_df, 'fear', 'aura')
+        assert result.equals(reversed_result)
+
+    def test_empty_intersection(self):
+        result = QUERY_INTERSECTION_TERMS(mega_analysis_df, 'xyzzy', 'head')
+        assert result.empty
+
+    def test_single_term_is_query_semiology(self):
+        expected, _, _ = QUERY_SEMIOLOGY(mega_analysis_df, semiology_term='fear')
+        result = QUERY_INTERSECTION_TERMS(mega_analysis_df, 'fear')
+        assert result.equals(expected.dropna(axis='columns', how='all'))
@@ -0,0 +1,85 @@
+import unittest
+
+from mega_analysis.semiology import (
+    Laterality,
+    Semiology,
+    mega_analysis_df,
+    semiology_dict_path,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from mega_analysis.crosstab.mega_analysis.exclusions import (
+    exclude_cortical_stimulation,
+    exclude_ET,
+    exclude_paediatric_cases,
+    exclude_postictals,
+    exclude_sEEG,
+    exclude_seizure_free,
+    exclude_spontaneous_semiology,
+    exclusions,
+    only_paediatric_cases,
+    only_postictal_cases,
+)
+
+
+def exclusion_functions(df, semiology):
+    """The include_* flags applied one exclusion function after the other, as remove_exclusions used to."""
+    if not semiology.include_postictals:
+        df = exclude_postictals(df)
+    if semiology.include_only_postictals:
+        df = only_postictal_cases(df)
+    if semiology.include_only_paediatric_cases:
+        df = only_paediatric_cases(df)
+    elif not semiology.include_paeds_and_adults:
+        df = exclude_paediatric_cases(df)
+    if not semiology.include_concordance:
+        df = exclusions(df, CONCORDANCE=True)
+    if not semiology.include_seizure_freedom:
+        df = exclude_seizure_free(df)
+    if not semiology.include_et_topology_ez:
+        df = exclude_ET(df)
+    if not semiology.include_seeg:
+        df = exclude_sEEG(df)
+    if not semiology.include_cortical_stimulation:
+        df = exclude_cortical_stimulation(df)
+    if not semiology.include_spontaneous_semiology:
+        df = exclude_spontaneous_semiology(df)
+    return df
+
+
+class TestTermFirstQueryPlan(unittest.TestCase):
+    def exclusions_first(self, semiology):
+        """The original plan: filter the whole database, then search the term."""
+        path = semiology_dict_path if semiology.term == 'Epigastric' else None
+        df = exclusion_functions(mega_analysis_df, semiology)
+        inspect_result, _, _ = QUERY_SEMIOLOGY(
+            df, semiology_term=semiology.term, semiology_dict_path=path)
+        return inspect_result
+
+    def test_same_rows_as_exclusions_first(self):
+        flag_sets = [
+            {},
+            dict(include_postictals=True),
+            dict(include_seizure_freedom=False, include_seeg=False),
+            dict(include_cortical_stimulation=False, include_et_topology_ez=False),
+            dict(include_only_paediatric_cases=True),
+            dict(include_concordance=False),
+        ]
+        for term in ['Epigastric', 'head']:
+            for flags in flag_sets:
+                semiology = Semiology(
+                    term, Laterality.LEFT, Laterality.LEFT, granular=False, **flags)
+                expected = self.exclusions_first(semiology)
+                result = semiology.query_semiology()
+                assert result.equals(expected)
+
+    def test_only_term_rows_filtered(self):
+        semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT)
+        semiology.query_semiology()
+        assert len(semiology.data_frame) < len(mega_analysis_df) / 10
+
+    def test_exclusions_keep_ground_truth_columns(self):
+        # no row of this subset has a concordance ground truth
+        concordant = 'Concordant Neurophys & Imaging (MRI, PET, SPECT)'
+        subset = mega_analysis_df.loc[mega_analysis_df[concordant].isnull()].head(20).copy()
+        excluded = exclusions(subset, CONCORDANCE=True)
+        assert concordant in excluded.columns
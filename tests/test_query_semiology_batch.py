@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY_BATCH import QUERY_SEMIOLOGY_BATCH
+
+
+class TestQuerySemiologyBatch(unittest.TestCase):
+    def setUp(self):
+        self.terms = ['Epigastric', 'Head Version', 'head', ['fear', 'panic'], 'xyzzy']
+        self.membership = QUERY_SEMIOLOGY_BATCH(
+            mega_analysis_df, self.terms, semiology_dict_path=semiology_dict_path)
+
+    def test_matrix_shape(self):
+        assert self.membership.matrix.shape == (len(self.terms), len(mega_analysis_df))
+        assert self.membership.counts()['xyzzy'] == 0
+        assert len(self.membership.rows('xyzzy')) == 0
+
+    def test_results_equal_query_semiology(self):
+        for term in self.terms:
+            path = semiology_dict_path if term in ['Epigastric', 'Head Version'] else None
+            expected = QUERY_SEMIOLOGY(
+                mega_analysis_df, semiology_term=term, semiology_dict_path=path)
+            result = self.membership[term]
+            assert result[0].equals(expected[0])
+            assert result[1] == expected[1]
+            assert result[2] == expected[2]
+
+    def test_rows_and_frame(self):
+        frame = self.membership.to_frame()
+        rows = self.membership.rows('head')
+        assert set(rows) == set(frame.columns[frame.loc['head'].to_numpy()])
+        assert np.array_equal(self.membership.mask('head'), frame.loc['head'].to_numpy())
+        assert ('fear', 'panic') in frame.index
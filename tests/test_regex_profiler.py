@@ -0,0 +1,58 @@
+import math
+import unittest
+
+import numpy as np
+
+from mega_analysis.semiology import mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.regex_profiler import (
+    SEARCH_BUDGET_SECONDS,
+    SUPER_LINEAR_EXPONENT,
+    SYNTHETIC_LENGTHS,
+    backtracking_growth,
+    profile_semiology_dictionary,
+)
+
+
+def cost_model(exponent, lengths=None):
+    """A search_time of time ~ length**exponent, recording the lengths searched."""
+    def search_time(regex, text):
+        if lengths is not None:
+            lengths.append(len(text))
+        return 1e-9 * len(text) ** exponent
+    return search_time
+
+
+class TestRegexProfiler(unittest.TestCase):
+    def test_linear_pattern(self):
+        exponent = backtracking_growth(
+            '(?i)((?<!no )(?<!denies )(?<!deny ))epigastric', search_time=cost_model(1))
+        assert np.isclose(exponent, 1)
+        assert exponent < SUPER_LINEAR_EXPONENT
+
+    def test_quadratic_growth_is_super_linear(self):
+        exponent = backtracking_growth(
+            '(?i)(abdo.* ((sens[a-z]*)|(feeling)))', search_time=cost_model(2))
+        assert np.isclose(exponent, 2)
+        assert exponent > SUPER_LINEAR_EXPONENT
+
+    def test_over_budget_stops_the_ladder(self):
+        lengths = []
+        constant = cost_model(0, lengths)
+
+        def search_time(regex, text):
+            return constant(regex, text) + (SEARCH_BUDGET_SECONDS if len(text) > 100 else 0)
+
+        assert backtracking_growth('(a+)+b', search_time=search_time) == math.inf
+        # one probe per length up to the first over 100, not up to the longest
+        assert max(lengths) < SYNTHETIC_LENGTHS[1]
+        assert lengths == sorted(lengths) and sum(length > 100 for length in lengths) == 1
+
+    def test_profile_ranks_patterns(self):
+        report = profile_semiology_dictionary(
+            mega_analysis_df, semiology_dict_path, search_time=cost_model(1))
+        assert report['full_scan_seconds'].is_monotonic_decreasing
+        assert {'Epigastric', 'Tonic'} <= set(report['key'])
+        assert list(report.columns) == ['key', 'pattern', 'full_scan_seconds', 'prefiltered_seconds',
+                                        'has_literal', 'matched_rows', 'growth_exponent', 'super_linear']
+        assert np.allclose(report['growth_exponent'], 1)
+        assert not report['super_linear'].any()
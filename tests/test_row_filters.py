@@ -0,0 +1,97 @@
+import unittest
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from mega_analysis.semiology import Laterality, Semiology, mega_analysis_df, semiology_dict_path
+from mega_analysis.crosstab.mega_analysis.exclusion_mask import apply_exclusions
+from mega_analysis.crosstab.mega_analysis.exclusion_views import exclusion_view_cache
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import QUERY_SEMIOLOGY_MASK
+from mega_analysis.crosstab.mega_analysis.row_filters import (
+    MinimumPatients,
+    OtherFactors,
+    PublicationYears,
+    ReferenceMatches,
+    RowFilter,
+    normalise_row_filters,
+    row_filter_masks,
+)
+
+
+class TestRowFilters(unittest.TestCase):
+    def test_masks(self):
+        df = mega_analysis_df
+        years = df['Reference'].str.extract(r'(?P<Year>\d\d\d\d)', expand=False).astype(int)
+        assert np.array_equal(PublicationYears(2005, 2010).mask(df), years.between(2005, 2010))
+        assert np.array_equal(PublicationYears(None, 2000).mask(df), years <= 2000)
+        assert np.array_equal(ReferenceMatches('(?i)kotagal').mask(df),
+                              df['Reference'].str.contains('(?i)kotagal', na=False))
+        assert np.array_equal(MinimumPatients(20).mask(df), df['Tot Pt included'] >= 20)
+        other_factors = df['Other factors (e.g. Abs, genetic mutations)'].notnull()
+        assert np.array_equal(OtherFactors().mask(df), other_factors)
+        assert np.array_equal(OtherFactors(False).mask(df), ~other_factors)
+        assert row_filter_masks(df).mask(OtherFactors()) is row_filter_masks(df).mask(OtherFactors())
+        with self.assertRaises(ValueError):
+            PublicationYears(2010, 2005)
+
+    def test_undated_rows(self):
+        df = mega_analysis_df.iloc[:10].copy()
+        df.iloc[[2, 5], df.columns.get_loc('Reference')] = ['Personal communication', np.nan]
+        dated = np.ones(10, dtype=bool)
+        dated[[2, 5]] = False
+        assert np.array_equal(PublicationYears().mask(df), dated)
+        assert PublicationYears(include_undated=True).mask(df).all()
+        assert np.array_equal(PublicationYears(None, 1800, include_undated=True).mask(df), ~dated)
+        assert PublicationYears(include_undated=True) != PublicationYears()
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            RowFilter()
+
+        class NoMask(RowFilter, namedtuple('NoMask', ['value'])):
+            __slots__ = ()
+
+        with self.assertRaises(TypeError):
+            NoMask(1)
+
+    def test_normalise(self):
+        assert normalise_row_filters([MinimumPatients(1), OtherFactors(), MinimumPatients(1)]) == \
+            normalise_row_filters([OtherFactors(True), MinimumPatients(1)])
+        # same fields, different filters
+        assert MinimumPatients(1) != OtherFactors(True)
+        assert len(normalise_row_filters([MinimumPatients(1), OtherFactors(True)])) == 2
+        with self.assertRaises(ValueError):
+            normalise_row_filters([('Tot Pt included', 10)])
+
+    def test_same_as_filtering_first(self):
+        views = exclusion_view_cache(mega_analysis_df)
+        row_filters = [PublicationYears(2005, None), MinimumPatients(10)]
+        keep = PublicationYears(2005, None).mask(mega_analysis_df) & MinimumPatients(10).mask(mega_analysis_df)
+        term_mask = QUERY_SEMIOLOGY_MASK(mega_analysis_df, 'Tonic', semiology_dict_path=semiology_dict_path)
+        for flags in [{}, dict(include_seeg=False), dict(include_concordance=False)]:
+            expected = apply_exclusions(mega_analysis_df.loc[keep], **flags)
+            pd.testing.assert_frame_equal(views.select(row_filters=row_filters, **flags), expected)
+            if flags.get('include_concordance', True):
+                term_rows = expected.index.isin(mega_analysis_df.index[term_mask])
+                pd.testing.assert_frame_equal(
+                    views.select(term_mask, row_filters=row_filters, **flags), expected[term_rows])
+        funnel = views.funnel(term_mask, row_filters=row_filters)
+        assert [step.step for step in funnel[1:3]] == list(normalise_row_filters(row_filters))
+        assert views.view(row_filters=row_filters[::-1]) is views.view(row_filters=row_filters)
+        assert views.view(row_filters=row_filters) is not views.view()
+
+    def test_semiology(self):
+        recent = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, row_filters=[PublicationYears(2010, None)])
+        everything = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT)
+        assert recent.query_key() != everything.query_key()
+        assert 'row_filters' not in dict(everything.query_key()[-1])
+        result = recent.query_semiology()
+        assert len(result) < len(everything.query_semiology())
+        references = mega_analysis_df.loc[result.index, 'Reference']
+        assert references.str.extract(r'(\d\d\d\d)', expand=False).astype(int).min() >= 2010
+
+        nothing = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, row_filters=[MinimumPatients(10 ** 6)])
+        with self.assertRaises(ValueError) as raised:
+            nothing.query_lateralisation()
+        assert 'MinimumPatients(patients=1000000)' in str(raised.exception)
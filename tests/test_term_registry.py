@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from mega_analysis.semiology import (
+    Laterality,
+    all_semiology_terms,
+    expected_row_count,
+    get_possible_lateralities,
+    mega_analysis_df,
+    postictal_semiologies_neutral_also,
+    postictal_semiologies_neutral_only,
+    resources_dir,
+    semiology_dict_path,
+    term_registry,
+)
+from mega_analysis.crosstab.mega_analysis.QUERY_SEMIOLOGY import semiology_regexes
+from mega_analysis.crosstab.mega_analysis import term_registry as term_registry_module
+from mega_analysis.crosstab.mega_analysis.term_registry import get_term_registry
+
+
+class TestTermRegistry(unittest.TestCase):
+    def test_dictionary_membership(self):
+        for term in all_semiology_terms:
+            assert term_registry.in_dictionary(term)
+        assert not term_registry.in_dictionary('head')
+        assert not term_registry.in_dictionary('auras')
+
+    def test_metadata(self):
+        metadata = term_registry.metadata('Epigastric')
+        assert metadata.in_dictionary
+        assert metadata.parent == 'auras'
+        assert not metadata.postictal_only
+        assert get_possible_lateralities('Epigastric') == [Laterality.NEUTRAL]
+        assert get_possible_lateralities('head') == [Laterality.LEFT, Laterality.RIGHT]
+
+    def test_postictal_only(self):
+        for term in postictal_semiologies_neutral_only + postictal_semiologies_neutral_also:
+            assert term_registry.is_postictal_only(term)
+        assert not term_registry.is_postictal_only('Epigastric')
+
+    def test_one_registry_per_version(self):
+        assert get_term_registry(resources_dir, semiology_dict_path) is term_registry
+
+    def test_expected_row_count(self):
+        """Matched rows, counted before QUERY_SEMIOLOGY drops duplicated rows."""
+        regexes = semiology_regexes('Epigastric', semiology_dict_path=semiology_dict_path)
+        matched = False
+        for col in ['Reported Semiology', 'Semiology Category']:
+            for regex in regexes:
+                matched |= mega_analysis_df[col].str.contains(regex, na=False)
+        assert expected_row_count('Epigastric') == matched.sum()
+        assert expected_row_count('head') is None
+
+    def test_latest_registry_kept(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'semiology_dictionary.yaml'
+            path.write_text(semiology_dict_path.read_text())
+            first = get_term_registry(resources_dir, path)
+            assert get_term_registry(resources_dir, path) is first
+            path.write_text(semiology_dict_path.read_text() + '\n')
+            second = get_term_registry(resources_dir, path)
+            assert second is not first and second.version != first.version
+            key = str(path.resolve())
+            assert term_registry_module._registries[key] is second
+            del term_registry_module._registries[key]
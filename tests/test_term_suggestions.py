@@ -0,0 +1,53 @@
+import unittest
+
+from mega_analysis.semiology import (
+    Laterality,
+    Semiology,
+    _no_results_message,
+    mega_analysis_df,
+    semiology_dict_path,
+    suggest_semiology_terms,
+)
+from mega_analysis.crosstab.mega_analysis.term_suggestions import (
+    TermSuggester,
+    pattern_words,
+)
+
+
+class TestTermSuggestions(unittest.TestCase):
+    def setUp(self):
+        self.suggester = TermSuggester.from_dataframe(mega_analysis_df, semiology_dict_path)
+
+    def test_pattern_words(self):
+        assert pattern_words(
+            '((?<!no )(?<!denies ))epigastric ?(sensation)?') == 'epigastric sensation'
+
+    def test_misspelt_keys(self):
+        assert self.suggester.suggest('epigastic')[0].text == 'Epigastric'
+        assert self.suggester.suggest('head verison')[0].text == 'Head Version'
+        assert self.suggester.suggest('Fear Anxiety')[0].text == 'Fear-Anxiety'
+
+    def test_ranked_and_unique(self):
+        suggestions = self.suggester.suggest('tonic-clonic', limit=10)
+        scores = [suggestion.score for suggestion in suggestions]
+        assert scores == sorted(scores, reverse=True)
+        assert len({suggestion.text.lower() for suggestion in suggestions}) == len(suggestions)
+        assert len(suggestions) <= 10
+
+    def test_nothing_similar(self):
+        assert self.suggester.suggest('xyzzy') == []
+        assert suggest_semiology_terms('xyzzy') == []
+
+    def test_error_message_suggests(self):
+        semiology = Semiology('epigastic', Laterality.NEUTRAL, Laterality.LEFT)
+        with self.assertRaisesRegex(ValueError, 'Did you mean: "Epigastric"'):
+            semiology.get_num_datapoints_dict()
+
+    def test_no_suggestions_when_the_term_matched(self):
+        semiology = Semiology('Epigastric', Laterality.LEFT, Laterality.LEFT, include_cortical_stimulation=False,
+                              include_et_topology_ez=False, include_spontaneous_semiology=False)
+        with self.assertRaises(ValueError) as raised:
+            semiology.get_num_datapoints_dict()
+        assert 'Did you mean' not in str(raised.exception)
+        assert 'include_spontaneous_semiology=False' in str(raised.exception)
+        assert '"Epigastric"' not in _no_results_message('No results', 'epigastric')